@@ -25,6 +25,16 @@ from saspy.sasexceptions import SASIONotSupportedError, SASConfigNotValidError
 from saspy.sasproccommons import SASProcCommons
 from saspy.sastabulate import Tabulate
 from saspy.sasresults import SASresults
+from saspy.sasiocommons import SASschema
+
+# these pull in asyncio and concurrent.futures, so they're imported the first time they're used
+_lazy = {'AsyncSASsession': 'saspy.sasasync', 'SASsessionPool': 'saspy.saspool'}
+
+def __getattr__(name):
+    if name in _lazy:
+        import importlib
+        return getattr(importlib.import_module(_lazy[name]), name)
+    raise AttributeError("module 'saspy' has no attribute '{}'".format(name))
 
 def isnotebook():
     try:
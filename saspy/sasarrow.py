@@ -0,0 +1,137 @@
+#
+# Copyright SAS Institute
+#
+#  Licensed under the Apache License, Version 2.0 (the License);
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+#
+# Apache Arrow record batches from SAS Data Sets, for SASdata.to_arrow(), SASdata.to_parquet() and sd2df(spill=).
+# pyarrow is only imported when these are used.
+#
+
+# character variables whose first batch has at most this many distinct values per row are dictionary encoded
+DICTIONARY_RATIO = 0.1
+
+
+def arrowschema(meta: dict, sb, df, dictionary: bool = True) -> 'pa.Schema':
+    """
+    Return the Arrow schema for a SAS Data Set: numerics are float64, or date32, timestamp[us] or time64[us] by their
+    format, and character variables are strings, dictionary encoded if they have few distinct values in df.
+
+    :param meta: the variables of the Data Set, from binmeta()
+    :param sb: the SASsession, for its lists of date, time and datetime formats
+    :param df: the first chunk of the Data Set
+    :param dictionary: False to never dictionary encode character variables
+    """
+    import pyarrow as pa
+
+    fields = []
+    for i in range(len(meta['names'])):
+        name = meta['names'][i]
+        fmt  = meta['fmts'][i]
+        if meta['types'][i] == 'N':
+            if fmt in sb.sas_date_fmts:
+                ftype = pa.date32()
+            elif fmt in sb.sas_datetime_fmts:
+                ftype = pa.timestamp('us')
+            elif fmt in sb.sas_time_fmts:
+                ftype = pa.time64('us')
+            else:
+                ftype = pa.float64()
+        else:
+            if dictionary and len(df) and df[name].nunique() <= len(df) * DICTIONARY_RATIO:
+                ftype = pa.dictionary(pa.int32(), pa.string())
+            else:
+                ftype = pa.string()
+        fields.append(pa.field(name, ftype))
+    return pa.schema(fields)
+
+
+def arrowbatch(df, schema: 'pa.Schema') -> 'pa.RecordBatch':
+    """
+    Convert one chunk from sd2df_iter() to a record batch of schema. SAS missing values become nulls.
+    """
+    import pandas  as pd
+    import pyarrow as pa
+
+    arrays = []
+    for field in schema:
+        col = df[field.name]
+        if pa.types.is_dictionary(field.type):
+            arr = pa.array(col, type=pa.string(), from_pandas=True).dictionary_encode()
+        elif pa.types.is_time(field.type):
+            # sd2df reads times as times of today
+            us  = (col - col.dt.normalize()) // pd.Timedelta(1, 'us')
+            arr = pa.array(us, type=pa.int64(), from_pandas=True).cast(field.type)
+        elif pa.types.is_date(field.type) or pa.types.is_timestamp(field.type):
+            arr = pa.array(col, from_pandas=True).cast(field.type, safe=False)
+        else:
+            arr = pa.array(col, type=field.type, from_pandas=True)
+        arrays.append(arr)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def arrowbatches(sas, table: str, libref: str = '', dsopts: dict = None, chunksize: int = 100000,
+                 dictionary: bool = True):
+    """
+    Generator of (schema, record batch) for a SAS Data Set, one batch of chunksize rows at a time, from sd2df_iter().
+    The schema is the same for every batch.
+
+    :param sas: the SASsession
+    :param table: the name of the SAS Data Set
+    :param libref: the libref for the SAS Data Set
+    :param dsopts: data set options for the SAS Data Set
+    :param chunksize: the number of rows in each batch
+    :param dictionary: False to never dictionary encode character variables
+    """
+    import pyarrow
+
+    schema = None
+
+    for df in sas.sd2df_iter(table, libref, dsopts, chunksize):
+        if schema is None:
+            # after the first chunk, so it's the variables the transfer used; STDIO and IOM have them cached by now
+            schema = arrowschema(sas._tablemeta(table, libref, dsopts), sas, df, dictionary)
+        yield schema, arrowbatch(df, schema)
+
+
+def arrowspill(sas, table: str, libref: str = '', dsopts: dict = None, path: str = '',
+               chunksize: int = 100000) -> 'pa.Table':
+    """
+    Stream a SAS Data Set into an Arrow IPC (Feather V2) file at path, writing each chunk as a record batch as it
+    arrives, and return the Table memory mapped from that file. Its columns are read from disk by the OS as they're
+    used, rather than all held in memory, so the Data Set can be many times bigger than memory. Character variables are
+    plain strings, as the IPC file format needs one dictionary for all batches. Returns None if no data was read.
+
+    :param sas: the SASsession
+    :param table: the name of the SAS Data Set
+    :param libref: the libref for the SAS Data Set
+    :param dsopts: data set options for the SAS Data Set
+    :param path: the path of the file to write; it's replaced if it exists
+    :param chunksize: the number of rows in each record batch
+    """
+    import pyarrow as pa
+
+    writer = None
+    try:
+        for schema, batch in arrowbatches(sas, table, libref, dsopts, chunksize, dictionary=False):
+            if writer is None:
+                writer = pa.ipc.new_file(path, schema)
+            writer.write_batch(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        return None
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
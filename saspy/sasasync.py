@@ -0,0 +1,212 @@
+#
+# Copyright SAS Institute
+#
+#  Licensed under the Apache License, Version 2.0 (the License);
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+#
+# AsyncSASsession lets asyncio applications (aiohttp, FastAPI, ...) use saspy without blocking the event loop:
+#
+# import saspy
+# sas = await saspy.AsyncSASsession.create(cfgname='default')
+# ll  = await sas.submit('proc print data=sashelp.class; run;')
+# df  = await sas.sd2df('class', 'sashelp')
+# await sas.endsas()
+#
+
+import asyncio
+import functools
+
+from saspy.sasbase import SASsession
+
+
+class AsyncSASsession():
+    """
+    **Overview**
+
+    This is the asyncio interface to a SAS session. It wraps a :class:`saspy.SASsession` and has coroutine versions of its
+    main methods, so an event loop can drive many SAS sessions at once; for submit() on STDIO and IOM, without a thread
+    per session.
+
+    Only submit() on STDIO and IOM is asyncio native: it waits on the session's pipes or sockets with the event loop's
+    add_reader(), and holds no thread while SAS runs.
+
+    Everything else is thread-backed: it runs blocking code in the event loop's executor. submit() for HTTP makes each of
+    its REST calls (submitting the job, each poll of the job state, getting the LOG and LST) there, though it holds no
+    thread in between, while it waits with asyncio.sleep(). submit() for COM, submit_batch(), and the data transfers
+    sd2df(), df2sd(), upload() and download() run the whole SASsession method there, holding an executor thread until
+    it's done. The transfers read and write their own data sockets and files deep in each access method's parser, and
+    there is no async HTTP client among saspy's dependencies, so they aren't rewritten for the event loop.
+    Only one call runs at a time on a session; the rest wait their turn, as they would on the SAS side anyway.
+    Cancelling a call (as asyncio.wait_for() does when it times out) stops the wait, but not the call: it runs to the end
+    of its step, reading all of its output, and the next call on the session waits until it has.
+
+    Use create() to start a new SAS session without blocking, or pass a SASsession you already have.
+
+    :param sas: the :class:`saspy.SASsession` to use
+    """
+
+    def __init__(self, sas: SASsession):
+        self.sas   = sas
+        # made in the running loop, the first time it's needed
+        self._lock = None
+
+    @classmethod
+    async def create(cls, **kwargs) -> 'AsyncSASsession':
+        """
+        Start a new SAS session in the event loop's executor and return the AsyncSASsession for it.
+
+        :param kwargs: the same parameters as :class:`saspy.SASsession` takes
+        :return: AsyncSASsession
+        """
+        loop = asyncio.get_running_loop()
+        sas  = await loop.run_in_executor(None, functools.partial(SASsession, **kwargs))
+        return cls(sas)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.endsas()
+
+    def __repr__(self):
+        return 'Async' + repr(self.sas)
+
+    async def _run(self, func, *args, **kwargs):
+        """
+        Run a blocking SASsession method in the event loop's executor, one at a time per session.
+        """
+        loop = asyncio.get_running_loop()
+        return await self._exclusive(lambda: loop.run_in_executor(None, functools.partial(func, *args, **kwargs)))
+
+    async def _exclusive(self, start):
+        """
+        Take the session's lock, call start() to start a SAS call as a future (or task), and await it. The lock is
+        released when the call is done, not when the wait ends, so if the wait is cancelled, nothing else runs on the
+        session until the call has finished.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        lock = self._lock
+
+        await lock.acquire()
+        try:
+            fut = start()
+        except BaseException:
+            lock.release()
+            raise
+        fut.add_done_callback(functools.partial(self._release, lock))
+        return await asyncio.shield(fut)
+
+    @staticmethod
+    def _release(lock, fut):
+        lock.release()
+        if not fut.cancelled():
+            # retrieve it, so the error of a call nobody is waiting for any more isn't reported as never retrieved
+            fut.exception()
+
+    async def submit(self, code: str, results: str = '', prompt: dict = None) -> dict:
+        """
+        This is the coroutine version of :meth:`saspy.SASsession.submit`; see it for the parameters.
+        It's asyncio native for STDIO and IOM, and thread-backed for HTTP and COM (see the class).
+
+        :return: a dict with the LOG and LST of the code
+        """
+        sas = self.sas
+
+        if sas.nosub:
+            return dict(LOG=code, LST='')
+
+        prompt = prompt if prompt is not None else {}
+
+        if results == '':
+            if sas.results.upper() == 'PANDAS':
+                results = 'HTML'
+            else:
+                results = sas.results
+
+        if not hasattr(sas._io, 'submit_async'):
+            return await self._run(sas._io.submit, code, results, prompt)
+
+        return await self._exclusive(lambda: asyncio.ensure_future(sas._io.submit_async(code, results, prompt)))
+
+    async def submit_batch(self, code_list: list, results: str = '') -> list:
+        """
+        This is the coroutine version of :meth:`saspy.SASsession.submit_batch`; see it for the parameters.
+        It runs in the event loop's executor.
+
+        :return: a list with a dict of the LOG and LST of each block
+        """
+        return await self._run(self.sas.submit_batch, code_list, results)
+
+    async def sd2df(self, table: str, libref: str = '', dsopts: dict = None, method: str = 'MEMORY', **kwargs) -> 'pd.DataFrame':
+        """
+        This is the coroutine version of :meth:`saspy.SASsession.sd2df`; see it for the parameters.
+        It runs in the event loop's executor.
+
+        :return: Pandas data frame
+        """
+        return await self._run(self.sas.sd2df, table, libref, dsopts, method, **kwargs)
+
+    async def df2sd(self, df: 'pd.DataFrame', table: str = '_df', libref: str = '', results: str = '',
+                    keep_outer_quotes: bool = False, **kwargs) -> 'SASdata':
+        """
+        This is the coroutine version of :meth:`saspy.SASsession.df2sd`; see it for the parameters.
+        It runs in the event loop's executor.
+
+        :return: SASdata object
+        """
+        return await self._run(self.sas.df2sd, df, table, libref, results, keep_outer_quotes, **kwargs)
+
+    async def upload(self, localfile: str, remotefile: str, overwrite: bool = True, permission: str = '', **kwargs):
+        """
+        This is the coroutine version of :meth:`saspy.SASsession.upload`; see it for the parameters.
+        It runs in the event loop's executor.
+
+        :return: SAS Log
+        """
+        return await self._run(self.sas.upload, localfile, remotefile, overwrite, permission, **kwargs)
+
+    async def download(self, localfile: str, remotefile: str, overwrite: bool = True, **kwargs):
+        """
+        This is the coroutine version of :meth:`saspy.SASsession.download`; see it for the parameters.
+        It runs in the event loop's executor.
+
+        :return: SAS Log
+        """
+        return await self._run(self.sas.download, localfile, remotefile, overwrite, **kwargs)
+
+    async def exist(self, table: str, libref: str = '') -> bool:
+        """
+        This is the coroutine version of :meth:`saspy.SASsession.exist`; see it for the parameters.
+        It runs in the event loop's executor.
+
+        :return: boolean True if the Data Set exists, else False
+        """
+        return await self._run(self.sas.exist, table, libref)
+
+    def saslog(self, last_n_steps: int = None, start: int = None, end: int = None) -> str:
+        """
+        This method is used to get the current, full contents of the SASLOG, or part of it; see
+        :meth:`saspy.SASsession.saslog`.
+
+        :return: SAS log
+        :rtype: str
+        """
+        return self.sas.saslog(last_n_steps, start, end)
+
+    async def endsas(self):
+        """
+        This method terminates the SAS session, shutting down the SAS process.
+        """
+        return await self._run(self.sas.endsas)
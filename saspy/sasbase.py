@@ -37,13 +37,17 @@
 #
 
 import os
+import re
 import sys
+import atexit
 import datetime
 import getpass
+import importlib.util
 import tempfile
+import threading
+import time
+import uuid
 
-from saspy.sasioiom      import SASsessionIOM
-from saspy.sasiocom      import SASSessionCOM
 from saspy.sasets        import SASets
 from saspy.sasexceptions import SASIONotSupportedError, SASConfigNotValidError
 from saspy.sasml         import SASml
@@ -52,6 +56,7 @@ from saspy.sasstat       import SASstat
 from saspy.sasutil       import SASutil
 from saspy.sasViyaML     import SASViyaML
 from saspy.sasdata       import SASdata
+from saspy.sasiocommons  import SASevent, SASlogLines, SASschema, binmeta
 
 try:
    import saspy.sascfg_personal as SAScfg
@@ -61,17 +66,21 @@ except ImportError:
    except ImportError:
       import saspy.sascfg as SAScfg
 
-if os.name != 'nt':
-   from saspy.sasiostdio import SASsessionSTDIO
-
-from saspy.sasiohttp import SASsessionHTTP
+# IPython, pandas and the access method modules are imported when first used, not when saspy is imported
+def DISPLAY(x):
+   try:
+      from IPython.display import display
+   except ImportError:
+      print(x)
+   else:
+      display(x)
 
-try:
-   from IPython.display import HTML
-   from IPython.display import display as DISPLAY
-except ImportError:
-   def DISPLAY(x): print(x)
-   def HTML(x):    return "IPython didn't import. Can't render HTML"
+def HTML(x):
+   try:
+      from IPython.display import HTML
+   except ImportError:
+      return "IPython didn't import. Can't render HTML"
+   return HTML(x)
 
 def zepDISPLAY(x):
    print(x)
@@ -79,6 +88,61 @@ def zepDISPLAY(x):
 def zepHTML(x):
    return("%html "+x)
 
+# what the SAS session is like; read back from the LOG by SASsession.__init__
+_sysvars = """options nosource;
+    %put WORKPATH=%sysfunc(pathname(work));
+    %put ENDWORKPATH=;
+    %put ENCODING=&SYSENCODING;
+    %put SYSVLONG=&SYSVLONG4;
+    %put SYSJOBID=&SYSJOBID;
+    %put SYSSCP=&SYSSCP;
+    %put SD2DFB_PROBE=%sysfunc(putn(1, hex16.));
+    %put SD2DFB_ENDIAN=&SYSENDIAN;
+    options source;
+"""
+
+# SAS sessions started ahead of time for configurations with 'standby', keyed by the SASsession parameters they were
+# started with. Only their processes are started: SAS (or, for IOM, the Java client) starts up on its own, and setting
+# the session up is left for the SASsession that takes it over.
+_standby     = {}
+_standbylock = threading.Lock()
+
+def _standbyget(kwargs: dict):
+    """
+    Return the access method of a standby session started with the same parameters, if one is still alive, else None.
+    """
+    with _standbylock:
+        ready = _standby.setdefault(repr(sorted(kwargs.items())), [])
+        while len(ready):
+            sas = ready.pop(0)
+            io, sas._io = (sas._io if sas._alive() else None), None
+            if io is not None:
+                return io
+    return None
+
+def _standbyfill(n: int, kwargs: dict):
+    """
+    Start enough standby sessions with these parameters to keep n of them. This runs on the caller's thread, so the
+    processes are started from it, and anything they print is printed there. Starting one is just starting its process,
+    without waiting for SAS to start up.
+    """
+    with _standbylock:
+        ready = _standby.setdefault(repr(sorted(kwargs.items())), [])
+        for i in range(n - len(ready)):
+            sas = SASsession(_standby=True, **kwargs)
+            if sas._alive():
+                ready.append(sas)
+
+@atexit.register
+def _standbyend():
+    with _standbylock:
+        for ready in _standby.values():
+            while len(ready):
+                try:
+                    ready.pop()._endsas()
+                except Exception:
+                    pass
+
 class SASconfig:
     """
     This object is not intended to be used directly. Instantiate a SASsession object instead
@@ -90,11 +154,10 @@ class SASconfig:
         self.mode    = ''
         configs      = []
 
-        try:
-           import pandas
+        if importlib.util.find_spec('pandas') is not None:
            self.pandas  = None
-        except Exception as e:
-           self.pandas  = e
+        else:
+           self.pandas  = ImportError("No module named 'pandas'")
 
         cfgfile = kwargs.get('cfgfile', None)
         if cfgfile:
@@ -169,6 +232,9 @@ class SASconfig:
         self.display  = cfg.get('display',  '')
         self.results  = cfg.get('results')
         self.autoexec = cfg.get('autoexec')
+        self.logsize  = cfg.get('logsize', None)
+        self.logspill = cfg.get('logspill', None)
+        self.standby  = cfg.get('standby', None)
 
         indisplay = kwargs.get('display', '')
         if len(indisplay) > 0:
@@ -197,6 +263,31 @@ class SASconfig:
             else:
                 self.autoexec = inautoexec
 
+        inlogsize = kwargs.get('logsize', None)
+        if inlogsize is not None:
+            if lock and self.logsize is not None:
+                print("Parameter 'logsize' passed to SAS_session was ignored due to configuration restriction.")
+            else:
+                self.logsize = inlogsize
+
+        inlogspill = kwargs.get('logspill', None)
+        if inlogspill is not None:
+            if lock and self.logspill is not None:
+                print("Parameter 'logspill' passed to SAS_session was ignored due to configuration restriction.")
+            else:
+                self.logspill = inlogspill
+        if self.logspill is None:
+            self.logspill = False
+
+        instandby = kwargs.get('standby', None)
+        if instandby is not None:
+            if lock and self.standby is not None:
+                print("Parameter 'standby' passed to SAS_session was ignored due to configuration restriction.")
+            else:
+                self.standby = instandby
+        if self.standby is None:
+            self.standby = 0
+
         if java is not None:
             self.mode = 'IOM'
         elif ip is not None:
@@ -240,6 +331,11 @@ class SASsession():
     https://sassoftware.github.io/saspy/install.html#configuration
     These are generally defined in the sascfg_personal.py file as opposed to being specified on the SASsession() invocation.
 
+    Once connected, the startup_times attribute is a dict of how many seconds each part of starting up took: 'connect'
+    (starting SAS or connecting to it), 'bootstrap' (the one submit that sets the session up, which includes the autoexec),
+    and 'total'. With standby, there's also 'standby' (starting the standby processes, after this session is up); if this
+    session took one over, 'connect' is just what was left of starting it.
+
     Common parms for all access methods are:
 
     :param cfgname: the Configuration Definition to use - value in SAS_config_names List in the sascfg_personal.py file
@@ -248,6 +344,9 @@ class SASsession():
     :param results: Type of tabular results to return. default is 'Pandas', other options are 'HTML or 'TEXT'
     :param lrecl: An integer specifying the record length for transferring wide data sets from SAS to Data Frames.
     :param autoexec: A string of SAS code that will be submitted upon establishing a connection
+    :param logsize: Max bytes of the SAS log to keep in memory for saslog(); the oldest steps are dropped past that. Default is no limit
+    :param logspill: True to write the log dropped from memory (see logsize) to a temporary file, so saslog() can still return it
+    :param standby: Number of SAS processes to keep started ahead of time, so the next SASsession with the same parameters doesn't wait for SAS to start up; STDIO and IOM only
     :return: 'SASsession'
     :rtype: 'SASsession'
 
@@ -306,8 +405,15 @@ class SASsession():
 
     # def __init__(self, cfgname: str ='', kernel: 'SAS_kernel' =None, saspath :str ='', options: list =[]) -> 'SASsession':
     def __init__(self, **kwargs):
+        start                  = time.time()
         self._loaded_macros    = False
+        self._bootauto         = False
+        self.startup_times     = {}
         self._obj_cnt          = 0
+        self._kwargs           = {k: v for k, v in kwargs.items() if k != '_standby'}
+        self._sdpool           = None
+        self._tabmeta          = {}
+        self._lastmeta         = None
         self.nosub             = False
         self.sascfg            = SASconfig(**kwargs)
         self.batch             = False
@@ -333,34 +439,56 @@ class SASsession():
             self._io = None
             return
 
-        if self.sascfg.mode in ['STDIO', 'SSH', '']:
+        io      = None
+        standby = self.sascfg.standby and not kwargs.get('_standby', False)
+        if standby:
+            if self.sascfg.mode in ['STDIO', 'SSH', '', 'IOM']:
+                io = _standbyget(kwargs)
+            else:
+                print("Parameter 'standby' is only for the STDIO and IOM access methods; it was ignored.")
+                standby = False
+
+        if io is not None:
+            # its access method was made with the same parameters, as they're what standby sessions are kept by, so
+            # it's just made this session's, and set up; this session keeps its own configuration
+            io._sb   = self
+            self._io = io
+            io._startsas()
+        elif self.sascfg.mode in ['STDIO', 'SSH', '']:
             if os.name != 'nt':
+                from saspy.sasiostdio import SASsessionSTDIO
                 self._io = SASsessionSTDIO(sascfgname=self.sascfg.name, sb=self, **kwargs)
             else:
                 raise SASIONotSupportedError(self.sascfg.mode, alts=['IOM'])
         elif self.sascfg.mode == 'IOM':
+            from saspy.sasioiom import SASsessionIOM
             self._io = SASsessionIOM(sascfgname=self.sascfg.name, sb=self, **kwargs)
         elif self.sascfg.mode == 'COM':
+            from saspy.sasiocom import SASSessionCOM
             self._io = SASSessionCOM(sascfgname=self.sascfg.name, sb=self, **kwargs)
         elif self.sascfg.mode == 'HTTP':
+            from saspy.sasiohttp import SASsessionHTTP
             self._io = SASsessionHTTP(sascfgname=self.sascfg.name, sb=self, **kwargs)
 
-        sysvars = """options nosource;
-            %put WORKPATH=%sysfunc(pathname(work));
-            %put ENDWORKPATH=;
-            %put ENCODING=&SYSENCODING;
-            %put SYSVLONG=&SYSVLONG4;
-            %put SYSJOBID=&SYSJOBID;
-            %put SYSSCP=&SYSSCP;
-            options source;
-        """
-        # Validating encoding is done next, so handle it not being set for
-        # this one call
-        enc = self._io.sascfg.encoding
-        if enc == '':
-           self._io.sascfg.encoding = 'utf_8'
-        res = self.submit(sysvars, "text")['LOG']
-        self._io.sascfg.encoding = enc
+        if kwargs.get('_standby', False):
+            # only the process is started; the SASsession that takes it over sets it up
+            return
+
+        # the access methods run _bootcode() along with their own setup, in one submit, and keep the LOG of it
+        self.startup_times['connect']   = time.time() - start - getattr(self._io, '_boottime', 0)
+        self.startup_times['bootstrap'] = getattr(self._io, '_boottime', 0)
+
+        res = getattr(self._io, '_bootlog', None)
+        if res is None:
+            # Validating encoding is done next, so handle it not being set for
+            # this one call
+            enc = self._io.sascfg.encoding
+            if enc == '':
+               self._io.sascfg.encoding = 'utf_8'
+            boot = time.time()
+            res  = self.submit(_sysvars, "text")['LOG']
+            self.startup_times['bootstrap'] = time.time() - boot
+            self._io.sascfg.encoding = enc
 
         vlist         = res.rpartition('SYSSCP=')
         self.hostsep  = vlist[2].partition('\n')[0]
@@ -373,6 +501,9 @@ class SASsession():
         vlist         = res.rpartition('\nENDWORKPATH=')
         self.workpath = vlist[0].rpartition('WORKPATH=')[2].strip().replace('\n','') 
 
+        # whether numerics are IEEE doubles, and their byte order, for df2sd(method='BINARY')
+        self._binhost = binmeta(res)
+
         # validate encoding
         pyenc = sas_encoding_mapping[self.sascei]
         if pyenc is not None:
@@ -403,8 +534,18 @@ class SASsession():
             self.hostsep = '/'
         self.workpath = self.workpath + self.hostsep
 
-        if self.sascfg.autoexec:
+        if self.sascfg.autoexec and not self._bootauto:
+            boot = time.time()
             self.submit(self.sascfg.autoexec)
+            self.startup_times['autoexec'] = time.time() - boot
+
+        if standby:
+            # once this session is up, so theirs don't slow it down
+            boot = time.time()
+            _standbyfill(self.sascfg.standby, kwargs)
+            self.startup_times['standby'] = time.time() - boot
+
+        self.startup_times['total'] = time.time() - start
 
     def __repr__(self):
         """
@@ -452,9 +593,33 @@ class SASsession():
 
     def _endsas(self):
         self.SASpid = None
+        if self._sdpool is not None:
+           self._sdpool.shutdown()
+           self._sdpool = None
         if self._io:
            return self._io._endsas()
 
+    def _alive(self) -> bool:
+        """
+        Check if the SAS process of this session is still there, without waiting on it.
+        """
+        if self._io is None or (self.SASpid is None and not getattr(self._io, '_spawned', False)):
+            return False
+
+        # the access methods set these to None once they know the process is gone
+        if getattr(self._io, 'pid', 1) is None or getattr(self._io, '_session', 1) is None:
+            return False
+
+        pid = getattr(self._io, 'pid', None)
+        if os.name != 'nt' and isinstance(pid, int):
+            try:
+                # WNOWAIT leaves the process for the access method to reap, as it expects to
+                rc = os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+            except ChildProcessError:
+                return False
+            return rc is None
+        return True
+
     def _getlog(self, **kwargs):
         return self._io._getlog(**kwargs)
 
@@ -521,14 +686,103 @@ class SASsession():
 
         return ll
 
-    def saslog(self) -> str:
+    def submit_stream(self, code: str, results: str = '', prompt: dict = None):
+        '''
+        This method is a generator version of submit(). Instead of returning the whole LOG and LST after the code has finished,
+        it yields events as SAS produces the output, so you can follow the progress of a long running job and only keep
+        what you need, instead of holding all of the output in memory.
+
+        - code    - the SAS statements you want to execute
+        - results - format of results. 'HTML' by default, alternatively 'TEXT'
+        - prompt  - dict of names:flags to prompt for; see submit()
+
+        Each event is a SASevent(type, data) namedtuple, with type being one of:
+
+        - 'LOG'  - data is one line of the LOG
+        - 'STEP' - a DATA or PROC step finished; data is the NOTE: line in the LOG that said so
+        - 'LST'  - data is the next chunk of the listing (HTML or TEXT)
+        - 'DONE' - the code has finished; this is always the last event
+
+        .. code-block:: python
+
+            for ev in sas.submit_stream("proc means data=sashelp.cars; run;", results='text'):
+                if ev.type == 'LOG':
+                    print(ev.data)
+
+        Access methods that can't stream (COM) return the events all at once when the code has finished.
+        '''
+        if self.nosub:
+            yield SASevent('LOG', code)
+            yield SASevent('DONE', None)
+            return
+
+        prompt = prompt if prompt is not None else {}
+
+        if results == '':
+            if self.results.upper() == 'PANDAS':
+                results = 'HTML'
+            else:
+                results = self.results
+
+        if hasattr(self._io, 'submit_stream'):
+            for ev in self._io.submit_stream(code, results, prompt):
+                yield ev
+            return
+
+        ll    = self._io.submit(code, results, prompt)
+        lines = SASlogLines()
+        for ev in lines.events(ll['LOG'].split('\n')):
+            yield ev
+        if len(ll['LST']):
+            yield SASevent('LST', ll['LST'])
+        yield SASevent('DONE', None)
+
+    def submit_batch(self, code_list: list, results: str = '') -> list:
+        '''
+        This method submits a list of code blocks together and returns the LOG and LST of each one. Rather than waiting
+        for each block to finish before sending the next, like calling submit() for each would, all of the blocks are sent
+        at once, so a batch of small steps costs one round trip instead of one per step.
+
+        - code_list - list of strings of SAS statements; each one is a block
+        - results   - format of results. 'HTML' by default, alternatively 'TEXT'
+
+        Returns a list with a dict for each block, in order, with the same LOG and LST keys as submit() returns.
+
+        .. code-block:: python
+
+            ll = sas.submit_batch(["data a; x=1; run;", "proc print data=a; run;"], results='text')
+            print(ll[1]['LST'])
+
+        STDIO batches both HTML and TEXT results. IOM and HTTP batch TEXT results only; with HTML results, IOM submits the
+        blocks one after the other, and HTTP sends each block as its own job. Access methods that can't batch (COM)
+        submit the blocks one after the other.
+        '''
+        if self.nosub:
+            return [dict(LOG=code, LST='') for code in code_list]
+
+        if results == '':
+            if self.results.upper() == 'PANDAS':
+                results = 'HTML'
+            else:
+                results = self.results
+
+        if hasattr(self._io, 'submit_batch'):
+            return self._io.submit_batch(code_list, results)
+
+        return [self._io.submit(code, results) for code in code_list]
+
+    def saslog(self, last_n_steps: int = None, start: int = None, end: int = None) -> str:
         """
-        This method is used to get the current, full contents of the SASLOG
+        This method is used to get the current, full contents of the SASLOG, or part of it.
+        How much of the LOG is kept is controlled by the 'logsize' and 'logspill' configuration keys.
 
+        :param last_n_steps: just return the LOG of the last n submits
+        :param start: byte offset of the LOG to start at
+        :param end: byte offset of the LOG to end before
         :return: SAS log
         :rtype: str
         """
-        return self._io.saslog()
+        return self._io.saslog(last_n_steps, start, end)
 
     def teach_me_SAS(self, nosub: bool):
         """
@@ -652,6 +906,24 @@ class SASsession():
 
         return SASViyaML(self)
 
+    def _bootcode(self) -> str:
+        """
+        Return the SAS code for the access method to run along with its own setup, in the same submit, as soon as it has
+        connected: the saspy macros, the autoexec, and the probe of the session that __init__ reads back from the LOG.
+        The autoexec is left to run on its own afterward if it isn't plain ASCII, as the session encoding isn't known yet.
+        """
+        macro_path = os.path.dirname(os.path.realpath(__file__))
+        fd   = open(macro_path + os.sep + 'libname_gen.sas')
+        code = 'options nosource;\n' + fd.read() + '\noptions source;\n'
+        fd.close()
+        self._loaded_macros = True
+
+        if self.sascfg.autoexec and self.sascfg.autoexec.isascii():
+            code += self.sascfg.autoexec + '\n;*\';*";*/;\n'
+            self._bootauto = True
+
+        return code + _sysvars
+
     def _loadmacros(self):
         """
         Load the SAS macros at the start of the session
@@ -855,29 +1127,65 @@ class SASsession():
         return log
      
     def df2sd(self, df: 'pd.DataFrame', table: str = '_df', libref: str = '',
-              results: str = '', keep_outer_quotes: bool = False) -> 'SASdata':
+              results: str = '', keep_outer_quotes: bool = False, method: str = 'MEMORY',
+              lengths: dict = None, if_exists: str = 'replace', schema: 'SASschema' = None,
+              check_lengths: bool = None) -> 'SASdata':
         """
         This is an alias for 'dataframe2sasdata'. Why type all that?
 
-        :param df: :class:`pandas.DataFrame` Pandas Data Frame to import to a SAS Data Set
+        :param df: :class:`pandas.DataFrame` Pandas Data Frame to import to a SAS Data Set, or an iterable of them
         :param table: the name of the SAS Data Set to create
         :param libref: the libref for the SAS Data Set being created. Defaults to WORK, or USER if assigned
         :param results: format of results, SASsession.results is default, PANDAS, HTML or TEXT are the alternatives
         :param keep_outer_quotes: the defualt is for SAS to strip outer quotes from delimitted data. This lets you keep them
+        :param method: defaults to MEMORY; the original method, which sends the values as delimited text.
+            BINARY (STDIO and IOM) sends each row as one fixed width record: numerics as 8 byte doubles, so they arrive
+            bit for bit, and character columns padded to their longest value, with their outer quotes kept
+        :param lengths: a dictionary of { column: length } for character columns, in bytes, to use instead of the length
+            of their longest value
+        :param if_exists: replace (the default) or append; append adds the rows to the Data Set with PROC APPEND
+        :param schema: a SASschema, from sasschema(), to make the Data Set with instead of working out the lengths of
+            the character columns from the Data Frame
+        :param check_lengths: check every character value fits its variable; by default only without a schema
         :return: SASdata object
         """
-        return self.dataframe2sasdata(df, table, libref, results, keep_outer_quotes)
+        return self.dataframe2sasdata(df, table, libref, results, keep_outer_quotes, method, lengths, if_exists, schema,
+                                      check_lengths)
 
     def dataframe2sasdata(self, df: 'pd.DataFrame', table: str = '_df', libref: str = '',
-                          results: str = '', keep_outer_quotes: bool = False) -> 'SASdata':
+                          results: str = '', keep_outer_quotes: bool = False, method: str = 'MEMORY',
+                          lengths: dict = None, if_exists: str = 'replace',
+                          schema: 'SASschema' = None, check_lengths: bool = None) -> 'SASdata':
         """
         This method imports a Pandas Data Frame to a SAS Data Set, returning the SASdata object for the new Data Set.
 
-        :param df: Pandas Data Frame to import to a SAS Data Set
+        df can also be an iterable of Data Frames, like pd.read_csv(..., chunksize=) or the record batches of a Parquet
+        file converted with to_pandas(), for data too big to hold in memory at once. They're sent one at a time, all
+        to the same data step. The columns, their kinds and the lengths of the character columns are fixed by the first
+        one (use lengths to leave room for longer values), and if a later one doesn't fit them, the Data Set isn't
+        created.
+
+        :param df: Pandas Data Frame to import to a SAS Data Set, or an iterable of them
         :param table: the name of the SAS Data Set to create
         :param libref: the libref for the SAS Data Set being created. Defaults to WORK, or USER if assigned
         :param results: format of results, SASsession.results is default, PANDAS, HTML or TEXT are the alternatives
         :param keep_outer_quotes: the defualt is for SAS to strip outer quotes from delimitted data. This lets you keep them
+        :param method: defaults to MEMORY; the original method, which sends the values as delimited text.
+            BINARY (STDIO and IOM) sends each row as one fixed width record: numerics as 8 byte doubles, so they arrive
+            bit for bit, and character columns padded to their longest value, with their outer quotes kept
+        :param lengths: a dictionary of { column: length } for character columns, in bytes, to use instead of the length
+            of their longest value
+        :param if_exists: replace (the default) or append; append imports the data into a WORK Data Set and adds it to
+            this one with PROC APPEND, which doesn't rewrite the rows already there (or creates it, if it doesn't exist).
+            replace imports one Data Frame straight into the Data Set; an iterable of them goes into a Data Set in the
+            same library that is renamed once it's complete, so if they can't all be imported, the Data Set that was
+            there is kept
+        :param schema: a SASschema, from sasschema(), to make the Data Set with instead of working out the lengths of
+            the character columns from the Data Frame; a Data Frame with other columns isn't imported
+        :param check_lengths: check that every character value fits its variable, which means encoding every value to
+            get its length in bytes; a Data Frame with one that doesn't isn't imported. By default this is done without
+            a schema (for Data Frames after the first), and not with one, when longer values are truncated.
+            method='BINARY' always checks, as it encodes the values anyway
         :return: SASdata object
         """
         if self.sascfg.pandas:
@@ -888,19 +1196,84 @@ class SASsession():
               print("The libref specified is not assigned in this SAS Session.")
               return None
 
+        if if_exists.lower() not in ('replace', 'append'):
+           print("if_exists must be replace or append, not "+str(if_exists)+".")
+           return None
+
         if results == '':
             results = self.results
         if self.nosub:
             print("too complicated to show the code, read the source :), sorry.")
             return None
+        elif if_exists.lower() == 'append':
+            stage  = self._df2sdstage('_df2sdap')
+            loaded = self._io.dataframe2sasdata(df, stage, 'work', keep_outer_quotes, method=method,
+                                                lengths=lengths, schema=schema, check_lengths=check_lengths)
+            if not loaded or not self.exist(stage, 'work'):
+                return None
+
+            base = (libref + '.' if libref else '') + table
+            ll   = self._io.submit("proc append base=" + base + " data=work." + stage + "; run;\n"
+                                   "proc delete data=work." + stage + "; run;\n", 'text')
+            if re.search(r'^ERROR', ll['LOG'], re.M):
+                print("The Data Frames couldn't be appended to " + base + ".\n" + ll['LOG'])
+                return None
+        elif hasattr(df, 'columns') and hasattr(df, 'iloc'):
+            # one Data Frame is checked before any of it is sent, so it goes straight into the Data Set
+            loaded = self._io.dataframe2sasdata(df, table, libref, keep_outer_quotes, method=method,
+                                                lengths=lengths, schema=schema, check_lengths=check_lengths)
+            if not loaded:
+                return None
         else:
-            self._io.dataframe2sasdata(df, table, libref, keep_outer_quotes)
+            # an iterable of them is made under another name in the same library and renamed once it's complete, so if
+            # a later Data Frame doesn't fit, the Data Set that was there is left as it was
+            stage  = self._df2sdstage('_df2sdst')
+            loaded = self._io.dataframe2sasdata(df, stage, libref, keep_outer_quotes, method=method,
+                                                lengths=lengths, schema=schema, check_lengths=check_lengths)
+            if not loaded or not self.exist(stage, libref):
+                return None
+
+            lib = " lib=" + libref if libref else ""
+            ll  = self._io.submit("proc datasets" + lib + " nolist nowarn;\ndelete " + table + ";\n"
+                                  "change " + stage + "=" + table + ";\nrun; quit;\n", 'text')
+            if re.search(r'^ERROR', ll['LOG'], re.M):
+                print("The new Data Set couldn't replace " + (libref + '.' if libref else '') + table + ".\n" +
+                      ll['LOG'])
+                return None
 
         if self.exist(table, libref):
             return SASdata(self, libref, table, results)
         else:
             return None
 
+    def _df2sdstage(self, prefix: str) -> str:
+        """
+        Return a name for df2sd() to stage a Data Set under: prefix and 8 random hex digits, so two df2sd()s don't share
+        one, and it won't be the name of a Data Set that's already there, without a submit to check.
+        """
+        return prefix + uuid.uuid4().hex[:8]
+
+    def sasschema(self, df: 'pd.DataFrame', lengths: dict = None, formats: dict = None) -> 'SASschema':
+        """
+        This method returns the SASschema df2sd() would make the SAS Data Set from df with: the names, kinds, lengths and
+        formats of its variables. Pass it to df2sd(..., schema=) to load more Data Frames like df without measuring their
+        character values again, which for wide or long text columns is much of the time df2sd() takes.
+
+        :param df: :class:`pandas.DataFrame` the Data Frame, or a sample of one, to take the schema from
+        :param lengths: a dictionary of { column: length } for character columns, in bytes, to use instead of the length
+            of their longest value; leave room for longer values in later Data Frames
+        :param formats: a dictionary of { column: format } for any of the columns
+        :return: SASschema object
+        """
+        if self.sascfg.pandas:
+           raise type(self.sascfg.pandas)(self.sascfg.pandas.msg)
+
+        try:
+           return SASschema.from_df(df, self._io.sascfg.encoding, lengths, formats)
+        except ValueError as e:
+           print(str(e))
+           return None
+
     def sd2df(self, table: str, libref: str = '', dsopts: dict = None, method: str = 'MEMORY',
               **kwargs) -> 'pd.DataFrame':
         """
@@ -928,6 +1301,7 @@ class SASsession():
                               'format'  : {'money': 'dollar10', 'time': 'tod5.'}
                              }
         :param method: defaults to MEMORY; the original method. CSV is the other choice which uses an intermediary csv file; faster for large data
+            BINARY (STDIO and IOM) transfers numerics as 8 byte doubles rather than text; fastest for large numeric data
         :param kwargs: dictionary
         :return: Pandas data frame
         """
@@ -997,13 +1371,34 @@ class SASsession():
                              }
 
         :param method: defaults to MEMORY; the original method. CSV is the other choice which uses an intermediary csv file; faster for large data
-        :param kwargs: dictionary
+            BINARY (STDIO and IOM) transfers numerics as 8 byte doubles rather than text; fastest for large numeric data
+        :param kwargs: dictionary; parallel=N splits the rows into N ranges and fetches them at the same time, each in
+            its own SAS session of a pool kept for later calls; parallel= can also be a SASsessionPool to use instead
+            (see _sd2dfparallel(); parallel_timeout= is how many seconds each one's socket waits for SAS). dtype_policy=True, or a dict of any of 'category', 'integer' and 'float32', converts the columns
+            to smaller dtypes using the variables' types, formats and lengths:
+
+            - category: character variables with at most this many distinct values per row become category (0.1)
+            - integer: numerics with an integer format (w., Fw., COMMAw. ...) or a length under 8 become the smallest
+              nullable integer dtype (Int8 ... Int64) that holds them, when all their values are whole numbers (True)
+            - float32: other numerics, other than dates, times and datetimes, become float32 (False)
+
+            .. code-block:: python
+
+                             df = sas.sd2df('big', 'mylib', dtype_policy={'category': 0.01, 'float32': True})
+
+            spill='path' (requires pyarrow) streams the data into an Arrow IPC file at path instead, and returns it
+            as a pyarrow.Table memory mapped from that file, for tables bigger than memory (see sasarrow.arrowspill());
+            method, parallel and dtype_policy don't apply, and trows= sets the rows in each record batch
         :return: Pandas data frame
         """
         if self.sascfg.pandas:
            raise type(self.sascfg.pandas)(self.sascfg.pandas.msg)
 
-        dsopts = dsopts if dsopts is not None else {}
+        dsopts   = dsopts if dsopts is not None else {}
+        parallel = kwargs.pop('parallel', 1)
+        ptimeout = kwargs.pop('parallel_timeout', 600)
+        policy   = kwargs.pop('dtype_policy', None)
+        spill    = kwargs.pop('spill', None)
         if self.exist(table, libref) == 0:
             print('The SAS Data Set ' + libref + '.' + table + ' does not exist')
             return None
@@ -1011,9 +1406,230 @@ class SASsession():
         if self.nosub:
             print("too complicated to show the code, read the source :), sorry.")
             return None
+        elif spill:
+            from saspy.sasarrow import arrowspill
+            return arrowspill(self, table, libref, dsopts, spill, kwargs.get('trows') or 100000)
+
+        self._lastmeta = None
+        if not isinstance(parallel, int) or parallel > 1:
+            df = self._sd2dfparallel(table, libref, dsopts, method, parallel, ptimeout, **kwargs)
         else:
+            df = self._io.sasdata2dataframe(table, libref, dsopts, method=method, **kwargs)
+
+        if policy and df is not None and not isinstance(df, str):
+            from saspy.sasiocommons import leandtypes
+            # the variables the transfer used, if it got them from _tablemeta() in this session (STDIO and IOM do);
+            # otherwise (HTTP, COM, parallel=) they take a submit
+            meta = self._lastmeta
+            if meta is None or meta[0] != self._tablemetakey(table, libref, dsopts):
+                meta = (None, self._tablemeta(table, libref, dsopts))
+            df = leandtypes(df, meta[1], self, policy)
+        return df
+
+    def _sd2dfparallel(self, table: str, libref: str, dsopts: dict, method: str, parallel,
+                       timeout: float = 600, **kwargs) -> 'pd.DataFrame':
+        """
+        sasdata2dataframe() for parallel=N. A single SAS session formats the rows of one data step at a time, so this
+        splits the rows, counted with NLOBSF (which honors the where, firstobs and obs of dsopts), into N firstobs=/obs=
+        ranges and has N more sessions each fetch one range at the same time. The library is assigned read only in each
+        of them from its path in this session, so this works for tables in WORK too, as long as the library is a BASE
+        engine directory the other sessions can read. The parts are joined in row order. For method='CSV', each session
+        writes its own temp file; tempfile= and tempkeep= only apply if this falls back to a single session.
+
+        The sessions are a SASsessionPool started with this session's parameters the first time, and kept for the
+        later calls (and ended with this session); if the configuration has standby, they take over standby processes.
+        parallel= can also be a SASsessionPool you already have, whose sessions are used instead, and left running.
+
+        If the rows can't be counted, the library isn't a BASE engine one with a path, it's WORK of an HTTP session
+        (which no other Compute session can read), the table can't be seen from the other sessions, or a session's
+        transfer fails, this says why and falls back to fetching the table in this session. So that one session whose
+        data step never connects can't hold up the rest, the STDIO sessions' sockets give up after parallel_timeout=
+        seconds (600) of waiting for SAS to connect or send more.
+        """
+        import pandas as pd
+        from saspy.sasiocommons import concatchunks
+        from saspy.saspool import SASsessionPool
+
+        pool = parallel if isinstance(parallel, SASsessionPool) else None
+        size = pool.size if pool is not None else parallel
+
+        if libref:
+            lib = "lib = '" + libref + "';\n"
+        else:
+            lib = "if libref('USER') = 0 then lib = 'USER'; else lib = 'WORK';\n"
+        member = (libref + '.' if libref else '') + table
+
+        code  = "proc sql; create view work._sd2dfp as select * from " + member
+        code += self._dsopts(dsopts) + ";quit;\n"
+        code += "data _null_; length lib $8 path $1024 eng $8; d = open('work._sd2dfp'); n = attrn(d, 'NLOBSF'); rc = close(d);\n"
+        code += "m = open('" + member.replace("'", "''") + "'); if m then do; eng = attrc(m, 'ENGINE'); rc = close(m); end;\n"
+        code += lib + "path = pathname(lib); put 'SD2DFP_NOBS=' n; put 'SD2DFP_PATH=' path;\n"
+        code += "put 'SD2DFP_LIB=' lib; put 'SD2DFP_ENGINE=' eng;\nrun;\n"
+        code += "proc sql; drop view work._sd2dfp;quit;\n"
+
+        ll   = self._io.submit(code, 'text')
+        info = dict(SD2DFP_NOBS='', SD2DFP_PATH='', SD2DFP_LIB='', SD2DFP_ENGINE='')
+        for line in ll['LOG'].split('\n'):
+            key, eq, val = line.partition('=')
+            if key in info:
+                info[key] = val.strip()
+        nobs = int(info['SD2DFP_NOBS']) if info['SD2DFP_NOBS'].isdigit() else 0
+        path = info['SD2DFP_PATH']
+
+        if nobs < size:
+            return self._io.sasdata2dataframe(table, libref, dsopts, method=method, **kwargs)
+
+        why = ''
+        if info['SD2DFP_ENGINE'] not in ('V9', 'BASE'):
+            why = "its library uses the " + (info['SD2DFP_ENGINE'] or 'unknown') + " engine, and the other sessions can only " \
+                  "read a BASE engine library, by its path"
+        elif not path:
+            why = "its library has no path the other sessions could assign"
+        elif info['SD2DFP_LIB'] == 'WORK' and self.sascfg.mode == 'HTTP':
+            why = "it's in WORK, which other Compute sessions can't read"
+        if why:
+            print("Can't fetch " + member + " in parallel: " + why + ". Fetching it in this SAS session instead.")
+            return self._io.sasdata2dataframe(table, libref, dsopts, method=method, **kwargs)
+
+        if not path.startswith('('):
+            path = "'" + path.replace("'", "''") + "'"
+
+        first  = int(dsopts.get('firstobs') or 1)
+        step   = -(-nobs // size)
+        ranges = [(first + i, first + min(i + step, nobs) - 1) for i in range(0, nobs, step)]
+
+        # the sessions would all write and read the same CSV file at once, so each uses its own temp file
+        pkwargs = {key: val for key, val in kwargs.items() if key not in ('tempfile', 'tempkeep')}
+
+        def fetch(sas, rng):
+            opts             = dict(dsopts)
+            opts['firstobs'] = rng[0]
+            opts['obs']      = rng[1]
+            ll  = sas.submit("libname _sd2dfp " + path + " access=readonly;\n"
+                             "%put SD2DFP_EXIST=%sysfunc(exist(_sd2dfp." + table + ", DATA))%sysfunc(exist(_sd2dfp." +
+                             table + ", VIEW));", 'text')
+            err = [line for line in ll['LOG'].split('\n') if line.startswith('ERROR')]
+            if err:
+                raise RuntimeError("The library couldn't be assigned in a pool session:\n" + '\n'.join(err))
+            if not any(line.startswith('SD2DFP_EXIST=') and '1' in line for line in ll['LOG'].split('\n')):
+                raise RuntimeError("a pool session can't see the table at " + path + "; its library is probably on a disk "
+                                   "only this session's SAS host can read")
+            if hasattr(sas._io, '_socktimeout'):
+                sas._io._socktimeout = timeout
+            return sas.sasdata2dataframe(table, '_sd2dfp', opts, method=method, **pkwargs)
+
+        if pool is None:
+            if self._sdpool is None or self._sdpool.size != size:
+                if self._sdpool is not None:
+                    self._sdpool.shutdown()
+                self._sdpool = SASsessionPool(size=size, **self._kwargs)
+            pool = self._sdpool
+
+        try:
+            dfs = list(pool.map(fetch, ranges))
+        except Exception as e:
+            print("Couldn't fetch the table in parallel: " + str(e) + "\nFetching it in this SAS session instead.")
+            return self._io.sasdata2dataframe(table, libref, dsopts, method=method, **kwargs)
+        if not all(isinstance(df, pd.DataFrame) for df in dfs):
+            print("Couldn't fetch the table in parallel. Fetching it in this SAS session instead.")
             return self._io.sasdata2dataframe(table, libref, dsopts, method=method, **kwargs)
 
+        return concatchunks(dfs)
+
+    def sd2df_iter(self, table: str, libref: str = '', dsopts: dict = None, chunksize: int = 100000, **kwargs):
+        """
+        This is a generator version of sd2df(). Rather than returning the whole SAS Data Set as one Pandas Data Frame, it
+        yields it as Data Frames of chunksize rows each (the last one can be shorter), with the same types and date, time
+        and datetime conversions as sd2df(). Only one chunk is held in memory at a time, so tables bigger than memory can
+        be streamed into files, databases or models:
+
+        .. code-block:: python
+
+                        for df in sas.sd2df_iter('big', 'mylib', chunksize=500000):
+                            df.to_sql('big', engine, if_exists='append')
+
+        The STDIO and IOM access methods stream the chunks as they're read from SAS. Other access methods read the
+        whole Data Set with sd2df() and yield it in chunks.
+
+        :param table: the name of the SAS Data Set you want to export to Pandas Data Frames
+        :param libref: the libref for the SAS Data Set.
+        :param dsopts: a dictionary containing any of the following SAS data set options(where, drop, keep, obs, firstobs);
+            see sd2df()
+        :param chunksize: the number of rows in each Data Frame
+        :param kwargs: dictionary
+        :return: generator of Pandas data frames
+        """
+        if self.sascfg.pandas:
+           raise type(self.sascfg.pandas)(self.sascfg.pandas.msg)
+
+        dsopts = dsopts if dsopts is not None else {}
+        if self.exist(table, libref) == 0:
+            print('The SAS Data Set ' + libref + '.' + table + ' does not exist')
+            return
+
+        if self.nosub:
+            print("too complicated to show the code, read the source :), sorry.")
+            return
+
+        if hasattr(self._io, 'sasdata2dataframe_iter'):
+            yield from self._io.sasdata2dataframe_iter(table, libref, dsopts, chunksize=chunksize, **kwargs)
+        else:
+            df = self._io.sasdata2dataframe(table, libref, dsopts, **kwargs)
+            if df is None or isinstance(df, str):
+                return
+            for i in range(0, max(len(df), 1), chunksize):
+                yield df.iloc[i:i+chunksize]
+
+    def _tablemeta(self, table: str, libref: str = '', dsopts: dict = None, file: str = 'LOG',
+                   refresh: bool = False) -> dict:
+        """
+        Return the variables of a SAS Data Set, with dsopts applied, as binmeta() parses them, for the access methods'
+        sasdata2dataframe methods. Getting them takes one submit of one data step. They're cached per (libref, table,
+        dsopts) for the session, and a cache hit takes no submit at all: the meta returned is marked cached, and the
+        transfer's own data step checks the signature of the member's variables before its first row (see
+        metacheckcode()), stopping if it changed. A transfer that reads no rows with cached meta calls _tablestale()
+        to tell an empty table from a stale cache.
+
+        :param table: the name of the SAS Data Set
+        :param libref: the libref for the SAS Data Set.
+        :param dsopts: data set options for the SAS Data Set
+        :param file: the fileref the access method's LOG is written to from a data step; LOG or STDERR
+        :param refresh: True to get them again even if they're cached
+        :return: dict
+        """
+        from saspy.sasiocommons import binmetacode, binmeta
+
+        dsopts = dsopts if dsopts is not None else {}
+        member = (libref + '.' if libref else '') + table
+        key    = self._tablemetakey(table, libref, dsopts)
+        meta   = None if refresh else self._tabmeta.get(key)
+
+        if meta is None:
+            ll   = self._io.submit(binmetacode(member, file, member, self._dsopts(dsopts)), 'text')
+            meta = binmeta(ll['LOG'])
+
+            # a member that couldn't be opened has no signature to check the cache with
+            if meta['sig']:
+                self._tabmeta[key] = dict(meta, cached=True)
+            else:
+                self._tabmeta.pop(key, None)
+        self._lastmeta = (key, meta)
+        return meta
+
+    def _tablestale(self, meta: dict, table: str, libref: str = '', dsopts: dict = None, file: str = 'LOG') -> dict:
+        """
+        For a transfer that read no rows: if meta came from the cache and the member's variables had changed since,
+        so the transfer's data step stopped, return them as they are now, for the transfer to be redone with; else
+        None. Meta that wasn't cached takes no submit; cached meta takes one.
+        """
+        if not meta.get('cached'):
+            return None
+        fresh = self._tablemeta(table, libref, dsopts, file, refresh=True)
+        return fresh if fresh['sig'] != meta['sig'] else None
+
+    def _tablemetakey(self, table: str, libref: str, dsopts: dict) -> tuple:
+        return (libref.upper(), table.upper(), self._dsopts(dsopts))
+
     def _dsopts(self, dsopts):
         """
         :param dsopts: a dictionary containing any of the following SAS data set options(where, drop, keep, obs, firstobs):
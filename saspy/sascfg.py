@@ -44,6 +44,12 @@ SAS_config_names=['default']
 #
 # 'verbose'   - True | False. True = Allow print statements for debug type messages
 #
+# The following keys can be specified in any of the Configuration Definitions below:
+# 'autoexec' - string of SAS code that will be submitted upon establishing a connection
+# 'logsize'  - [integer] max bytes of the SAS log to keep in memory for saslog(); older steps are dropped past this. Default is no limit
+# 'logspill' - True | False. True = write the log dropped from memory (see logsize) to a temporary file instead of discarding it
+# 'standby'  - [integer] number of SAS processes to keep started ahead of time, so a new SASsession doesn't wait for SAS to start. STDIO and IOM only. Default is 0
+#
 SAS_config_options = {'lock_down': False,
                       'verbose'  : True
                      }
@@ -75,6 +81,7 @@ SAS_output_options = {'output' : 'html5'}
 # 'saspath'  - [REQUIRED] path to SAS startup script i.e.: /opt/sasinside/SASHome/SASFoundation/9.4/sas
 # 'options'  - SAS options to include in the start up command line - Python List
 # 'encoding' - This is the python encoding value that matches the SAS session encoding your SAS session is using 
+# 'rsize'    - [integer] max bytes read from the SAS stdout/stderr pipes at a time; defaults to 65536
 #
 # For passwordless ssh connection, the following are also reuqired:
 # 'ssh'     - [REQUIRED] the ssh command to run
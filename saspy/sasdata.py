@@ -978,7 +978,8 @@ class SASdata:
         Export this SAS Data Set to a Pandas Data Frame
 
         :param method: defaults to MEMORY; the original method. CSV is the other choice which uses an intermediary csv file; faster for large data
-        :param kwargs:
+            BINARY (STDIO and IOM) transfers numerics as 8 byte doubles rather than text; fastest for large numeric data
+        :param kwargs: parallel=N, parallel_timeout=, dtype_policy= and spill= are described in :meth:`saspy.SASsession.sasdata2dataframe`
         :return: Pandas data frame
         """
         ll = self._is_valid()
@@ -1002,6 +1003,84 @@ class SASdata:
         """
         return self.to_df(method='CSV', tempfile=tempfile, tempkeep=tempkeep, **kwargs)
 
+    def iter_df(self, chunksize: int = 100000, **kwargs):
+        """
+        Export this SAS Data Set to Pandas Data Frames of chunksize rows each, one at a time; see
+        :meth:`saspy.SASsession.sd2df_iter`
+
+        :param chunksize: the number of rows in each Data Frame
+        :param kwargs:
+        :return: generator of Pandas data frames
+        """
+        ll = self._is_valid()
+        if ll:
+            print(ll['LOG'])
+            return
+        else:
+            yield from self.sas.sd2df_iter(self.table, self.libref, self.dsopts, chunksize, **kwargs)
+
+    def to_arrow(self, chunksize: int = 100000) -> 'pa.Table':
+        """
+        Export this SAS Data Set to an Apache Arrow Table (requires pyarrow). The data is streamed from SAS in chunks of
+        chunksize rows, each converted to an Arrow record batch as it arrives, so the whole table is never a Pandas
+        Data Frame. Numerics with date formats become date32, datetimes timestamp[us] and times time64[us]; other
+        numerics are float64. Character variables are strings, dictionary encoded when they have few distinct values.
+        SAS missing values are nulls.
+
+        :param chunksize: the number of rows in each record batch
+        :return: pyarrow.Table
+        """
+        import pyarrow as pa
+        from saspy.sasarrow import arrowbatches
+
+        ll = self._is_valid()
+        if ll:
+            print(ll['LOG'])
+            return None
+
+        schema  = None
+        batches = []
+        for schema, batch in arrowbatches(self.sas, self.table, self.libref, self.dsopts, chunksize):
+            batches.append(batch)
+
+        if schema is None:
+            return None
+        return pa.Table.from_batches(batches, schema=schema)
+
+    def to_parquet(self, path: str, row_group_size: int = 100000, **kwargs) -> int:
+        """
+        Export this SAS Data Set to a Parquet file (requires pyarrow). Like to_arrow(), the data is streamed from SAS,
+        and each chunk of row_group_size rows is written to the file as a row group as soon as it arrives, so only one
+        row group is in memory at a time.
+
+        :param path: the path of the Parquet file to write
+        :param row_group_size: the number of rows in each row group
+        :param kwargs: passed to pyarrow.parquet.ParquetWriter, i.e. compression='zstd'
+        :return: the number of rows written, or None if the data couldn't be read
+        """
+        import pyarrow        as pa
+        import pyarrow.parquet as pq
+        from saspy.sasarrow import arrowbatches
+
+        ll = self._is_valid()
+        if ll:
+            print(ll['LOG'])
+            return None
+
+        writer = None
+        rows   = 0
+        try:
+            for schema, batch in arrowbatches(self.sas, self.table, self.libref, self.dsopts, row_group_size):
+                if writer is None:
+                    writer = pq.ParquetWriter(path, schema, **kwargs)
+                writer.write_table(pa.Table.from_batches([batch]), row_group_size=row_group_size)
+                rows += batch.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+
+        return rows if writer is not None else None
+
     def to_json(self, pretty: bool = False, sastag: bool = False, **kwargs) -> str:
         """
         Export this SAS Data Set to a JSON Object
@@ -2,7 +2,6 @@ import logging
 
 from functools import wraps
 from saspy.sasproccommons import SASProcCommons
-from pdb import set_trace as bp
 
 class procDecorator:
     def __init__(self):
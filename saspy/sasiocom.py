@@ -26,10 +26,7 @@ try:
 except ImportError:
     pass
 
-try:
-    import pandas as pd
-except ImportError:
-    pass
+from saspy.sasiocommons import SASsessionLog, df2sdchunks
 
 
 class SASConfigCOM(object):
@@ -150,7 +147,7 @@ class SASSessionCOM(object):
     def __init__(self, **kwargs):
         self.sascfg = SASConfigCOM(**kwargs)
         self._sb = kwargs.get('sb')
-        self._log = ''
+        self._log = SASsessionLog(self._sb.sascfg.logsize, self._sb.sascfg.logspill)
 
         self.pid = self._startsas()
 
@@ -408,12 +405,15 @@ class SASSessionCOM(object):
 
         return {'LOG': log, 'LST': listing}
 
-    def saslog(self) -> str:
+    def saslog(self, last_n_steps: int=None, start: int=None, end: int=None) -> str:
         """
-        Return the full SAS log.
+        Return the full SAS log, or part of it.
+        :param last_n_steps [int]: Just the log of the last n submits
+        :param start [int]: Byte offset of the log to start at
+        :param end [int]: Byte offset of the log to end before
         :return [str]:
         """
-        return self._log
+        return self._log.get(last_n_steps, start, end)
 
     def exist(self, table: str, libref: str=None) -> bool:
         """
@@ -525,14 +525,30 @@ class SASSessionCOM(object):
         else:
             return self.submit(proc_code, 'text')['LOG']
 
-    def dataframe2sasdata(self, df: 'pd.DataFrame', table: str, libref: str=None, keep_outer_quotes: bool=False):
+    def dataframe2sasdata(self, df: 'pd.DataFrame', table: str, libref: str=None, keep_outer_quotes: bool=False, **kwargs):
         """
         Create a SAS dataset from a pandas data frame.
         :param df [pd.DataFrame]: Pandas data frame containing data to write.
         :param table [str]: Table name.
         :option libref [str]: Library name. Default work.
         :option keep_outer_quotes [bool]: Not supported.
-        """
+        :option method [str]: Not supported.
+        :option lengths [dict]: Lengths of character columns, in place of their longest value.
+        :option schema [SASschema]: Lengths of character columns, from the character variables of a SASschema.
+        df can also be an iterable of data frames; the table is created from the first, and each is inserted in turn.
+        """
+        import pandas as pd
+
+        chunks = df2sdchunks(df)
+        df     = next(chunks, None)
+        if df is None:
+            print("There are no Data Frames to import.")
+            return None
+        lengths = kwargs.get('lengths') or {}
+        schema  = kwargs.get('schema')
+        if schema is not None:
+            lengths = {schema.names[i]: schema.lengths[i] for i in range(len(schema.names)) if schema.kinds[i] == 'C'}
+
         DATETIME_NAME = 'E8601DT26.6'
         DATETIME_FMT = '%Y-%m-%dT%H:%M:%S.%f'
 
@@ -549,7 +565,7 @@ class SASSessionCOM(object):
                 # Character type
                 # NOTE: If a character string contains a single `'`, replace
                 #       it with `''`. This is the SAS equivalent to `\'`.
-                length = df[name].map(len).max()
+                length = lengths.get(str(name), df[name].map(len).max())
                 definition = "'{}'n char({})".format(name, length)
                 formats[name] = lambda x: "'{}'".format(x.replace("'", "''")) if pd.isnull(x) is False else 'NULL'
             elif df[name].dtypes.kind in self.PD_DT_TYPE:
@@ -560,26 +576,37 @@ class SASSessionCOM(object):
                 # Default to character type
                 # NOTE: If a character string contains a single `'`, replace
                 #       it with `''`. This is the SAS equivalent to `\'`.
-                length = df[name].map(str).map(len).max()
+                length = lengths.get(str(name), df[name].map(str).map(len).max())
                 definition = "'{}'n char({})".format(name, length)
                 formats[name] = lambda x: "'{}'".format(x.replace("'", "''")) if pd.isnull(x) is False else 'NULL'
 
             columns.append(definition)
 
-        sql_values = []
-        for index, row in df.iterrows():
-            vals = []
-            for i, col in enumerate(row):
-                func = formats[df.columns[i]]
-                vals.append(func(col))
+        sql_create = 'create table {} ({});'.format(tablepath, ', '.join(columns))
+        self.adodb.Execute(sql_create)
 
-            sql_values.append('values({})'.format(', '.join(vals)))
+        names = list(df.columns)
+        while df is not None:
+            if list(df.columns) != names:
+                print("A Data Frame doesn't have the same columns as the first one, so the table wasn't created.")
+                self.adodb.Execute('drop table {};'.format(tablepath))
+                return None
 
-        sql_create = 'create table {} ({});'.format(tablepath, ', '.join(columns))
-        sql_insert = 'insert into {} {};'.format(tablepath, '\n'.join(sql_values))
+            sql_values = []
+            for index, row in df.iterrows():
+                vals = []
+                for i, col in enumerate(row):
+                    func = formats[df.columns[i]]
+                    vals.append(func(col))
 
-        self.adodb.Execute(sql_create)
-        self.adodb.Execute(sql_insert)
+                sql_values.append('values({})'.format(', '.join(vals)))
+
+            if sql_values:
+                sql_insert = 'insert into {} {};'.format(tablepath, '\n'.join(sql_values))
+                self.adodb.Execute(sql_insert)
+            df = next(chunks, None)
+
+        return True
 
     def sasdata2dataframe(self, table: str, libref: str=None, dsopts: dict=None, method: str='', **kwargs) -> 'pd.DataFrame':
         """
@@ -592,6 +619,8 @@ class SASSessionCOM(object):
         :option tempfile [str]: File path for the saved output file.
         :return [pd.DataFrame]:
         """
+        import pandas as pd
+
         if method.upper() == 'CSV':
             df = self.sasdata2dataframeCSV(table, libref, dsopts=dsopts, **kwargs)
         else:
@@ -610,6 +639,8 @@ class SASSessionCOM(object):
         :option tempfile [str]: File path for the saved output file.
         :return [pd.DataFrame]:
         """
+        import pandas as pd
+
         FORMAT_STRING = '{column} {format}{length}.{precision}'
         EXPORT = """
             data _saspy_sd2df;
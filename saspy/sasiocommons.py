@@ -0,0 +1,1155 @@
+#
+# Copyright SAS Institute
+#
+#  Licensed under the Apache License, Version 2.0 (the License);
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+# Pieces shared by the access method (sasio*) modules.
+
+import codecs
+import functools
+import re
+import tempfile as tf
+
+from collections import deque, namedtuple
+
+SASevent = namedtuple('SASevent', ['type', 'data'])
+SASevent.__doc__ = """
+An event yielded by submit_stream(). type is one of:
+   'LOG'  - data is one line of the LOG (str, without the newline)
+   'STEP' - a DATA or PROC step finished; data is the NOTE: line of the LOG that said so
+   'LST'  - data is the next chunk of the listing (HTML or TEXT, str)
+   'DONE' - the submitted code has finished; data is None. This is always the last event
+"""
+
+# the NOTE: SAS writes to the LOG when a step finishes
+_stepend = re.compile(r'^NOTE: (DATA statement|PROCEDURE \S+) used \(Total process time\):')
+
+# prefix of saspy's end of step markers
+_marker  = 'E3969440A681A24088859985'
+
+# prefix of the markers submit_batch() writes to the listing between blocks
+_lstmark = 'LST' + _marker
+
+
+def lstmarkcode(logn: str) -> str:
+   """
+   Return the code that writes the listing marker for block logn of a batch (see splitlst()).
+   """
+   return "options nosource nonotes;data _null_;file print;put '"+_lstmark+logn+"';run;options source notes;\n"
+
+
+def lstclean(lst: str) -> str:
+   """
+   Return a listing the way submit() returns it: form feeds as newlines, and ODS HTML left aligned in a normal font.
+   """
+   return lst.replace(chr(12), chr(10)).replace('<body class="c body">',
+                                                '<body class="l body">').replace("font-size: x-small;",
+                                                                                 "font-size:  normal;")
+
+
+def promptcode(prompt: dict, ask) -> tuple:
+   """
+   Prompt for the values of the macro variables in prompt (see submit()) and return the code to define them before the
+   submitted code and clean them up after it, as a tuple of (hidden %lets, visible %lets, cleanup code). Raises
+   KeyboardInterrupt if a prompt is cancelled.
+
+   ask - the function that prompts, sascfg._prompt()
+   """
+   pcodei  = ''
+   pcodeiv = ''
+   pcodeo  = ''
+
+   if len(prompt):
+      pcodei += 'options nosource nonotes;\n'
+      pcodeo += 'options nosource nonotes;\n'
+      for key in prompt:
+         gotit = False
+         while not gotit:
+            var = ask('Please enter value for macro variable '+key+' ', pw=prompt[key])
+            if var is None:
+               raise KeyboardInterrupt
+            if len(var) > 0:
+               gotit = True
+            else:
+               print("Sorry, didn't get a value for that variable.")
+         if prompt[key]:
+            pcodei += '%let '+key+'='+var+';\n'
+            pcodeo += '%symdel '+key+';\n'
+         else:
+            pcodeiv += '%let '+key+'='+var+';\n'
+      pcodei += 'options source notes;\n'
+      pcodeo += 'options source notes;\n'
+
+   return pcodei, pcodeiv, pcodeo
+
+
+def splitlog(log: str, logns: list, mj: str = '') -> list:
+   """
+   Split the LOG of a batch of blocks, each ended by a %put of its end of step marker, into one LOG per block, trimmed
+   the same way submit() trims the LOG of a single block. Lines with saspy's markers in them are dropped.
+
+   log   - the decoded LOG of the whole batch
+   logns - the _logcnt() numbers of the blocks, in order
+   mj    - the quote/comment reset string the blocks are wrapped in
+   """
+   out  = []
+   prev = '%08d' % (int(logns[0]) - 1)
+   for logn in logns:
+      final = log.partition("%put "+_marker+logn+";")
+      z     = final[0].rpartition('\n')
+      zz    = z[0].rpartition('\n'+_marker+prev+'\n')
+      lines = [line.replace(mj, '') if len(mj) else line for line in zz[2].split('\n') if _marker not in line]
+      out.append('\n'.join(lines))
+      log   = final[2]
+      prev  = logn
+   return out
+
+
+def splitlst(lst: str, logns: list) -> list:
+   """
+   Split the TEXT listing of a batch into one listing per block, using the markers written by lstmarkcode() after each
+   block. The page the marker was written on is dropped along with it.
+
+   lst   - the decoded listing of the whole batch
+   logns - the _logcnt() numbers of the blocks, in order
+   """
+   out = []
+   for logn in logns:
+      final = lst.partition(_lstmark+logn)
+      page  = final[0].rpartition(chr(12))
+      lstd  = page[0] if len(page[1]) else final[0].rpartition('\n')[0]
+      out.append(lstd if len(lstd.strip()) else '')
+      lst   = final[2]
+   return out
+
+
+def concatchunks(dfs: list) -> 'pd.DataFrame':
+   """
+   Join the Data Frames sasdata2dataframe() builds every trows rows into one. Each column is copied into a buffer the
+   size of the result, and each chunk is let go of once it's copied, so this needs about one copy of the data, not
+   the two that concat() or append() do. Columns that aren't plain numpy types (strings, or a mix like datetime and
+   float) are joined with concat().
+
+   dfs - the chunks, in order; the list is emptied
+   """
+   import pandas as pd
+   import numpy  as np
+
+   if len(dfs) == 1:
+      return dfs.pop()
+
+   names = list(dfs[0].columns)
+   nrows = sum(len(tdf) for tdf in dfs)
+   bufs  = {}
+   rest  = {}
+
+   for i in range(len(names)):
+      dts = [tdf.dtypes.iloc[i] for tdf in dfs]
+      try:
+         if not all(isinstance(dt, np.dtype) for dt in dts):
+            raise TypeError
+         bufs[i] = np.empty(nrows, dtype=np.result_type(*dts))
+      except TypeError:
+         rest[i] = pd.concat([tdf.iloc[:, i] for tdf in dfs], ignore_index=True)
+
+   pos = 0
+   for j in range(len(dfs)):
+      tdf    = dfs[j]
+      dfs[j] = None
+      for i in bufs:
+         bufs[i][pos:pos+len(tdf)] = tdf.iloc[:, i].to_numpy()
+      pos   += len(tdf)
+   del dfs[:]
+
+   cols = [bufs[i] if i in bufs else rest[i] for i in range(len(names))]
+   df   = pd.DataFrame(dict(zip(range(len(names)), cols)), copy=False)
+   df.columns = names
+   return df
+
+
+class SASrowreader(object):
+   """
+   File like object over the rows sasdata2dataframe()'s data step writes (values ended by colsep, rows by rowsep and a
+   line end), for pandas.read_csv to parse with rowsep as its lineterminator. The line end after each rowsep is dropped
+   as the data goes by, so it doesn't end up at the front of the next row's first value.
+
+   fill   - called for more of the stream; returns bytes, or b'' at the end of it
+   rowsep - the row separator, as bytes
+   end    - a marker that ends the data when it's in the stream, for streams that don't end with it; it's not returned
+   """
+   def __init__(self, fill, rowsep: bytes, end: bytes = None):
+      self._fill = fill
+      self._rs   = rowsep
+      self._end  = end
+      self._buf  = b''
+      self._eof  = False
+      self._cut  = False
+
+   def __iter__(self):
+      return iter(lambda: self.read(65536), b'')
+
+   def read(self, n: int = -1) -> bytes:
+      # hold back what could be the start of the end marker, until it's known not to be
+      hold = len(self._end) if self._end else 0
+
+      while not self._eof and (n < 0 or len(self._buf) < n + hold):
+         data = self._fill()
+         if not data:
+            self._eof = True
+            break
+
+         if self._cut and data[:1] == b'\n':
+            data = data[1:]
+         self._cut  = data[-1:] == self._rs
+         self._buf += data.replace(self._rs+b'\n', self._rs)
+
+         if self._end and self._end in self._buf:
+            self._buf = self._buf.partition(self._end)[0]
+            self._eof = True
+
+      if self._eof:
+         hold = 0
+      if n < 0:
+         n = len(self._buf) - hold
+
+      n         = max(0, min(n, len(self._buf) - hold))
+      data      = self._buf[:n]
+      self._buf = self._buf[n:]
+      return data
+
+
+def readrows(rdr, varlist: list, vartype: list, varcat: list, sb, encoding: str, colsep: str = '\x02',
+             rowsep: str = '\x01', chunksize: int = 100000):
+   """
+   Generator of Pandas Data Frames of chunksize rows, parsed by pandas.read_csv's C parser straight from rdr (a
+   SASrowreader). Each column is read with its type up front, float64 for numerics and str for character, so there's
+   no type inference; SAS missing values (., .A-.Z and ._) and blank character values are NaN. Date, time and datetime values, which the data step
+   writes in ISO 8601, are converted afterwards the same as they always have been. A table with no rows yields one
+   empty Data Frame with the columns.
+   """
+   import csv
+   import pandas as pd
+
+   nvars   = len(varlist)
+   dts     = {}
+   nas     = {}
+   dates   = sb.sas_date_fmts + sb.sas_time_fmts + sb.sas_datetime_fmts
+   # best32. right aligns the values in 32 columns, and the C parser only matches na_values as they are; rows are never
+   # blank, and looking for blank ones makes the C parser drop the padding of a row that starts at the end of its buffer
+   missing = ['.', '_'] + [chr(c) for c in range(ord('A'), ord('Z')+1)]
+   missing = missing + [m.rjust(32) for m in missing]
+
+   for i in range(nvars):
+      if vartype[i] == 'N' and varcat[i] not in dates:
+         dts[i] = 'float64'
+         nas[i] = missing
+      else:
+         dts[i] = str
+         nas[i] = ['', ' '] if vartype[i] != 'N' else missing
+
+   reader = pd.read_csv(rdr, sep=colsep, lineterminator=rowsep, header=None, names=list(range(nvars+1)),
+                        usecols=list(range(nvars)), dtype=dts, na_values=nas, keep_default_na=False,
+                        skip_blank_lines=False, quoting=csv.QUOTE_NONE, encoding=encoding, encoding_errors='replace',
+                        engine='c', chunksize=chunksize)
+   chunks = 0
+
+   for tdf in reader:
+      tdf.columns = varlist
+      tdf.index   = pd.RangeIndex(len(tdf))
+
+      for i in range(nvars):
+         if vartype[i] == 'N':
+            if varcat[i] in sb.sas_date_fmts:
+               tdf[varlist[i]] = pd.to_datetime(tdf[varlist[i]], format='%Y-%m-%d', errors='coerce')
+            elif varcat[i] in sb.sas_datetime_fmts:
+               tdf[varlist[i]] = pd.to_datetime(tdf[varlist[i]], format='%Y-%m-%dT%H:%M:%S.%f', errors='coerce')
+            elif varcat[i] in sb.sas_time_fmts:
+               tdf[varlist[i]] = pd.to_datetime(tdf[varlist[i]], errors='coerce')
+      chunks += 1
+      yield tdf
+
+   if chunks == 0:
+      cols = {}
+      for i in range(nvars):
+         if vartype[i] == 'N':
+            cols[varlist[i]] = pd.Series(dtype='float64' if dts[i] == 'float64' else 'datetime64[ns]')
+         else:
+            cols[varlist[i]] = pd.Series(dtype=str)
+      yield pd.DataFrame(cols, columns=varlist)
+
+
+def varruns(varlist: list, kinds: list) -> list:
+   """
+   Split the variables into runs of consecutive variables of the same kind; returns a list of (kind, names). Code for
+   a run can name it as a first--last variable list, so it doesn't grow with the number of variables in it.
+   """
+   runs = []
+   for name, kind in zip(varlist, kinds):
+      if runs and runs[-1][0] == kind:
+         runs[-1][1].append(name)
+      else:
+         runs.append((kind, [name]))
+   return runs
+
+
+def varrange(names: list) -> str:
+   """
+   Return the first--last variable list for a run of variables from varruns(), or its name if it's just one.
+   """
+   if len(names) == 1:
+      return "'"+names[0]+"'n"
+   return "'"+names[0]+"'n--'"+names[-1]+"'n"
+
+
+def sd2dfformats(vartype: list, varcat: list, sb) -> list:
+   """
+   Return the format each variable is written with for sasdata2dataframe(): E8601DA10., E8601TM15.6 or E8601DT26.6 for
+   dates, times and datetimes, best32. for other numerics, and '$' for character variables, which are written as is.
+   """
+   fmts = []
+   for vtype, vcat in zip(vartype, varcat):
+      if vtype != 'N':
+         fmts.append('$')
+      elif vcat in sb.sas_date_fmts:
+         fmts.append('E8601DA10.')
+      elif vcat in sb.sas_time_fmts:
+         fmts.append('E8601TM15.6')
+      elif vcat in sb.sas_datetime_fmts:
+         fmts.append('E8601DT26.6')
+      else:
+         fmts.append('best32.')
+   return fmts
+
+
+def sd2dfputcode(varlist: list, vartype: list, varcat: list, sb, cdelim: str, rdelim: str, varlen: list = None) -> str:
+   """
+   Return the items of the put statement that writes each row for sasdata2dataframe(): every value followed by cdelim
+   (the file's dlm= does that for character variables), then rdelim. A run of numerics with the same format is written
+   as one (first--last) (format cdelim) list, and given the variables' lengths (varlen), a run of characters as one
+   (first--last) (:$w.) list, w their longest length, which the : writes like list output; so for wide tables the code
+   is about as long as the runs, not the columns.
+   """
+   code = []
+   end  = 0
+   for fmt, names in varruns(varlist, sd2dfformats(vartype, varcat, sb)):
+      end += len(names)
+      if fmt == '$' and (varlen is None or len(names) == 1):
+         code.append(' '.join("'"+name+"'n" for name in names))
+      elif fmt == '$':
+         code.append('('+varrange(names)+') (:$'+str(max(varlen[end-len(names):end]))+'.)')
+      elif len(names) == 1:
+         code.append(varrange(names)+' '+fmt+' '+cdelim)
+      else:
+         code.append('('+varrange(names)+') ('+fmt+' '+cdelim+')')
+   code.append(rdelim)
+   return ' '.join(code)
+
+
+def sd2dfformatcode(varlist: list, vartype: list, varcat: list, sb) -> str:
+   """
+   Return the variables and formats for the format statement of sasdata2dataframeCSV()'s view, with each run of
+   numerics with the same format as one first--last list.
+   """
+   code = []
+   for fmt, names in varruns(varlist, sd2dfformats(vartype, varcat, sb)):
+      if fmt != '$':
+         code.append(varrange(names)+' '+fmt)
+   return ' '.join(code)
+
+
+def df2sdchunks(df) -> 'iterator':
+   """
+   Return an iterator of the Data Frames for dataframe2sasdata() to import: just df, if it's a Data Frame, else the
+   chunks df iterates over, like pd.read_csv(chunksize=) or the row groups of a Parquet file, which are read one at a
+   time as they're sent.
+   """
+   if hasattr(df, 'columns') and hasattr(df, 'iloc'):
+      return iter([df])
+   return iter(df)
+
+
+def df2sdkinds(df: 'pd.DataFrame') -> list:
+   """
+   Return the kind of each column of df for dataframe2sasdata(): 'C' (character), 'D' (datetime), 'B' (bool) or 'N'.
+   """
+   kinds = []
+   for dtype in df.dtypes:
+      if dtype.kind in ('O','S','U','V'):
+         kinds.append('C')
+      elif dtype.kind in ('M'):
+         kinds.append('D')
+      elif dtype == 'bool':
+         kinds.append('B')
+      else:
+         kinds.append('N')
+   return kinds
+
+
+def bytelens(values: list, encoding: str) -> 'np.ndarray':
+   """
+   Return the length in bytes of each of a list of str, encoded in encoding. In an encoding that writes ASCII one byte
+   per character, as most do, the ASCII values' lengths are their lengths in characters, and only the others are
+   encoded: all at once, and if that took one byte per character, as it does in a single byte encoding like latin1,
+   theirs are too; otherwise each of them is encoded on its own. Raises UnicodeEncodeError if a value can't be encoded
+   in encoding.
+   """
+   import numpy as np
+
+   count = len(values)
+   chars = np.fromiter(map(len, values), dtype=np.int64, count=count)
+
+   if _asciicompat(encoding):
+      wide = np.flatnonzero(~np.fromiter(map(str.isascii, values), dtype=bool, count=count))
+   else:
+      wide = np.arange(count)
+   if not len(wide):
+      return chars
+
+   others = [values[i] for i in wide]
+   whole  = ''.join(others)
+   if len(whole.encode(encoding)) == len(whole):
+      return chars
+   chars[wide] = np.fromiter((len(value.encode(encoding)) for value in others), dtype=np.int64, count=len(wide))
+   return chars
+
+
+@functools.lru_cache(maxsize=None)
+def _asciicompat(encoding: str) -> bool:
+   try:
+      return bytes(range(128)).decode('ascii').encode(encoding) == bytes(range(128))
+   except (LookupError, UnicodeError):
+      return False
+
+
+def charlens(df: 'pd.DataFrame', encoding: str, lengths: dict = None) -> list:
+   """
+   Return the length of each character column of df, in bytes in the SAS session encoding: that of its longest value,
+   as str() writes it, or 8 if they're all empty, unless it's given in lengths. None for the other columns. Raises
+   ValueError if a value is longer than the length given for its column.
+
+   encoding - the Python encoding of the SAS session
+   lengths  - {column name: length} for character columns
+   """
+   lengths = lengths if lengths is not None else {}
+   kinds   = df2sdkinds(df)
+   lens    = []
+
+   for i in range(len(df.columns)):
+      if kinds[i] != 'C':
+         lens.append(None)
+         continue
+      name  = str(df.columns[i])
+      col_l = int(bytelens(list(map(str, df.iloc[:, i].tolist())), encoding).max(initial=0))
+      if name in lengths:
+         if col_l > lengths[name]:
+            raise ValueError("Column '"+name+"' has a value "+str(col_l)+" bytes long, longer than its length of "+
+                             str(lengths[name])+". Pass a longer one for it in lengths=.")
+         col_l = lengths[name]
+      lens.append(col_l or 8)
+   return lens
+
+
+class SASschema(object):
+   """
+   The variables of the SAS Data Set that dataframe2sasdata() makes from a Data Frame: their names, kinds ('C' character,
+   'D' datetime, 'B' bool or 'N' numeric; see df2sdkinds()), lengths in bytes (8 for all but character variables) and
+   formats. Make one with SASsession.sasschema(), or from_df(), and pass it to df2sd(..., schema=) to load Data Frames
+   of the same shape again and again without working out the lengths each time. Data Frames that don't fit it aren't
+   loaded (see df2sdcheck()).
+
+   names   - the names of the variables, which are the columns of the Data Frames
+   kinds   - the kind of each variable
+   lengths - the length of each variable
+   formats - the format of each variable, or ''; by default E8601DT26.6 for datetimes
+   """
+   def __init__(self, names: list, kinds: list, lengths: list, formats: list = None):
+      self.names   = [str(name) for name in names]
+      self.kinds   = list(kinds)
+      self.lengths = [int(vlen) for vlen in lengths]
+      if formats is None:
+         formats   = ['E8601DT26.6' if kind == 'D' else '' for kind in self.kinds]
+      self.formats = list(formats)
+
+   def __repr__(self):
+      return ('SASschema('+str(self.names)+', '+str(self.kinds)+', '+str(self.lengths)+', '+str(self.formats)+')')
+
+   @classmethod
+   def from_df(cls, df: 'pd.DataFrame', encoding: str, lengths: dict = None, formats: dict = None) -> 'SASschema':
+      """
+      Return the schema of df: the kinds of its columns, and the lengths of its character columns (see charlens()).
+
+      encoding - the Python encoding of the SAS session
+      lengths  - {column name: length} for character columns, in place of the length of their longest value
+      formats  - {column name: format} for any of the columns, in place of the default
+      """
+      kinds  = df2sdkinds(df)
+      lens   = [8 if vlen is None else vlen for vlen in charlens(df, encoding, lengths)]
+      schema = cls(df.columns, kinds, lens)
+      for name, fmt in (formats or {}).items():
+         if str(name) not in schema.names:
+            raise ValueError("There's no column '"+str(name)+"' to give the format "+str(fmt)+".")
+         schema.formats[schema.names.index(str(name))] = fmt
+      return schema
+
+   def meta(self) -> dict:
+      """
+      Return the variables like binmeta() does, for binputcode().
+      """
+      return dict(names=self.names, types=['C' if kind == 'C' else 'N' for kind in self.kinds], lens=self.lengths)
+
+
+def df2sdcheck(df: 'pd.DataFrame', schema: SASschema, encoding: str, n: int = 0, lengths: bool = True):
+   """
+   Raise ValueError if a Data Frame dataframe2sasdata() is importing doesn't fit the schema of the SAS Data Set: if its
+   columns, or their kinds, aren't the same, or if a character value is longer than its variable.
+
+   encoding - the Python encoding of the SAS session
+   n        - the number of the Data Frame, for the message
+   lengths  - False to leave the lengths to be checked elsewhere
+   """
+   try:
+      if [str(col) for col in df.columns] != schema.names:
+         raise ValueError("It has the columns "+str(list(df.columns))+", not "+str(schema.names)+".")
+
+      kinds = df2sdkinds(df)
+      for i in range(len(kinds)):
+         if kinds[i] != schema.kinds[i]:
+            raise ValueError("Column '"+schema.names[i]+"' is of kind "+kinds[i]+", not "+schema.kinds[i]+".")
+
+      if lengths:
+         charlens(df, encoding, {schema.names[i]: schema.lengths[i] for i in range(len(kinds)) if kinds[i] == 'C'})
+   except ValueError as e:
+      if isinstance(e, UnicodeError):
+         raise
+      raise ValueError("Data Frame "+str(n)+" doesn't fit the SAS Data Set. "+str(e)) from None
+
+
+def df2sdvars(schema: SASschema, keep_outer_quotes: bool = False) -> tuple:
+   """
+   Return the contents of the length, format and input statements of dataframe2sasdata()'s data step for the variables
+   of schema. Consecutive variables with the same length share it, and a run of them named with consecutive numbers,
+   like v1, v2, v3, is named as a v1-v3 numbered list. The length statement puts the variables in order, so after it
+   a run with the same format, or read the same way (characters with :$w., w their longest length), is a first--last
+   list; for a wide table of columns like that, the code is about as long as the runs, not the columns.
+
+   keep_outer_quotes - for character columns, have SAS keep any outer quotes instead of stripping them off
+   """
+   names  = schema.names
+   vlens  = []
+   reads  = []
+
+   for i in range(len(names)):
+      if schema.kinds[i] == 'C':
+         vlens.append('$'+str(schema.lengths[i]))
+         reads.append('~' if keep_outer_quotes else 'C')
+      else:
+         vlens.append(str(schema.lengths[i]))
+         reads.append(schema.kinds[i] if schema.kinds[i] == 'D' else 'N')
+
+   length = []
+   for vlen, run in varruns(names, vlens):
+      length.append(numberedlist(run)+' '+vlen)
+
+   format = []
+   for vfmt, run in varruns(names, schema.formats):
+      if vfmt:
+         format.append(varrange(run)+' '+vfmt)
+
+   input = []
+   end   = 0
+   for read, run in varruns(names, reads):
+      end += len(run)
+      if len(run) == 1:
+         input.append(varrange(run)+{'N': '', 'C': '', '~': ' ~', 'D': ' :E8601DT26.6'}[read])
+      elif read in ('C', '~'):
+         vlen = max(schema.lengths[end-len(run):end])
+         input.append('('+varrange(run)+') ('+(':' if read == 'C' else '~')+'$'+str(vlen)+'.)')
+      else:
+         input.append('('+varrange(run)+') ('+(':best32.' if read == 'N' else ':E8601DT26.6')+')')
+   return ' '.join(length), ' '.join(format), ' '.join(input)
+
+
+_numbered = re.compile(r'([A-Za-z_](?:[A-Za-z_0-9]*[A-Za-z_])?)([1-9][0-9]*)')
+
+
+def numberedlist(names: list) -> str:
+   """
+   Return the names of a run of variables for a length statement, with each run of names of the same prefix and
+   consecutive numbers, like v1, v2, v3, as a v1-v3 numbered list, which names them before they exist.
+   """
+   items = []
+   start = 0
+   while start < len(names):
+      end = start + 1
+      m   = _numbered.fullmatch(names[start]) if len(names[start]) <= 32 else None
+      if m:
+         pre, num = m.group(1), int(m.group(2))
+         while end < len(names) and names[end] == pre + str(num + end - start):
+            end += 1
+      if end - start > 1:
+         items.append(names[start]+'-'+names[end-1])
+      else:
+         items.append("'"+names[start]+"'n")
+      start = end
+   return ' '.join(items)
+
+
+def df2sdcards(df: 'pd.DataFrame', dts: list, blocksize: int = 1048576):
+   """
+   Generator of dataframe2sasdata()'s datalines, '03'x delimited, as blocks of whole records of about blocksize
+   characters. The cards are built a column at a time, not a cell at a time: each value is written as str() writes it,
+   with nan as '.' for numerics and ' ' for characters, datetimes (and NaT as '.') as E8601DT26.6 and bools as 0/1.
+
+   Nearly all of the time goes to writing the numerics as text; joining the cells into records is a small part of it.
+   DataFrame.to_csv(sep='\x03', quoting=QUOTE_NONE) can write the same records, but it formats floats with numpy, which
+   is slower than str(), and its C writer joins no faster, so it takes longer (see cards_time() in the tests).
+
+   dts       - the kind of each column, from df2sdkinds()
+   blocksize - about how many characters to yield at a time
+   """
+   import numpy as np
+
+   nrows = len(df)
+   ncols = len(df.columns)
+   rows  = max(1, blocksize // max(1, 10 * ncols))
+
+   for start in range(0, nrows, rows):
+      chunk = df.iloc[start:start+rows]
+      cols  = []
+      for i in range(ncols):
+         col = chunk.iloc[:, i]
+         if dts[i] == 'D':
+            dt   = np.asarray(col.values).astype('datetime64[us]')
+            vals = np.datetime_as_string(dt, unit='us').astype(object)
+            vals[np.isnat(dt)] = '.'
+         elif dts[i] == 'B':
+            vals = col.values.astype(int).astype(str)
+         else:
+            vals = np.array(list(map(str, col.tolist())), dtype=object)
+            vals[vals == 'nan'] = '.' if dts[i] == 'N' else ' '
+         cols.append(vals.tolist())
+      yield ''.join(['\x03'.join(card)+'\n' for card in zip(*cols)])
+
+
+def df2sdbin(df: 'pd.DataFrame', encoding: str, order: str = '<', schema: SASschema = None,
+             lengths: dict = None) -> tuple:
+   """
+   Pack a Data Frame into one fixed width record per row for dataframe2sasdata(method='BINARY'): numerics as 8 byte
+   doubles, datetimes as SAS datetimes, bools as 0/1, and character columns encoded and padded with blanks to the
+   length of their variable. Missing values are NaN doubles, which SAS reads as ., and blank character values.
+   Return the schema of the records (see SASschema; its meta() is what binputcode() makes the input statement from)
+   and the records as a numpy structured array.
+
+   encoding - the Python encoding of the SAS session, for the character columns
+   order    - the byte order of the doubles, from binmeta()
+   schema   - the SASschema to pack df to; by default, df's own, with lengths
+   lengths  - {column name: length} for character columns, as for charlens(); ValueError if a value is longer
+   """
+   import numpy  as np
+   import pandas as pd
+
+   if schema is not None:
+      lengths = {schema.names[i]: schema.lengths[i] for i in range(len(schema.names)) if schema.kinds[i] == 'C'}
+   lengths = lengths if lengths is not None else {}
+   vals    = []
+   formats = []
+   lens    = []
+   kinds   = df2sdkinds(df)
+
+   for i in range(len(df.columns)):
+      col  = df.iloc[:, i]
+      name = str(df.columns[i])
+
+      if kinds[i] == 'C':
+         miss = pd.isna(col).tolist()
+         val  = [b'' if miss[j] else str(v).encode(encoding) for j, v in enumerate(col.tolist())]
+         vlen = max(map(len, val), default=0)
+         if name in lengths:
+            if vlen > lengths[name]:
+               raise ValueError("Column '"+name+"' has a value "+str(vlen)+" bytes long, longer than its length of "+
+                                str(lengths[name])+". Pass a longer one for it in lengths=.")
+            vlen = lengths[name]
+         vlen = vlen or 8
+         val  = np.array(val, dtype='S'+str(vlen))
+         if len(val):
+            # ljust can't take an empty array
+            val = np.char.ljust(val, vlen)
+         formats.append('S'+str(vlen))
+      else:
+         vlen = 8
+         if kinds[i] == 'D':
+            dt  = np.asarray(col.values).astype('datetime64[us]')
+            # SAS datetimes are seconds from 1960; the microseconds are divided once, so it's correctly rounded
+            val = (dt.astype(np.int64) + 315619200000000) / 1e6
+            val[np.isnat(dt)] = np.nan
+         else:
+            val = col.to_numpy(dtype=np.float64, na_value=np.nan)
+         formats.append(order+'f8')
+      lens.append(vlen)
+      vals.append(val)
+
+   dtype = np.dtype({'names': ['v'+str(i) for i in range(len(formats))], 'formats': formats})
+   recs  = np.empty(len(df), dtype=dtype)
+   for i in range(len(vals)):
+      recs['v'+str(i)] = vals[i]
+
+   if schema is None:
+      schema = SASschema(df.columns, kinds, lens)
+   return schema, recs
+
+
+def df2sdhex(recs: 'np.ndarray', blocksize: int = 1048576):
+   """
+   Generator of the records from df2sdbin() as lines of hex, in blocks of whole lines of about blocksize characters,
+   for streams that aren't binary safe. SAS reads them with binputcode(meta, hexed=True), so the doubles have to be
+   packed big endian.
+   """
+   width = recs.dtype.itemsize * 2
+   rows  = max(1, blocksize // (width + 1))
+
+   for start in range(0, len(recs), rows):
+      data = recs[start:start+rows].tobytes().hex().upper()
+      yield ''.join([data[i:i+width]+'\n' for i in range(0, len(data), width)])
+
+
+# the defaults for sasdata2dataframe(dtype_policy=)
+DTYPE_POLICY = {'category': 0.1, 'integer': True, 'float32': False}
+
+# formats that show a numeric as a whole number when they have no decimals, like 8. F8. Z5. or COMMA12.
+INTEGER_FMTS = re.compile(r'^(F|Z|COMMA|COMMAX|DOLLAR|DOLLARX|NLNUM)?\d+\.$')
+
+
+def leandtypes(df: 'pd.DataFrame', meta: dict, sb, policy) -> 'pd.DataFrame':
+   """
+   Convert the columns of a Data Frame from sasdata2dataframe() to smaller dtypes, per the variables in meta (from
+   binmeta()) and policy, a dict of any of (the rest are taken from DTYPE_POLICY; True is all of DTYPE_POLICY):
+
+   category - character variables with at most this many distinct values per row become category
+   integer  - numerics with an integer format (w., Fw., Zw., COMMAw. ...) or a length under 8 become the smallest
+              nullable integer dtype (Int8, Int16, Int32, Int64) that holds them, if every value is a whole number
+   float32  - the other numerics, other than dates, times and datetimes, become float32
+   """
+   import numpy  as np
+   import pandas as pd
+
+   policy = dict(DTYPE_POLICY, **(policy if isinstance(policy, dict) else {}))
+   dates  = sb.sas_date_fmts + sb.sas_time_fmts + sb.sas_datetime_fmts
+
+   for i in range(len(meta['names'])):
+      name = meta['names'][i]
+      if name not in df.columns:
+         continue
+      col = df[name]
+
+      if meta['types'][i] != 'N':
+         if policy['category'] and len(col) and col.nunique() <= len(col) * policy['category']:
+            df[name] = col.astype('category')
+         continue
+      if meta['fmts'][i] in dates or col.dtype.kind != 'f':
+         continue
+
+      if policy['integer'] and (INTEGER_FMTS.match(meta['formats'][i]) or meta['lens'][i] < 8):
+         vals = col.dropna()
+         if len(vals) and np.isfinite(vals).all() and (vals == np.floor(vals)).all():
+            lo, hi = vals.min(), vals.max()
+            for bits in (8, 16, 32, 64):
+               info = np.iinfo('int'+str(bits))
+               if info.min <= lo and hi <= info.max:
+                  df[name] = col.astype('Int'+str(bits))
+                  break
+
+      if policy['float32'] and df[name].dtype == 'float64':
+         df[name] = col.astype('float32')
+   return df
+
+
+def binmetacode(tabname: str, file: str, member: str = None, dsopts: str = '') -> str:
+   """
+   Return the code that writes what sasdata2dataframe() needs to know about a SAS Data Set to the LOG (see binmeta()),
+   all from one data step: the type, length, format and name of each variable, &SYSENDIAN, and 1 in HEX16. so it can
+   tell whether numerics are IEEE doubles on this host. The step opens the table with its data set options directly;
+   only a format statement in them, which isn't a data set option, needs a view to be applied first.
+
+   tabname - the table, without data set options
+   file    - the fileref the LOG is written to from a data step; LOG or STDERR
+   member  - the table, if its signature should be written too (see metacheckcode())
+   dsopts  - the data set options, as SASsession._dsopts() returns them
+   """
+   opts, semi, fmat = dsopts.partition(';')
+   code = ''
+   if semi:
+      code += "data sasdata2dataframe / view=sasdata2dataframe; set "+tabname+dsopts+";\nrun;\n"
+      table = 'sasdata2dataframe'
+   else:
+      table = tabname+opts
+   code += "data _null_; file "+file+"; length line $400; d = open('"+table.replace("'", "''")+"');\n"
+   code += "nvars = attrn(d, 'NVARS'); one = 1;\n"
+   code += "put 'SD2DFB_PROBE=' one hex16.; put \"SD2DFB_ENDIAN=&sysendian\";\n"
+   code += "do i = 1 to nvars;\n"
+   code += "line = cats(vartype(d, i), '|', varlen(d, i), '|', varfmt(d, i), '|', compress(varname(d, i), '00'x));\n"
+   code += "put 'SD2DFB=' line;\nend;\nrc = close(d);\n"
+   if member:
+      code += _sigcode(member)+"put 'SD2DFB_SIG=' _sd2dfs_;\n"
+   code += "run;\n"
+   return code
+
+
+def _sigcode(member: str) -> str:
+   # a chained md5 of the type, length, format and name of each variable of the member, in _sd2dfs_
+   return ("length _sd2dfs_ $32; _sd2dfs_ = ' '; _sd2dfm_ = open('"+member.replace("'", "''")+"');\n"
+           "if _sd2dfm_ then do _sd2dfi_ = 1 to attrn(_sd2dfm_, 'NVARS');\n"
+           "_sd2dfs_ = put(md5(catx('|', _sd2dfs_, vartype(_sd2dfm_, _sd2dfi_), varlen(_sd2dfm_, _sd2dfi_), "
+           "varfmt(_sd2dfm_, _sd2dfi_), varname(_sd2dfm_, _sd2dfi_))), $hex32.);\nend;\n"
+           "if _sd2dfm_ then _sd2dfm_ = close(_sd2dfm_);\n")
+
+
+def metacheckcode(meta: dict, member: str) -> str:
+   """
+   Return the statements that make a sasdata2dataframe() data step (or view) stop before its first row if the variables
+   of member no longer have the signature they had when meta was got from binmeta(); for meta from the cache (see
+   SASsession._tablemeta()), else ''. They go before the step's set statement, so the check costs no submit of its own:
+   a transfer that read no rows with cached meta is what tells the access method to check whether meta was stale.
+   """
+   if not meta.get('cached'):
+      return ''
+   return ("if _n_ = 1 then do;\n"+_sigcode(member)+"if _sd2dfs_ ne '"+meta['sig']+"' then stop;\nend;\n"
+           "drop _sd2dfs_ _sd2dfm_ _sd2dfi_;\n")
+
+
+def binmeta(log: str) -> dict:
+   """
+   Parse the LOG of binmetacode() into a dict with the names, types ('N' or 'C'), lengths, format names (fmts) and
+   formats as assigned (formats) of the variables, whether numerics are IEEE doubles (ieee), the byte order of the host (order, for numpy) and, if it was
+   written, the signature of the member's variables (sig).
+   """
+   meta = dict(names=[], types=[], lens=[], fmts=[], formats=[], ieee=False, order='<', sig='')
+
+   for line in log.split('\n'):
+      key, eq, val = line.partition('=')
+      if key == 'SD2DFB':
+         vtype, vlen, vfmt, vname = val.strip().split('|', 3)
+         meta['names'].append(vname)
+         meta['types'].append(vtype)
+         meta['lens'].append(int(vlen))
+         meta['fmts'].append(re.sub(r'\d*\.\d*$', '', vfmt).upper())
+         meta['formats'].append(vfmt.upper())
+      elif key == 'SD2DFB_PROBE':
+         meta['ieee']  = val.strip() == '3FF0000000000000'
+      elif key == 'SD2DFB_ENDIAN':
+         meta['order'] = '>' if val.strip() == 'BIG' else '<'
+      elif key == 'SD2DFB_SIG':
+         meta['sig']   = val.strip()
+   return meta
+
+
+def binputcode(meta: dict, hexed: bool = False) -> tuple:
+   """
+   Return the variables and formats for the put statement that writes each observation as one fixed width record, and
+   the width of that record in bytes: numerics as 8 byte doubles (RB8.) and character variables at their length ($CHAR.).
+   With hexed=True they're written as the hex of those bytes instead (HEX16. and $HEX.), for streams that aren't
+   binary safe; the record is twice as wide, and the doubles are big endian on every host.
+   """
+   fmts  = []
+   width = 0
+   for i in range(len(meta['names'])):
+      if meta['types'][i] == 'N':
+         vlen = 8
+         vfmt = 'hex16.' if hexed else 'rb8.'
+      else:
+         vlen = meta['lens'][i]
+         vfmt = ('$hex'+str(vlen*2) if hexed else '$char'+str(vlen))+'.'
+      fmts.append(vfmt)
+      width += vlen
+
+   put = []
+   for vfmt, names in varruns(meta['names'], fmts):
+      if len(names) == 1:
+         put.append(varrange(names)+' '+vfmt+' ')
+      else:
+         put.append('('+varrange(names)+') ('+vfmt+') ')
+   return ''.join(put), width * 2 if hexed else width
+
+
+def bin2df(data: bytes, meta: dict, sb, encoding: str, hexed: bool = False) -> 'pd.DataFrame':
+   """
+   Build a Pandas Data Frame from the records written by the put from binputcode(). The numerics are read in place with
+   numpy.frombuffer. SAS missing values (. and .A-.Z, ._) are all NaN bit patterns in an IEEE double, so they come
+   through as NaN. Numerics with date, time or datetime formats are converted the same as the MEMORY method does.
+
+   data     - the records; for hexed, the hex text of them, which can have line ends between records
+   meta     - from binmeta()
+   sb       - the SASsession, for its lists of date, time and datetime formats
+   encoding - the Python encoding of the SAS session, for the character variables
+   """
+   import pandas as pd
+   import numpy  as np
+
+   if hexed:
+      data  = bytes.fromhex(data.decode('ascii'))
+      order = '>'
+   else:
+      order = meta['order']
+
+   formats = []
+   for i in range(len(meta['names'])):
+      formats.append(order+'f8' if meta['types'][i] == 'N' else 'S'+str(meta['lens'][i]))
+
+   dtype = np.dtype({'names': ['v'+str(i) for i in range(len(formats))], 'formats': formats})
+   if len(data) % dtype.itemsize:
+      raise ValueError("Got "+str(len(data))+" bytes, which isn't a whole number of "+str(dtype.itemsize)+" byte records.")
+   recs  = np.frombuffer(data, dtype=dtype)
+
+   cols  = {}
+   for i in range(len(meta['names'])):
+      col = recs['v'+str(i)]
+      fmt = meta['fmts'][i]
+      if meta['types'][i] == 'N':
+         col = col.astype(np.float64)
+         if   fmt in sb.sas_date_fmts:
+            col = pd.to_datetime(col, unit='D', origin=pd.Timestamp('1960-01-01'), errors='coerce')
+         elif fmt in sb.sas_datetime_fmts:
+            col = pd.to_datetime(col, unit='s', origin=pd.Timestamp('1960-01-01'), errors='coerce')
+         elif fmt in sb.sas_time_fmts:
+            # the MEMORY method reads these as times of today, from E8601TM.
+            col = pd.Timestamp.now().normalize() + pd.to_timedelta(col, unit='s')
+      else:
+         col = pd.Series(col).str.decode(encoding, errors='replace').str.rstrip(' ')
+         col = col.where(col != '', np.nan)
+      cols[meta['names'][i]] = col
+
+   return pd.DataFrame(cols, columns=meta['names'])
+
+
+class SASbuffer(object):
+   """
+   This object is not intended to be used directly. It accumulates the bytes SAS writes to the LOG or LST for a submit
+   and watches for the end of step marker as they arrive. Only the newly added bytes (plus enough of the old ones to catch
+   a marker split across two reads) are scanned, so the cost of a submit grows linearly with the amount of output.
+
+   marker - the bytes to watch for, i.e. b"\\nE3969440A681A24088859985"+logn; b'' to just accumulate
+   """
+   def __init__(self, marker: bytes = b''):
+      self._buf   = bytearray()
+      self.marker = marker
+      self._pos   = 0
+      self._at    = -1
+
+   def __len__(self):
+      return len(self._buf)
+
+   def __bytes__(self):
+      return bytes(self._buf)
+
+   def __iadd__(self, data):
+      self.add(data)
+      return self
+
+   def add(self, data: bytes):
+      """
+      Append data to the buffer and scan just the new part for the marker, if it hasn't been seen yet.
+      """
+      self._buf += data
+
+      if len(self.marker) and self._at < 0:
+         self._at = self._buf.find(self.marker, self._pos)
+         if self._at < 0:
+            self._pos = max(0, len(self._buf) - len(self.marker) + 1)
+
+   @property
+   def found(self) -> bool:
+      """
+      True once the marker has been seen
+      """
+      return self._at >= 0
+
+   def partition(self) -> tuple:
+      """
+      Same as bytes.partition(marker) on the contents, without scanning them again.
+      """
+      if self._at < 0:
+         return (bytes(self._buf), b'', b'')
+      end = self._at + len(self.marker)
+      return (bytes(self._buf[:self._at]), self.marker, bytes(self._buf[end:]))
+
+   def getvalue(self) -> bytes:
+      return bytes(self._buf)
+
+   def decode(self, encoding: str = 'utf-8', errors: str = 'strict') -> str:
+      """
+      Decode the whole buffer at once.
+      """
+      return self._buf.decode(encoding, errors)
+
+
+class SASlogLines(object):
+   """
+   This object is not intended to be used directly. It turns the LOG of a streamed submit into SASevents as it arrives,
+   one 'LOG' event per complete line plus a 'STEP' event after each line that ends a step. saspy's own end of step
+   marker lines are dropped and, once the marker of this submit shows up, done is set and nothing more is returned.
+
+   encoding - encoding of the LOG bytes passed to feed()
+   marker   - the end of step marker of this submit, i.e. "E3969440A681A24088859985"+logn; '' if the LOG has none (HTTP)
+   mj       - the quote/comment reset string the code is wrapped in; removed from the lines, like submit() does
+   """
+   def __init__(self, encoding: str = 'utf-8', marker: str = '', mj: str = ''):
+      self._dec   = codecs.getincrementaldecoder(encoding)(errors='replace')
+      self._part  = ''
+      self.marker = marker.strip()
+      self.mj     = mj
+      self.done   = False
+
+   def feed(self, data: bytes) -> list:
+      """
+      Decode the next chunk of LOG bytes and return the events for the lines it completed.
+      """
+      lines      = (self._part + self._dec.decode(data)).split('\n')
+      self._part = lines.pop()
+      return self.events(lines)
+
+   def flush(self) -> list:
+      """
+      Return the events for whatever is left over after the last feed().
+      """
+      last       = self._part + self._dec.decode(b'', final=True)
+      self._part = ''
+      return self.events([last]) if len(last) else []
+
+   def events(self, lines: list) -> list:
+      """
+      Return the events for a list of already decoded LOG lines.
+      """
+      evs = []
+      for line in lines:
+         if self.done:
+            break
+         if _marker in line:
+            if len(self.marker) and line.strip() == self.marker:
+               self.done = True
+            continue
+         if len(self.mj):
+            line = line.replace(self.mj, '')
+         evs.append(SASevent('LOG', line))
+         if _stepend.match(line):
+            evs.append(SASevent('STEP', line))
+      return evs
+
+
+class SASsessionLog(object):
+   """
+   This object is not intended to be used directly. It is the session log (what saslog() returns) of an access method.
+   Each += adds the LOG of one step. With no maxsize it keeps everything, like the string it replaced. With maxsize, once
+   more than maxsize bytes are held, the oldest steps are dropped, or first written to a temporary file if spill is True,
+   so memory stays flat for sessions that run for days. Positions are byte offsets into the LOG as a whole (UTF-8).
+
+   Where each step starts is kept too, for get(last_n_steps=), but only for the steps still in memory (or spilled, up
+   to maxsteps of them), so that doesn't grow for the life of the session either.
+
+   maxsize - max bytes of LOG to keep in memory; None or 0 for no limit
+   spill   - True to keep the LOG dropped from memory in a temporary file, so it can still be read back
+   """
+   # the most step offsets kept, which only matters for spill or no maxsize; 8 bytes or so each
+   maxsteps = 65536
+
+   def __init__(self, maxsize: int = None, spill: bool = False):
+      self.maxsize = maxsize if maxsize else 0
+      self.spill   = spill
+      self._segs   = deque()
+      self._steps  = deque(maxlen=self.maxsteps)
+      self._nsteps = 0
+      self._size   = 0
+      self._base   = 0
+      self._file   = None
+
+   def __iadd__(self, text: str):
+      self.append(text)
+      return self
+
+   def __len__(self):
+      return self._size
+
+   def __str__(self):
+      return self.get()
+
+   def append(self, text: str, newstep: bool = True):
+      """
+      Add LOG to the end. newstep=False adds it to the current step instead of starting a new one.
+      """
+      if not len(text):
+         return
+
+      if newstep or not len(self._steps):
+         self._steps.append(self._size)
+         self._nsteps += 1
+
+      data = text.encode('utf-8', errors='replace')
+      self._segs.append(data)
+      self._size += len(data)
+
+      # always keep the newest step, even if it alone is over the cap
+      while self.maxsize and self._size - self._base > self.maxsize and len(self._segs) > 1:
+         data = self._segs.popleft()
+         if self.spill:
+            if self._file is None:
+               self._file = tf.TemporaryFile(prefix='saslog')
+            self._file.seek(0, 2)
+            self._file.write(data)
+         self._base += len(data)
+
+      # forget the steps that are all gone; one that's partly in memory is kept
+      while not self.spill and len(self._steps) > 1 and self._steps[1] <= self._base:
+         self._steps.popleft()
+
+   def get(self, last_n_steps: int = None, start: int = None, end: int = None) -> str:
+      """
+      Return the LOG, or part of it.
+      last_n_steps - just the LOG of the last n steps
+      start        - byte offset to start at; default is the beginning
+      end          - byte offset to end before; default is the end
+      If the part asked for was dropped from memory and not spilled, only what's still there is returned. Likewise, if
+      more steps are asked for than are still known, the LOG from the oldest one known is returned.
+      """
+      if last_n_steps is not None:
+         if last_n_steps <= 0:
+            return ''
+         if last_n_steps < len(self._steps):
+            start = self._steps[-last_n_steps]
+         elif self._nsteps > len(self._steps):
+            start = self._steps[0]
+         else:
+            start = 0
+
+      start = 0          if start is None else max(0, min(start, self._size))
+      end   = self._size if end   is None else max(start, min(end, self._size))
+      out   = []
+
+      if start < self._base and self._file is not None:
+         self._file.seek(start)
+         out.append(self._file.read(min(end, self._base) - start))
+
+      pos = self._base
+      for data in self._segs:
+         if pos >= end:
+            break
+         nxt = pos + len(data)
+         if nxt > start:
+            out.append(data[max(start - pos, 0):end - pos])
+         pos = nxt
+
+      return b''.join(out).decode('utf-8', errors='replace')
+
+   def steps(self) -> int:
+      """
+      Number of steps added so far
+      """
+      return self._nsteps
@@ -15,18 +15,17 @@
 #
 import http.client as hc
 import base64
+import itertools
 import json
 import os
+import re
 import ssl
 
 import tempfile as tf
-from time import sleep
+from time import sleep, time
 
-try:
-   import pandas as pd
-   import numpy  as np
-except ImportError:
-   pass
+from saspy.sasiocommons import SASevent, SASlogLines, SASsessionLog, concatchunks, df2sdvars, df2sdcards
+from saspy.sasiocommons import df2sdchunks, df2sdcheck, SASschema, lstmarkcode, splitlog, splitlst, lstclean, promptcode
 
 class SASconfigHTTP:
    '''
@@ -377,6 +376,8 @@ class SASsessionHTTP():
       self._session   = None
       self._sb        = kwargs.get('sb', None)
       self.sascfg     = SASconfigHTTP(self, **kwargs)
+      self._log_cnt   = 0
+      self._log       = SASsessionLog(self._sb.sascfg.logsize, self._sb.sascfg.logspill)
 
       if self.sascfg._token:
          self._startsas()
@@ -448,7 +449,7 @@ class SASsessionHTTP():
 
       self.pid = self._session.get('id')
 
-      self._log = self._getlog()
+      self._log += self._getlog()
 
       # POST Job - Lets see if the server really came up, cuz you can't tell from what happend so far
       conn = self.sascfg.HTTPConn; conn.connect()
@@ -469,7 +470,13 @@ class SASsessionHTTP():
             print(key+"="+str(jobid.get(key)))
          return None
 
-      self.submit("options svgtitle='svgtitle'; options validvarname=any pagesize=max nosyntaxcheck; ods graphics on;", "text")
+      # the session's own setup goes in the same submit as saspy's, to connect in one round trip
+      boot = time()
+      # _sp_df2sd is ready for the first dataframe2sasdata() to PUT its rows into; each one assigns a fresh one after
+      ll   = self.submit("options svgtitle='svgtitle'; options validvarname=any pagesize=max nosyntaxcheck; ods graphics on;\n"+
+                         "filename _sp_df2sd temp recfm=N;\n"+self._sb._bootcode(), "text")
+      self._boottime = time() - boot
+      self._bootlog  = ll['LOG']
       print("SAS server started using Context "+self.sascfg.ctxname+" with SESSION_ID="+self.pid)       
 
       return self.pid
@@ -572,9 +579,7 @@ class SASsessionHTTP():
          i += 1
       conn.close()
 
-      lstd = htm.replace(chr(12), chr(10)).replace('<body class="c body">',
-                                                   '<body class="l body">').replace("font-size: x-small;",
-                                                                                    "font-size:  normal;")
+      lstd = lstclean(htm)
       return lstd
    
    def _getlsttxt(self, jobid=None):
@@ -674,9 +679,6 @@ class SASsessionHTTP():
       odsopen  = json.dumps("ods listing close;ods "+self.sascfg.output+" (id=saspy_internal) options(bitmap_mode='inline') device=svg style="+self._sb.HTML_Style+"; ods graphics on / outputfmt=png;\n")
       odsclose = json.dumps("ods "+self.sascfg.output+" (id=saspy_internal) close;ods listing;\n")
       ods      = True;
-      pcodei   = ''
-      pcodeiv  = ''
-      pcodeo   = ''
 
       if self._session == None:
          print("No SAS process attached. SAS process has terminated unexpectedly.")
@@ -687,25 +689,7 @@ class SASsessionHTTP():
          odsopen  = '""'
          odsclose = '""'
    
-      if len(prompt):
-         pcodei += 'options nosource nonotes;\n'
-         pcodeo += 'options nosource nonotes;\n'
-         for key in prompt:
-            gotit = False
-            while not gotit:
-               var = self.sascfg._prompt('Please enter value for macro variable '+key+' ', pw=prompt[key])
-               if len(var) > 0:
-                  gotit = True
-               else:
-                  print("Sorry, didn't get a value for that variable.")
-            if prompt[key]:
-               pcodei  += '%let '+key+'='+var+';\n'
-            else:
-               pcodeiv += '%let '+key+'='+var+';\n'
-            if prompt[key]:
-               pcodeo += '%symdel '+key+';\n'
-         pcodei += 'options source notes;\n'
-         pcodeo += 'options source notes;\n'
+      pcodei, pcodeiv, pcodeo = promptcode(prompt, self.sascfg._prompt)
 
       # POST Job
       conn = self.sascfg.HTTPConn; conn.connect()
@@ -767,11 +751,274 @@ class SASsessionHTTP():
 
       return dict(LOG=logd, LST=lstd)
 
-   def saslog(self):
+   def _getloglines(self, uri, start=0):
+      '''
+      GET the lines of a LOG (session or job log uri) from line number start on.
+      Returns - a tuple of (list of lines, the start value for the next call)
+      '''
+      lines = []
+
+      while True:
+         conn = self.sascfg.HTTPConn; conn.connect()
+         headers={"Accept":"application/vnd.sas.collection+json", "Authorization":"Bearer "+self.sascfg._token}
+         conn.request('GET', uri+"?start="+str(start)+"&limit=10000", headers=headers)
+         req = conn.getresponse()
+         status = req.status
+         resp = req.read()
+         conn.close()
+
+         js  = json.loads(resp.decode(self.sascfg.encoding))
+         log = js.get('items', [])
+
+         if not len(log):
+            break
+         start += len(log)
+
+         for i in range(len(log)):
+            lines.append(dict(log[i]).get('line'))
+
+      return lines, start
+
+   def submit_stream(self, code: str, results: str ="html", prompt: dict = None):
+      '''
+      This method is a generator version of submit(). Rather than returning the whole LOG and LST once the code has finished,
+      it yields SASevent(type, data) tuples as the Compute Service makes them available, so you can follow a long running job.
+      The LOG is streamed while the job runs; the LST is only available from the service once the job is done.
+      code    - the SAS statements you want to execute
+      results - format of results, HTML is default, TEXT is the alternative
+      prompt  - dict of names:flags to prompt for; see submit()
+
+      Yields - SASevent tuples; type is 'LOG' (a line of the LOG), 'STEP' (a step finished; data is the NOTE: line that said so),
+               'LST' (the listing) or 'DONE' (finished; always the last event)
+      '''
+      prompt  = prompt if prompt is not None else {}
+      lines   = SASlogLines()
+      start   = 0
+      done    = False
+      steplog = False
+
+      if self._session == None:
+         print("No SAS process attached. SAS process has terminated unexpectedly.")
+         yield SASevent('LOG', "No SAS process attached. SAS process has terminated unexpectedly.")
+         yield SASevent('DONE', None)
+         return
+
+      pcodei, pcodeiv, pcodeo = promptcode(prompt, self.sascfg._prompt)
+
+      jobid = self._asubmit(pcodei+pcodeiv+code+'\n'+pcodeo, results)
+      if not jobid or not jobid.get('links'):
+         print("Problem submitting job to Compute Service.\n   Status code="+str(jobid.get('httpStatusCode'))+"\n   Message="+str(jobid.get('message')))
+         yield SASevent('LOG', str(jobid))
+         yield SASevent('DONE', None)
+         return
+
+      for ld in jobid.get('links'):
+         if ld.get('method') == 'GET' and ld.get('rel') == 'state':
+            uri = ld.get('uri')
+         elif ld.get('method') == 'GET' and ld.get('rel') == 'log':
+            loguri = ld.get('uri')
+
+      headers = {"Accept":"text/plain", "Authorization":"Bearer "+self.sascfg._token}
+
+      while not done:
+         try:
+            while True:
+               # GET Status for JOB
+               conn = self.sascfg.HTTPConn; conn.connect()
+               conn.request('GET', uri, headers=headers)
+               req = conn.getresponse()
+               resp = req.read()
+               conn.close()
+
+               # pick up the LOG written so far; once the job is done, this gets the rest of it
+               logl, start = self._getloglines(loguri, start)
+               if len(logl):
+                  self._log.append('\n'.join(logl)+'\n', newstep=not steplog)
+                  steplog = True
+                  for ev in lines.events(logl):
+                     yield ev
+
+               if resp not in [b'running', b'pending']:
+                  done = True
+                  break
+               sleep(.5)
+         except (KeyboardInterrupt, SystemExit):
+            print('Exception caught!')
+            response = self.sascfg._prompt(
+                      "SAS attention handling not yet supported over HTTP. Please enter (Q) to Quit waiting for results or (C) to continue waiting.")
+            while True:
+               if response.upper() == 'Q':
+                  yield SASevent('DONE', None)
+                  return
+               if response.upper() == 'C':
+                  break
+               response = self.sascfg._prompt("Please enter (Q) to Quit waiting for results or (C) to continue waiting.")
+
+      if results.upper() == "HTML":
+         lstd = self._getlst(jobid)
+      else:
+         lstd = self._getlsttxt(jobid)
+
+      if len(lstd):
+         yield SASevent('LST', lstd)
+
+      yield SASevent('DONE', None)
+
+   def submit_batch(self, code_list: list, results: str ="html") -> list:
+      '''
+      This method submits a list of code blocks at once and returns the results of each, as if each had been submit()'d.
+      With TEXT results, the blocks go to the Compute Service as one job, each followed by its own LOG and listing
+      markers, and the job's LOG and listing are split at the markers; so there is one POST, one wait and one get of the
+      LOG and listing for the whole batch.
+      The Compute Service gives a job's ODS output back as one HTML document, which can't be split by block, so with
+      HTML results each block is still POSTed as its own job (all of them before waiting on any; they run in order),
+      and each job is waited on and has its LOG and results fetched separately.
+      code_list - list of strings of SAS statements; each one is a block
+      results   - format of results, HTML is default, TEXT is the alternative
+
+      Returns - a list with a Dict for each block, in order, containing two keys:values, [LOG, LST], like submit()
+      '''
+      ret = []
+
+      if not len(code_list):
+         return []
+
+      if self._session == None:
+         print("No SAS process attached. SAS process has terminated unexpectedly.")
+         return [dict(LOG="No SAS process attached. SAS process has terminated unexpectedly.", LST='')]
+
+      text = results.upper() != "HTML"
+      if text:
+         logns = []
+         pgm   = ''
+         for code in code_list:
+            logn = self._logcnt()
+            logns.append(logn)
+            pgm += code+'\n'+lstmarkcode(logn)+"%put E3969440A681A24088859985"+logn+";\n"
+         jobs = [self._asubmit(pgm, results)]
+      else:
+         jobs = [self._asubmit(code, results) for code in code_list]
+
+      headers = {"Accept":"text/plain", "Authorization":"Bearer "+self.sascfg._token}
+
+      for jobid in jobs:
+         uri = None
+         for ld in jobid.get('links', []):
+            if ld.get('method') == 'GET' and ld.get('rel') == 'state':
+               uri = ld.get('uri')
+               break
+         if uri is None:
+            print("Problem submitting job to Compute Service.\n   Status code="+str(jobid.get('httpStatusCode'))+"\n   Message="+str(jobid.get('message')))
+            ret.append(dict(LOG=str(jobid), LST=''))
+            text = False
+            continue
+
+         done = False
+         while not done:
+            try:
+               while True:
+                  # GET Status for JOB
+                  conn = self.sascfg.HTTPConn; conn.connect()
+                  conn.request('GET', uri, headers=headers)
+                  req = conn.getresponse()
+                  resp = req.read()
+                  conn.close()
+                  if resp not in [b'running', b'pending']:
+                     done = True
+                     break
+                  sleep(.5)
+            except (KeyboardInterrupt, SystemExit):
+               print('Exception caught!')
+               response = self.sascfg._prompt(
+                         "SAS attention handling not yet supported over HTTP. Please enter (Q) to Quit waiting for results or (C) to continue waiting.")
+               while True:
+                  if response.upper() == 'Q':
+                     ret.append(dict(LOG='', LST='', BC=True))
+                     return ret
+                  if response.upper() == 'C':
+                     break
+                  response = self.sascfg._prompt("Please enter (Q) to Quit waiting for results or (C) to continue waiting.")
+
+         logd = self._getlog(jobid)
+
+         if results.upper() == "HTML":
+            lstd = self._getlst(jobid)
+         else:
+            lstd = self._getlsttxt(jobid)
+
+         ret.append(dict(LOG=logd, LST=lstd))
+
+      # not if the job couldn't be submitted or the wait was quit
+      if text and 'BC' not in ret[0]:
+         logs = splitlog(ret[0]['LOG'], logns)
+         lsts = splitlst(ret[0]['LST'], logns)
+         ret  = [dict(LOG=logs[i], LST=lsts[i]) for i in range(len(logs))]
+
+      return ret
+
+   def _jobstate(self, uri: str) -> bytes:
+      '''
+      GET the state of a job, i.e. b'running', b'pending' or b'completed'
+      '''
+      conn = self.sascfg.HTTPConn; conn.connect()
+      headers = {"Accept":"text/plain", "Authorization":"Bearer "+self.sascfg._token}
+      conn.request('GET', uri, headers=headers)
+      req = conn.getresponse()
+      resp = req.read()
+      conn.close()
+      return resp
+
+   async def submit_async(self, code: str, results: str ="html", prompt: dict = None) -> dict:
+      '''
+      This method is the coroutine version of submit(); it takes the same parameters and returns the same Dict.
+      It's thread-backed: each HTTP request (submitting the job, each poll of its state, getting the LOG and LST) is a
+      blocking call made in the event loop's executor. Between polls it waits with asyncio.sleep(), holding no thread.
+      Cancelling it stops the wait, not the job running in the Compute Service.
+      '''
+      import asyncio
+
+      prompt = prompt if prompt is not None else {}
+      loop   = asyncio.get_running_loop()
+
+      if self._session == None:
+         print("No SAS process attached. SAS process has terminated unexpectedly.")
+         return dict(LOG="No SAS process attached. SAS process has terminated unexpectedly.", LST='')
+
+      pcodei, pcodeiv, pcodeo = promptcode(prompt, self.sascfg._prompt)
+
+      jobid = await loop.run_in_executor(None, self._asubmit, pcodei+pcodeiv+code+'\n'+pcodeo, results)
+
+      uri = None
+      for ld in jobid.get('links', []):
+         if ld.get('method') == 'GET' and ld.get('rel') == 'state':
+            uri = ld.get('uri')
+            break
+      if uri is None:
+         print("Problem submitting job to Compute Service.\n   Status code="+str(jobid.get('httpStatusCode'))+"\n   Message="+str(jobid.get('message')))
+         return dict(LOG=str(jobid), LST='')
+
+      while await loop.run_in_executor(None, self._jobstate, uri) in [b'running', b'pending']:
+         await asyncio.sleep(.5)
+
+      logd = await loop.run_in_executor(None, self._getlog, jobid)
+
+      if results.upper() == "HTML":
+         lstd = await loop.run_in_executor(None, self._getlst, jobid)
+      else:
+         lstd = await loop.run_in_executor(None, self._getlsttxt, jobid)
+
+      return dict(LOG=logd, LST=lstd)
+
+   def saslog(self, last_n_steps: int = None, start: int = None, end: int = None):
       '''
-      this method is used to get the current, full contents of the SASLOG
+      this method is used to get the current, full contents of the SASLOG, or part of it
+      last_n_steps - just the LOG of the last n submits
+      start, end   - byte offsets of the part of the LOG to return
+      The full LOG comes from the Compute Service; the parts come from what this session has kept of it.
       '''
-      return self._getlog()
+      if last_n_steps is None and start is None and end is None:
+         return self._getlog()
+      return self._log.get(last_n_steps, start, end)
 
    def exist(self, table: str, libref: str ="") -> bool:
       '''
@@ -888,48 +1135,7 @@ class SASsessionHTTP():
          ll = self.submit(code, 'text')
          logf = ll['LOG']
 
-         # GET Etag
-         conn = self.sascfg.HTTPConn; conn.connect()
-         headers={"Accept":"application/vnd.sas.compute.fileref+json;application/json",
-                  "Authorization":"Bearer "+self.sascfg._token}
-         conn.request('GET', self._uri_files+"/_sp_updn", headers=headers)
-         req = conn.getresponse()
-         status = req.status
-         resp = req.read()
-         conn.close()
-
-         Etag = req.getheader("Etag")
-
-         # PUT data
-         conn = self.sascfg.HTTPConn; conn.connect()
-         headers={"Accept":"*/*","Content-Type":"application/octet-stream",
-                  "Transfer-Encoding" : "chunked",
-                  "Authorization":"Bearer "+self.sascfg._token}
-
-         conn.connect()
-         conn.putrequest('PUT', self._uri_files+"/_sp_updn/content")
-         conn.putheader("Accept","*/*")
-         conn.putheader("Content-Type","application/octet-stream")
-         conn.putheader("If-Match",Etag)
-         conn.putheader("Transfer-Encoding","chunked")
-         conn.putheader("Authorization","Bearer "+self.sascfg._token)
-         conn.endheaders()
-
-         while True:
-            buf = fd.read1(32768)
-            if len(buf) == 0:
-               conn.send(b"0\r\n\r\n")
-               break
-
-            lenstr = "%s\r\n" % hex(len(buf))[2:]
-            conn.send(lenstr.encode())
-            conn.send(buf)
-            conn.send(b"\r\n")
-
-         req    = conn.getresponse()
-         status = req.status
-         resp   = req.read()
-         conn.close()
+         self._putfile('_sp_updn', iter(lambda: fd.read1(32768), b''))
 
          code = "filename _sp_updn;"
       else:
@@ -951,6 +1157,56 @@ class SASsessionHTTP():
       return {'Success' : True, 
               'LOG'     : logf}
  
+   def _putfile(self, fileref: str, blocks) -> tuple:
+      """
+      This method writes bytes to an assigned fileref with one chunked PUT to its content in the files API, returning
+      the status and body of the response. If blocks raises an exception, the PUT is abandoned and it's raised.
+      fileref - the fileref to write to
+      blocks  - iterable of the bytes to write
+      """
+      # GET Etag
+      conn = self.sascfg.HTTPConn; conn.connect()
+      headers={"Accept":"application/vnd.sas.compute.fileref+json;application/json",
+               "Authorization":"Bearer "+self.sascfg._token}
+      conn.request('GET', self._uri_files+"/"+fileref, headers=headers)
+      req = conn.getresponse()
+      status = req.status
+      resp = req.read()
+      conn.close()
+
+      Etag = req.getheader("Etag")
+
+      # PUT data
+      conn = self.sascfg.HTTPConn
+      conn.connect()
+      conn.putrequest('PUT', self._uri_files+"/"+fileref+"/content")
+      conn.putheader("Accept","*/*")
+      conn.putheader("Content-Type","application/octet-stream")
+      conn.putheader("If-Match",Etag)
+      conn.putheader("Transfer-Encoding","chunked")
+      conn.putheader("Authorization","Bearer "+self.sascfg._token)
+      conn.endheaders()
+
+      try:
+         for buf in blocks:
+            if len(buf) == 0:
+               continue
+            lenstr = "%s\r\n" % hex(len(buf))[2:]
+            conn.send(lenstr.encode())
+            conn.send(buf)
+            conn.send(b"\r\n")
+      except BaseException:
+         conn.close()
+         raise
+      conn.send(b"0\r\n\r\n")
+
+      req    = conn.getresponse()
+      status = req.status
+      resp   = req.read()
+      conn.close()
+
+      return status, resp
+
    def download(self, localfile: str, remotefile: str, overwrite: bool = True, **kwargs):
       """
       This method downloads a remote file from the SAS servers file system.
@@ -1006,93 +1262,106 @@ class SASsessionHTTP():
       return {'Success' : True, 
               'LOG'     : logf}
  
+   def _logcnt(self, next=True):
+       if next == True:
+          self._log_cnt += 1
+       return '%08d' % self._log_cnt
+
    def _getbytelen(self, x):
       return len(x.encode(self.sascfg.encoding))
 
    def dataframe2sasdata(self, df: '<Pandas Data Frame object>', table: str ='a', 
-                         libref: str ="", keep_outer_quotes: bool=False):
+                         libref: str ="", keep_outer_quotes: bool=False, **kwargs):
       '''
       This method imports a Pandas Data Frame to a SAS Data Set, returning the SASdata object for the new Data Set.
       df      - Pandas Data Frame to import to a SAS Data Set
       table   - the name of the SAS Data Set to create
       libref  - the libref for the SAS Data Set being created. Defaults to WORK, or USER if assigned
       keep_outer_quotes - for character columns, have SAS keep any outer quotes instead of stripping them off.
+      lengths - {column name: length} for character columns, in place of their longest value (see charlens())
+      schema  - a SASschema to make the SAS Data Set with, rather than working it out from df (see SASschema)
+      check_lengths - check every character value fits its variable; by default, unless there's a schema
+      The rows are written to a temp file with one chunked PUT to the files API (see _putfile()), and read by one data
+      step. df can also be an iterable of Data Frames, which are written one after the other to the same file. The
+      columns and lengths are those of the first (or of schema), and the Data Set isn't created if a later one doesn't
+      fit them.
       '''
-      input  = ""
-      card   = ""
-      format = ""
-      length = ""
-      dts    = []
-      ncols  = len(df.columns)
-
-      for name in range(ncols):
-         input += "'"+str(df.columns[name])+"'n "
-         if df.dtypes[df.columns[name]].kind in ('O','S','U','V'):
-            try:
-               col_l = df[df.columns[name]].astype(str).apply(self._getbytelen).max()
-            except Exception as e:
-               print("Transcoding error encountered.")
-               print("DataFrame contains characters that can't be transcoded into the SAS session encoding.\n"+str(e))
-               return None
-            if col_l == 0:
-               col_l = 8
-            length += " '"+str(df.columns[name])+"'n $"+str(col_l)
-            if keep_outer_quotes:
-               input  += "~ "
-            dts.append('C')
+      chunks = df2sdchunks(df)
+      first  = next(chunks, None)
+      if first is None:
+         print("There are no Data Frames to import.")
+         return None
+
+      try:
+         schema = kwargs.get('schema')
+         check  = kwargs.get('check_lengths')
+         check  = schema is None if check is None else check
+         if schema is None:
+            schema = SASschema.from_df(first, self.sascfg.encoding, kwargs.get('lengths'))
          else:
-            if df.dtypes[df.columns[name]].kind in ('M'):
-               length += " '"+str(df.columns[name])+"'n 8"
-               input  += ":E8601DT26.6 "
-               format += "'"+str(df.columns[name])+"'n E8601DT26.6 "
-               dts.append('D')
-            else:
-               length += " '"+str(df.columns[name])+"'n 8"
-               if df.dtypes[df.columns[name]] == 'bool':
-                  dts.append('B')
-               else:
-                  dts.append('N')
+            df2sdcheck(first, schema, self.sascfg.encoding, 1, check)
+         length, format, input = df2sdvars(schema, keep_outer_quotes)
+      except Exception as e:
+         if type(e) is ValueError:
+            print(str(e))
+         else:
+            print("Transcoding error encountered.")
+            print("DataFrame contains characters that can't be transcoded into the SAS session encoding.\n"+str(e))
+         return None
 
-      code = "data "
       if len(libref):
-         code += libref+"."
-      code += table+";\n"
+         tabname = libref+"."+table
+      else:
+         tabname = table
+
+      chunks = itertools.chain([first], chunks)
+      del first
+
+      # the cards go into the _sp_df2sd temp file (assigned at startup) with one PUT, and are read by one job, rather
+      # than going into the code of a compute job every 4000 characters. That job also assigns a fresh, empty _sp_df2sd
+      # for the next one, so no job is spent on the fileref
+      reset = "filename _sp_df2sd temp recfm=N;\n"
+
+      lrecl = 1
+      def cards():
+         nonlocal lrecl
+         for n, chunk in enumerate(chunks, 1):
+            if n > 1:
+               df2sdcheck(chunk, schema, self.sascfg.encoding, n, check)
+            for card in df2sdcards(chunk, schema.kinds):
+               card  = card.encode(self.sascfg.encoding)
+               lrecl = max(lrecl, max(map(len, card.split(b'\n'))))
+               yield card
+
+      try:
+         status, resp = self._putfile('_sp_df2sd', cards())
+      except Exception as e:
+         print("The Data Frames couldn't all be imported, so the SAS Data Set wasn't created.\n"+str(e))
+         ll = self.submit(reset, 'text')
+         return None
+
+      if status not in (200, 201, 204):
+         print("The Data Frames couldn't be uploaded, so the SAS Data Set wasn't created. Status="+str(status)+"\n"+
+               resp.decode(errors='replace'))
+         ll = self.submit(reset, 'text')
+         return None
+
+      code = "data "+tabname+";\n"
       if len(length):
          code += "length "+length+";\n"
       if len(format):
          code += "format "+format+";\n"
-      code += "infile datalines delimiter='03'x DSD STOPOVER;\ninput @;\nif _infile_ = '' then delete;\ninput "+input+";\ndatalines4;"
-      self._asubmit(code, "text")
-
-      code = ""
-      for row in df.itertuples(index=False):
-         card  = ""
-         for col in range(ncols):
-            var = str(row[col])
-
-            if   dts[col] == 'N' and var == 'nan':
-               var = '.'
-            elif dts[col] == 'C' and var == 'nan':
-               var = ' '
-            elif dts[col] == 'B':
-               var = str(int(row[col]))
-            elif dts[col] == 'D':
-               if var == 'nan':
-                  var = '.'
-               else:
-                  var = str(row[col].to_datetime64())[:26]
-
-            card += var
-            if col < (ncols-1):
-               card += chr(3)
-         code += card+"\n"
-         if len(code) > 4000:
-            self._asubmit(code, "text")
-            code = ""
-
-      self._asubmit(code+";;;;", "text")
-      ll = self.submit("run;", 'text')
-      return
+      code += "infile _sp_df2sd recfm=V lrecl="+str(lrecl)+" delimiter='03'x DSD STOPOVER;\ninput @;\nif _infile_ = '' then delete;\n"
+      code += "input "+input+";\nrun;\n"
+      code += reset
+      ll = self.submit(code, 'text')
+
+      # only ERROR lines, not the echo of the code, whose column names could hold the word
+      if re.search(r'^ERROR', ll['LOG'], re.M):
+         print("The Data Frames couldn't be read into the SAS Data Set, so it wasn't created. See the LOG for the error.")
+         ll = self.submit("proc delete data="+tabname+"; run;", 'text')
+         return None
+      return True
 
    def sasdata2dataframe(self, table: str, libref: str ='', dsopts: dict ={}, **kwargs) -> '<Pandas Data Frame object>':
       '''
@@ -1100,6 +1369,8 @@ class SASsessionHTTP():
       table   - the name of the SAS Data Set you want to export to a Pandas Data Frame
       libref  - the libref for the SAS Data Set.
       '''
+      import pandas as pd
+      import numpy  as np
 
       method = kwargs.pop('method', None)
       if method and method.lower() == 'csv':
@@ -1176,7 +1447,7 @@ class SASsessionHTTP():
       uri = "/compute/sessions/"+self.pid+"/data/work/saspy_ds2df/rows"
 
       r     = []
-      df    = None
+      dfs   = []
       trows = kwargs.get('trows', None)
       if not trows:
          trows = 100000
@@ -1213,10 +1484,7 @@ class SASsessionHTTP():
                   tdf[varlist[i]] = tdf[varlist[i]].apply(str.strip)
                   tdf[varlist[i]].replace('', np.NaN, True)
                                           
-            if df is not None:
-               df = df.append(tdf, ignore_index=True)
-            else:
-               df = tdf
+            dfs.append(tdf)
             r = []
                
          uri = None
@@ -1241,12 +1509,9 @@ class SASsessionHTTP():
                tdf[varlist[i]] = tdf[varlist[i]].apply(str.strip)
                tdf[varlist[i]].replace('', np.NaN, True)
 
-         if df is not None:
-            df = df.append(tdf, ignore_index=True)
-         else:
-            df = tdf
+         dfs.append(tdf)
 
-      return df
+      return concatchunks(dfs) if len(dfs) else None
 
 
    def sasdata2dataframeCSV(self, table: str, libref: str ='', dsopts: dict ={}, tempfile: str=None, tempkeep: bool=False, **kwargs) -> '<Pandas Data Frame object>':
@@ -1258,6 +1523,7 @@ class SASsessionHTTP():
       tempfile - file to use to store CSV, else temporary file will be used.
       tempkeep - if you specify your own file to use with tempfile=, this controls whether it's cleaned up after using it
       '''
+      import pandas as pd
 
       if libref:
          tabname = libref+"."+table
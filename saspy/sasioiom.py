@@ -15,17 +15,19 @@
 #
 
 import os
+import re
+import selectors
 import subprocess
-from time import sleep
+from time import sleep, time
 import socket as socks
 import tempfile as tf
 import codecs
+import itertools
 
-try:
-   import pandas as pd
-   import numpy  as np
-except ImportError:
-   pass
+from saspy.sasiocommons import SASbuffer, SASevent, SASlogLines, SASsessionLog, lstmarkcode, splitlog, splitlst
+from saspy.sasiocommons import binputcode, bin2df, concatchunks, SASrowreader, readrows, sd2dfputcode, sd2dfformatcode
+from saspy.sasiocommons import df2sdchunks, df2sdcheck, df2sdvars, df2sdcards, df2sdbin, SASschema
+from saspy.sasiocommons import df2sdhex, lstclean, metacheckcode, promptcode
 
 try:
    import fcntl
@@ -220,14 +222,17 @@ class SASsessionIOM():
       self.stdin  = None
       self.stderr = None
       self.stdout = None
+      self._sel   = {}
 
       self._sb      = kwargs.get('sb', None)
       self.sascfg   = SASconfigIOM(self, **kwargs)
       self._log_cnt = 0
-      self._log     = ""
+      self._log     = SASsessionLog(self._sb.sascfg.logsize, self._sb.sascfg.logspill)
       self._tomods1 = b"_tomods1"
+      # the Java client's parameters and such while a standby session's is started, but not connected yet
+      self._spawned = False
 
-      self._startsas()
+      self._startsas(not kwargs.get('_standby', False))
 
    def __del__(self):
       if self.pid:
@@ -240,10 +245,108 @@ class SASsessionIOM():
           self._log_cnt += 1
        return '%08d' % self._log_cnt
 
-   def _startsas(self):
-      if self.pid:
+   def _startsas(self, setup: bool = True):
+      if self.pid and not self._spawned:
          return self.pid
 
+      if not self.pid:
+         spawned = self._spawnsas()
+         if spawned is None:
+            return None
+         if not setup:
+            # a standby session (see SASsession's standby): Java starts up on its own, and connecting it to the
+            # workspace server is left for the SASsession that takes it over, which calls this again
+            self._spawned = spawned
+            return self.pid
+      else:
+         spawned, self._spawned = self._spawned, False
+
+      zero, pw, pgm, parms, s, pid = (spawned[k] for k in ('zero', 'pw', 'pgm', 'parms', 's', 'pid'))
+      # Java gets a second to start, or fail to; a standby session has had some of it already
+      wait = max(0, 1 - (time() - spawned['at']))
+
+      if os.name == 'nt':
+         try:
+            self.pid.wait(wait)
+
+            error  = self.pid.stderr.read(4096).decode()+'\n'
+            error += self.pid.stdout.read(4096).decode()
+            print("Java Error:\n"+error)
+
+            print("Subprocess failed to start. Double check your settings in sascfg_personal.py file.\n")
+            print("Attempted to run program "+pgm+" with the following parameters:"+str(parms)+"\n")
+            print("If no Java Error above, try running the following command (where saspy is running) manually to see if it's a problem starting Java:\n"+s+"\n")
+            self.pid = None
+            return None
+         except:
+            pass
+      else:
+
+         self.pid    = pidpty[0]
+         self.stdin  = os.fdopen(pin[PIPE_WRITE], mode='wb')
+         self.stderr = os.fdopen(perr[PIPE_READ], mode='rb')
+         self.stdout = os.fdopen(pout[PIPE_READ], mode='rb')
+
+         fcntl.fcntl(self.stdout, fcntl.F_SETFL, os.O_NONBLOCK)
+         fcntl.fcntl(self.stderr, fcntl.F_SETFL, os.O_NONBLOCK)
+
+         sleep(wait)
+         rc = os.waitpid(self.pid, os.WNOHANG)
+         if rc[0] == 0:
+            pass
+         else:
+            error  = self.stderr.read1(4096).decode()+'\n'
+            error += self.stdout.read1(4096).decode()
+            print("Java Error:\n"+error)
+            print("SAS Connection failed. No connection established. Staus="+str(rc)+"  Double check your settings in sascfg_personal.py file.\n")
+            print("Attempted to run program "+pgm+" with the following parameters:"+str(parms)+"\n")
+            print("If no Java Error above, try running the following command (where saspy is running) manually to see if it's a problem starting Java:\n"+s+"\n")
+            self.pid = None
+            return None
+
+      self.stdin  = self.sockin.accept()
+      self.stdout = self.sockout.accept()
+      self.stderr = self.sockerr.accept()
+      self.stdout[0].setblocking(False)
+      self.stderr[0].setblocking(False)
+
+      if not zero:
+         if not self.sascfg.sspi:
+            while len(pw) == 0:
+               pw = self.sascfg._prompt("Please enter the password for IOM user "+self.sascfg.omruser+": ", pw=True)
+               if pw is None:
+                  if os.name == 'nt':
+                     self.pid.kill()
+                  else:
+                     os.kill(self.pid, signal.SIGKILL)
+                  self.pid = None
+                  raise KeyboardInterrupt
+            pw += '\n'
+            self.stdin[0].send(pw.encode())
+
+      enc = self.sascfg.encoding #validating encoding is done next, so handle it not being set for this one call
+      if enc == '':
+         self.sascfg.encoding = 'utf-8'
+      # the session's own setup goes in the same submit as saspy's, to connect in one round trip
+      boot = time()
+      ll   = self.submit("options svgtitle='svgtitle'; options validvarname=any pagesize=max nosyntaxcheck; ods graphics on;\n"+self._sb._bootcode(), "text")
+      self._boottime = time() - boot
+      self._bootlog  = ll['LOG']
+      self.sascfg.encoding = enc
+
+      if self.pid is None:
+         print(ll['LOG'])
+         print("SAS Connection failed. No connection established. Double check your settings in sascfg_personal.py file.\n")
+         print("Attempted to run program "+pgm+" with the following parameters:"+str(parms)+"\n")
+         if zero:
+            print("Be sure the path to sspiauth.dll is in your System PATH"+"\n")
+         return None
+
+      if self.sascfg.verbose:
+         print("SAS Connection established. Subprocess id is "+str(pid)+"\n")
+      return self.pid
+
+   def _spawnsas(self) -> dict:
       # check for local iom server
       if len(self.sascfg.iomhost) > 0:
          zero = False
@@ -410,85 +513,22 @@ Will use HTML5 for this SASsession.""")
                print("If no OS Error above, try running the following command (where saspy is running) manually to see what is wrong:\n"+s+"\n")
                os._exit(-6)
 
-      if os.name == 'nt':
-         try:
-            self.pid.wait(1)
-
-            error  = self.pid.stderr.read(4096).decode()+'\n'
-            error += self.pid.stdout.read(4096).decode()
-            print("Java Error:\n"+error)
-
-            print("Subprocess failed to start. Double check your settings in sascfg_personal.py file.\n")
-            print("Attempted to run program "+pgm+" with the following parameters:"+str(parms)+"\n")
-            print("If no Java Error above, try running the following command (where saspy is running) manually to see if it's a problem starting Java:\n"+s+"\n")
-            self.pid = None
-            return None
-         except:
-            pass
-      else:
-
-         self.pid    = pidpty[0]
-         self.stdin  = os.fdopen(pin[PIPE_WRITE], mode='wb')
-         self.stderr = os.fdopen(perr[PIPE_READ], mode='rb')
-         self.stdout = os.fdopen(pout[PIPE_READ], mode='rb')
-
-         fcntl.fcntl(self.stdout, fcntl.F_SETFL, os.O_NONBLOCK)
-         fcntl.fcntl(self.stderr, fcntl.F_SETFL, os.O_NONBLOCK)
-
-         sleep(1)
-         rc = os.waitpid(self.pid, os.WNOHANG)
-         if rc[0] == 0:
-            pass
-         else:
-            error  = self.stderr.read1(4096).decode()+'\n'
-            error += self.stdout.read1(4096).decode()
-            print("Java Error:\n"+error)
-            print("SAS Connection failed. No connection established. Staus="+str(rc)+"  Double check your settings in sascfg_personal.py file.\n")
-            print("Attempted to run program "+pgm+" with the following parameters:"+str(parms)+"\n")
-            print("If no Java Error above, try running the following command (where saspy is running) manually to see if it's a problem starting Java:\n"+s+"\n")
-            self.pid = None
-            return None
-
-      self.stdin  = self.sockin.accept()
-      self.stdout = self.sockout.accept()
-      self.stderr = self.sockerr.accept()
-      self.stdout[0].setblocking(False)
-      self.stderr[0].setblocking(False)
-
-      if not zero:
-         if not self.sascfg.sspi:
-            while len(pw) == 0:
-               pw = self.sascfg._prompt("Please enter the password for IOM user "+self.sascfg.omruser+": ", pw=True)
-               if pw is None:
-                  if os.name == 'nt':
-                     self.pid.kill()
-                  else:
-                     os.kill(self.pid, signal.SIGKILL)
-                  self.pid = None
-                  raise KeyboardInterrupt
-            pw += '\n'
-            self.stdin[0].send(pw.encode())
-
-      enc = self.sascfg.encoding #validating encoding is done next, so handle it not being set for this one call
-      if enc == '':
-         self.sascfg.encoding = 'utf-8'
-      ll = self.submit("options svgtitle='svgtitle'; options validvarname=any pagesize=max nosyntaxcheck; ods graphics on;", "text")
-      self.sascfg.encoding = enc
-
-      if self.pid is None:
-         print(ll['LOG'])
-         print("SAS Connection failed. No connection established. Double check your settings in sascfg_personal.py file.\n")
-         print("Attempted to run program "+pgm+" with the following parameters:"+str(parms)+"\n")
-         if zero:
-            print("Be sure the path to sspiauth.dll is in your System PATH"+"\n")
-         return None
-
-      if self.sascfg.verbose:
-         print("SAS Connection established. Subprocess id is "+str(pid)+"\n")
-      return self.pid
+      return dict(zero=zero, pw=pw if not zero and not self.sascfg.sspi else '', pgm=pgm, parms=parms, s=s, pid=pid, at=time())
 
    def _endsas(self):
       rc = 0
+      if self.pid and self._spawned:
+         # a standby session's Java client, never connected to a workspace server; there's no SAS to end
+         if os.name == 'nt':
+            self.pid.kill()
+         else:
+            os.kill(self.pid, signal.SIGKILL)
+            os.waitpid(self.pid, 0)
+         self.sockin.close()
+         self.sockout.close()
+         self.sockerr.close()
+         self.pid      = None
+         self._spawned = False
       if self.pid:
          self.stdin[0].send(b'\ntom says EOL=ENDSAS                          \n')
          if os.name == 'nt':
@@ -532,6 +572,10 @@ Will use HTML5 for this SASsession.""")
          self.stderr[0].close()
          self.sockerr.close()
 
+         for sel in self._sel.values():
+            sel.close()
+         self._sel = {}
+
          if self.sascfg.verbose:
             print("SAS Connection terminated. Subprocess id was "+str(pid))
          self.pid        = None
@@ -561,7 +605,8 @@ Will use HTML5 for this SASsession.""")
             sleep(0.5)
 
       x = logf.decode(errors='replace').replace(code1, " ")
-      self._log += x
+      # what's left of the LOG of the last step, not a step of its own
+      self._log.append(x, newstep=False)
 
       if os.name == 'nt':
          try:
@@ -739,18 +784,11 @@ Will use HTML5 for this SASsession.""")
       odsclose = b"ods "+self.sascfg.output.encode()+b" (id=saspy_internal) close;ods listing;\n"
       ods      = True;
       mj       = b";*\';*\";*/;"
-      lstf     = b''
-      logf     = b''
-      bail     = False
-      eof      = 5
-      bc       = False
-      done     = False
       logn     = self._logcnt()
       logcodei = "%put E3969440A681A24088859985" + logn + ";"
       logcodeo = b"\nE3969440A681A24088859985" + logn.encode()
-      pcodei   = ''
-      pcodeiv  = ''
-      pcodeo   = ''
+      lstf     = SASbuffer(logcodeo)
+      logf     = SASbuffer(logcodeo)
       pgm      = b''
 
       if self.pid == None:
@@ -786,26 +824,7 @@ Will use HTML5 for this SASsession.""")
       if results.upper() != "HTML":
          ods = False
 
-      if len(prompt):
-         pcodei += 'options nosource nonotes;\n'
-         pcodeo += 'options nosource nonotes;\n'
-         for key in prompt:
-            gotit = False
-            while not gotit:
-               var = self.sascfg._prompt('Please enter value for macro variable '+key+' ', pw=prompt[key])
-               if var is None:
-                  raise KeyboardInterrupt
-               if len(var) > 0:
-                  gotit = True
-               else:
-                  print("Sorry, didn't get a value for that variable.")
-            if prompt[key]:
-               pcodei += '%let '+key+'='+var+';\n'
-               pcodeo += '%symdel '+key+';\n'
-            else:
-               pcodeiv += '%let '+key+'='+var+';\n'
-         pcodei += 'options source notes;\n'
-         pcodeo += 'options source notes;\n'
+      pcodei, pcodeiv, pcodeo = promptcode(prompt, self.sascfg._prompt)
 
       if ods:
          pgm += odsopen
@@ -819,94 +838,126 @@ Will use HTML5 for this SASsession.""")
       pgm += b'\n'+logcodei.encode()+b'\n'
       self.stdin[0].send(pgm+b'tom says EOL='+logcodeo+b'\n')
 
-      while not done:
+      for kind, data in self._readloop(logcodei, logcodeo, odsclose, lambda: logf.found and lstf.found):
+         if kind == 'LST':
+            lstf += data
+         elif kind == 'LOG':
+            logf += data
+         else:
+            return self._readend(kind, data, logf)
+
+      return self._submitresults(self._lsttail(lstf, logcodeo), logf, logcodei, mj)
+
+   def _readloop(self, logcodei: str, logcodeo: bytes, odsclose: bytes, done, wait: float = 0.5):
+      '''
+      Generator of what the Java client sends for the code submit(), submit_stream(), submit_batch() and submit_async()
+      just sent it: ('LST', bytes) and ('LOG', bytes) as they're read, until done() says the caller has seen the end of
+      step marker (logcodeo) in both the LOG and the LST, which the Java client follows with it. Each read waits up to
+      wait seconds; with wait=0, ('WAIT', None) is yielded when there was nothing to read, for the caller to wait
+      itself. If the SAS process ends, ('EXIT', rc) is yielded last, ('RESET', rc) if a socket is reset, and
+      ('ABORT', dict) if SAS is terminated at the attention prompt; see _readend(). An interrupt goes to
+      _breakprompt(), and then the LOG and LST it read are yielded like the rest.
+      '''
+      bc = False
+
+      while True:
          try:
-             while True:
-                 if os.name == 'nt':
-                    try:
-                       rc = self.pid.wait(0)
-                       self.pid = None
-                       self._sb.SASpid = None
-                       log = logf.partition(logcodeo)[0]+b'\nSAS process has terminated unexpectedly. RC from wait was: '+str(rc).encode()
-                       return dict(LOG=log.decode(errors='replace'), LST='')
-                    except:
-                       pass
-                 else:
-                    #rc = os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOHANG)
-                    rc = os.waitpid(self.pid, os.WNOHANG)
-                    #if rc is not None:
-                    if rc[1]:
-                       self.pid = None
-                       self._sb.SASpid = None
-                       log = logf.partition(logcodeo)[0]+b'\nSAS process has terminated unexpectedly. Pid State= '+str(rc).encode()
-                       return dict(LOG=log.decode(errors='replace'), LST='')
-
-                 if bail:
-                    if lstf.count(logcodeo) >= 1:
-                       x = lstf.rsplit(logcodeo)
-                       lstf = x[0]
-                       if len(x[1]) > 7 and b"_tomods" in x[1]:
-                          self._tomods1 = x[1]
-                          #print("Tomods is now "+ self._tomods1.decode())
-                       break
-                 try:
-                    lst = self.stdout[0].recv(4096)
-                 except (BlockingIOError):
-                    lst = b''
-
-                 if len(lst) > 0:
-                    #print("LIST = \n"+lst)
-                    lstf += lst
-                 else:
-                    sleep(0.1)
-                    try:
-                       log = self.stderr[0].recv(4096)
-                    except (BlockingIOError):
-                       log = b''
-
-                    if len(log) > 0:
-                       #print("LOG = \n"+log)
-                       logf += log
-                       if logf.count(logcodeo) >= 1:
-                          bail = True
-                       if not bail and bc:
-                          self.stdin[0].send(odsclose+logcodei.encode()+b'tom says EOL='+logcodeo+b'\n')
-                          bc = False
-             done = True
+            while not done():
+               rc = None
+               if os.name == 'nt':
+                  try:
+                     rc = self.pid.wait(0)
+                  except:
+                     pass
+               else:
+                  rc = os.waitpid(self.pid, os.WNOHANG)
+                  if not rc[1]:
+                     rc = None
+               if rc is not None:
+                  self.pid = None
+                  self._sb.SASpid = None
+                  yield 'EXIT', rc
+                  return
+
+               lst, log = self._readio(wait)
+               if len(lst) > 0:
+                  yield 'LST', lst
+               if len(log) > 0:
+                  yield 'LOG', log
+                  if not done() and bc:
+                     self.stdin[0].send(odsclose+logcodei.encode()+b'tom says EOL='+logcodeo+b'\n')
+                     bc = False
+               elif not len(lst) and not wait:
+                  yield 'WAIT', None
+            return
 
          except (ConnectionResetError):
-             rc = 0
-             if os.name == 'nt':
-                try:
-                   rc = self.pid.wait()
-                except:
-                   pass
-             else:
-                rc = os.waitpid(self.pid, 0)
+            rc = 0
+            if os.name == 'nt':
+               try:
+                  rc = self.pid.wait()
+               except:
+                  pass
+            else:
+               rc = os.waitpid(self.pid, 0)
 
-             self.pid = None
-             self._sb.SASpid = None
-             log =logf.partition(logcodeo)[0]+b'\nConnection Reset: SAS process has terminated unexpectedly. Pid State= '+str(rc).encode()
-             return dict(LOG=log.decode(errors='replace'), LST='')
+            self.pid = None
+            self._sb.SASpid = None
+            yield 'RESET', rc
+            return
 
          except (KeyboardInterrupt, SystemExit):
-             print('Exception caught!')
-             ll = self._breakprompt(logcodeo)
+            print('Exception caught!')
+            ll = self._breakprompt(logcodeo)
 
-             if ll.get('ABORT', False):
-                return ll
+            if ll.get('ABORT', False):
+               yield 'ABORT', ll
+               return
 
-             logf += ll['LOG']
-             lstf += ll['LST']
-             bc    = ll['BC']
+            if len(ll['LOG']):
+               yield 'LOG', ll['LOG']
+            if len(ll['LST']):
+               yield 'LST', ll['LST']
+            bc = ll['BC']
 
-             if not bc:
-                print('Exception handled :)\n')
-             else:
-                print('Exception ignored, continuing to process...\n')
+            if not bc:
+               print('Exception handled :)\n')
+            else:
+               print('Exception ignored, continuing to process...\n')
 
-             self.stdin[0].send(odsclose+logcodei.encode()+b'tom says EOL='+logcodeo+b'\n')
+            self.stdin[0].send(odsclose+logcodei.encode()+b'tom says EOL='+logcodeo+b'\n')
 
+   def _readend(self, kind: str, data, logf: SASbuffer = None) -> dict:
+      '''
+      Return the Dict for a submit to return when _readloop() ends with EXIT, RESET or ABORT (data is what came with
+      it), with the LOG read so far (logf).
+      '''
+      logf = logf if logf is not None else SASbuffer()
+      if kind == 'ABORT':
+         return data
+      if kind == 'EXIT' and os.name == 'nt':
+         msg = b'\nSAS process has terminated unexpectedly. RC from wait was: '
+      elif kind == 'EXIT':
+         msg = b'\nSAS process has terminated unexpectedly. Pid State= '
+      else:
+         msg = b'\nConnection Reset: SAS process has terminated unexpectedly. Pid State= '
+      log = logf.partition()[0]+msg+str(data).encode()
+      return dict(LOG=log.decode(errors='replace'), LST='')
+
+   def _lsttail(self, lstf, logcodeo: bytes) -> bytes:
+      '''
+      Return the LST a submit read, up to the end of step marker (logcodeo) the Java client follows it with, and take
+      the current _tomods fileref from after it.
+      '''
+      x = bytes(lstf).split(logcodeo)
+      if len(x) > 1 and len(x[1]) > 7 and b"_tomods" in x[1]:
+         self._tomods1 = x[1]
+      return x[0]
+
+   def _submitresults(self, lstf: bytes, logf, logcodei: str, mj: bytes) -> dict:
+      '''
+      Decode and trim the LST and LOG a submit read, add the LOG to the session log and return them as submit() does.
+      '''
       try:
          lstf = lstf.decode()
       except UnicodeDecodeError:
@@ -928,51 +979,320 @@ Will use HTML5 for this SASsession.""")
       zz = z[0].rpartition("\nE3969440A681A24088859985" + prev +'\n')
       logd = zz[2].replace(mj.decode(), '')
 
-      lstd = lstf.replace(chr(12), chr(10)).replace('<body class="c body">',
-                                                    '<body class="l body">').replace("font-size: x-small;",
-                                                                                     "font-size:  normal;")
+      lstd = lstclean(lstf)
       return dict(LOG=logd, LST=lstd)
 
-   def _breakprompt(self, eos):
-        found = False
-        logf  = b''
-        lstf  = b''
-        bc    = False
+   def _readio(self, timeout, which='ALL'):
+      '''
+      Wait up to timeout seconds for the Java IOM client to send LST and/or LOG over its sockets, then read what is
+      available from each ready socket.
+      timeout - seconds to wait for data; 0 just checks what is already there
+      which   - 'LST' for the listing socket only, 'LOG' for the log socket only, 'ALL' for both
+      Returns - a tuple of (lst, log) bytes; either is b'' if nothing was read from that socket
+      '''
+      lst = b''
+      log = b''
 
-        if self.pid is None:
-            self._sb.SASpid = None
-            return dict(LOG=b"No SAS process attached. SAS process has terminated unexpectedly.", LST=b'', ABORT=True)
+      if not self._sel:
+         for w, socs in (('LST', (self.stdout[0],)), ('LOG', (self.stderr[0],)), ('ALL', (self.stdout[0], self.stderr[0]))):
+            sel = selectors.DefaultSelector()
+            for soc in socs:
+               sel.register(soc, selectors.EVENT_READ)
+            self._sel[w] = sel
 
-        if True:
-           response = self.sascfg._prompt(
-                     "SAS attention handling is not yet supported over IOM. Please enter (T) to terminate SAS or (C) to continue.")
-           while True:
-              if response is None or response.upper() == 'C':
-                 return dict(LOG=b'', LST=b'', BC=True)
-              if response.upper() == 'T':
-                 break
-              response = self.sascfg._prompt("Please enter (T) to terminate SAS or (C) to continue.")
+      for key, events in self._sel[which].select(timeout):
+         try:
+            data = key.fileobj.recv(4096)
+         except (BlockingIOError):
+            continue
+         if len(data) == 0:
+            raise ConnectionResetError
+         if key.fileobj is self.stdout[0]:
+            lst = data
+         else:
+            log = data
 
-        if os.name == 'nt':
-           self.pid.kill()
-        else:
-           interrupt = signal.SIGINT
-           os.kill(self.pid, interrupt)
-           sleep(.25)
+      return lst, log
 
-        self.pid = None
-        self._sb.SASpid = None
-        return dict(LOG=b"SAS process terminated", LST=b'', ABORT=True)
+   def submit_stream(self, code: str, results: str ="html", prompt: dict = None):
+      '''
+      This method is a generator version of submit(). Rather than returning the whole LOG and LST once the code has finished,
+      it yields SASevent(type, data) tuples as SAS writes them, so you can follow a long running job and keep only what you need.
+      code    - the SAS statements you want to execute
+      results - format of results, HTML is default, TEXT is the alternative
+      prompt  - dict of names:flags to prompt for; see submit()
 
+      Yields - SASevent tuples; type is 'LOG' (a line of the LOG), 'STEP' (a step finished; data is the NOTE: line that said so),
+               'LST' (the next chunk of the listing) or 'DONE' (finished; always the last event)
+      '''
+      prompt = prompt if prompt is not None else {}
 
+      odsopen  = b"ods listing close;ods "+self.sascfg.output.encode()+ \
+                 b" (id=saspy_internal) file="+self._tomods1+b" options(bitmap_mode='inline') device=svg style="+self._sb.HTML_Style.encode()+ \
+                 b"; ods graphics on / outputfmt=png;\n"
+      odsclose = b"ods "+self.sascfg.output.encode()+b" (id=saspy_internal) close;ods listing;\n"
+      ods      = True;
+      mj       = b";*\';*\";*/;"
+      logn     = self._logcnt()
+      logcodei = "%put E3969440A681A24088859985" + logn + ";"
+      logcodeo = b"\nE3969440A681A24088859985" + logn.encode()
+      keep     = len(logcodeo) - 1
+      pend     = b''
+      steplog  = False
+      pgm      = b''
 
+      if self.pid == None:
+         self._sb.SASpid = None
+         print("No SAS process attached. SAS process has terminated unexpectedly.")
+         yield SASevent('LOG', "No SAS process attached. SAS process has terminated unexpectedly.")
+         yield SASevent('DONE', None)
+         return
 
-        """
-        while True:
-            rc = os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOHANG)
-            if rc is not None:
-                self.pid = None
-                self._sb.SASpid = None
+      if results.upper() != "HTML":
+         ods = False
+
+      pcodei, pcodeiv, pcodeo = promptcode(prompt, self.sascfg._prompt)
+
+      lines = SASlogLines('utf-8', logcodeo.decode(), mj.decode())
+      lstd  = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+      if ods:
+         pgm += odsopen
+
+      pgm += mj+b'\n'+pcodei.encode()+pcodeiv.encode()
+      pgm += code.encode()+b'\n'+pcodeo.encode()+b'\n'+mj
+
+      if ods:
+         pgm += odsclose
+
+      pgm += b'\n'+logcodei.encode()+b'\n'
+      self.stdin[0].send(pgm+b'tom says EOL='+logcodeo+b'\n')
+
+      for kind, data in self._readloop(logcodei, logcodeo, odsclose, lambda: lines.done and logcodeo in pend):
+         if kind == 'LST':
+            pend += data
+            if logcodeo not in pend and len(pend) > keep:
+               yield SASevent('LST', lstclean(lstd.decode(pend[:-keep])))
+               pend = pend[-keep:]
+         elif kind == 'LOG':
+            evs = lines.feed(data)
+            self._log.append(''.join(ev.data+'\n' for ev in evs if ev.type == 'LOG'), newstep=not steplog)
+            steplog = True
+            for ev in evs:
+               yield ev
+         else:
+            if kind == 'ABORT':
+               yield SASevent('LOG', data['LOG'].decode(errors='replace'))
+            else:
+               yield SASevent('LOG', self._readend(kind, data)['LOG'].strip())
+            yield SASevent('DONE', None)
+            return
+
+      # the Java client follows the LST with the marker (and the current _tomods fileref)
+      lst = self._lsttail(pend, logcodeo)
+      if len(lst):
+         yield SASevent('LST', lstclean(lstd.decode(lst, final=True)))
+
+      for ev in lines.flush():
+         yield ev
+
+      yield SASevent('DONE', None)
+
+   def submit_batch(self, code_list: list, results: str ="html") -> list:
+      '''
+      This method submits a list of code blocks at once and returns the results of each, as if each had been submit()'d.
+      The blocks go to SAS as one program, each followed by its own end of step marker, so there is only one round trip
+      for the whole batch instead of one per block.
+      That's only for TEXT results. The Java client gives each program one fileref for its ODS output, and the HTML
+      documents of several blocks can't share it, so with HTML results each block is submit()'d on its own instead:
+      one round trip per block, the same as calling submit() in a loop.
+      code_list - list of strings of SAS statements; each one is a block
+      results   - format of results, HTML is default, TEXT is the alternative
+
+      Returns - a list with a Dict for each block, in order, containing two keys:values, [LOG, LST], like submit()
+      '''
+      if results.upper() == "HTML":
+         return [self.submit(code, results) for code in code_list]
+
+      mj       = b";*\';*\";*/;"
+      logns    = []
+      pgm      = b''
+
+      if not len(code_list):
+         return []
+
+      if self.pid == None:
+         self._sb.SASpid = None
+         print("No SAS process attached. SAS process has terminated unexpectedly.")
+         return [dict(LOG="No SAS process attached. SAS process has terminated unexpectedly.", LST='')]
+
+      if os.name == 'nt':
+         try:
+            rc = self.pid.wait(0)
+            self.pid = None
+            self._sb.SASpid = None
+            return [dict(LOG='SAS process has terminated unexpectedly. RC from wait was: '+str(rc), LST='')]
+         except:
+            pass
+      else:
+         rc = os.waitpid(self.pid, os.WNOHANG)
+         if rc[1]:
+            self.pid = None
+            self._sb.SASpid = None
+            return [dict(LOG='SAS process has terminated unexpectedly. Pid State= '+str(rc), LST='')]
+
+      for code in code_list:
+         logn = self._logcnt()
+         logns.append(logn)
+
+         pgm += mj+b'\n'+code.encode()+b'\n'+mj
+         pgm += b'\n'+lstmarkcode(logn).encode()
+         pgm += b'\n'+("%put E3969440A681A24088859985" + logn + ";").encode()+b'\n'
+
+      logcodei = "%put E3969440A681A24088859985" + logns[-1] + ";"
+      logcodeo = b"\nE3969440A681A24088859985" + logns[-1].encode()
+      lstf     = SASbuffer(logcodeo)
+      logf     = SASbuffer(logcodeo)
+
+      self.stdin[0].send(pgm+b'tom says EOL='+logcodeo+b'\n')
+
+      for kind, data in self._readloop(logcodei, logcodeo, b'', lambda: logf.found and lstf.found):
+         if kind == 'LST':
+            lstf += data
+         elif kind == 'LOG':
+            logf += data
+         else:
+            return [self._readend(kind, data, logf)]
+
+      lstf = self._lsttail(lstf, logcodeo)
+
+      try:
+         lstf = lstf.decode()
+      except UnicodeDecodeError:
+         try:
+            lstf = lstf.decode(self.sascfg.encoding)
+         except UnicodeDecodeError:
+            lstf = lstf.decode(errors='replace')
+
+      logf = logf.decode(errors='replace')
+      self._log += logf
+
+      logs = splitlog(logf, logns, mj.decode())
+      lsts = splitlst(lstf, logns)
+
+      return [dict(LOG=logs[i], LST=lstclean(lsts[i])) for i in range(len(logs))]
+
+   async def submit_async(self, code: str, results: str ="html", prompt: dict = None) -> dict:
+      '''
+      This method is the asyncio version of submit(); it takes the same parameters and returns the same Dict.
+      Rather than blocking while SAS runs the code, it waits on the sockets from the Java client with the event loop's
+      add_reader(), so other tasks keep running. Cancelling it stops the wait, not the code running in SAS.
+      Event loops without add_reader() (the Windows proactor loop) run submit() in the loop's executor instead.
+      '''
+      import asyncio
+
+      prompt = prompt if prompt is not None else {}
+
+      odsopen  = b"ods listing close;ods "+self.sascfg.output.encode()+ \
+                 b" (id=saspy_internal) file="+self._tomods1+b" options(bitmap_mode='inline') device=svg style="+self._sb.HTML_Style.encode()+ \
+                 b"; ods graphics on / outputfmt=png;\n"
+      odsclose = b"ods "+self.sascfg.output.encode()+b" (id=saspy_internal) close;ods listing;\n"
+      ods      = True;
+      mj       = b";*\';*\";*/;"
+      loop     = asyncio.get_running_loop()
+      ready    = asyncio.Event()
+      fds      = []
+
+      if self.pid == None:
+         self._sb.SASpid = None
+         print("No SAS process attached. SAS process has terminated unexpectedly.")
+         return dict(LOG="No SAS process attached. SAS process has terminated unexpectedly.", LST='')
+
+      try:
+         for soc in (self.stdout[0], self.stderr[0]):
+            loop.add_reader(soc.fileno(), ready.set)
+            fds.append(soc.fileno())
+      except NotImplementedError:
+         return await loop.run_in_executor(None, self.submit, code, results, prompt)
+
+      if results.upper() != "HTML":
+         ods = False
+
+      logn     = self._logcnt()
+      logcodei = "%put E3969440A681A24088859985" + logn + ";"
+      logcodeo = b"\nE3969440A681A24088859985" + logn.encode()
+      lstf     = SASbuffer(logcodeo)
+      logf     = SASbuffer(logcodeo)
+
+      try:
+         pcodei, pcodeiv, pcodeo = promptcode(prompt, self.sascfg._prompt)
+
+         pgm  = odsopen if ods else b''
+         pgm += mj+b'\n'+pcodei.encode()+pcodeiv.encode()
+         pgm += code.encode()+b'\n'+pcodeo.encode()+b'\n'+mj
+         pgm += odsclose if ods else b''
+         pgm += b'\n'+logcodei.encode()+b'\n'
+         self.stdin[0].send(pgm+b'tom says EOL='+logcodeo+b'\n')
+
+         for kind, data in self._readloop(logcodei, logcodeo, odsclose, lambda: logf.found and lstf.found, wait=0):
+            if kind == 'LST':
+               lstf += data
+            elif kind == 'LOG':
+               logf += data
+            elif kind == 'WAIT':
+               ready.clear()
+               try:
+                  await asyncio.wait_for(ready.wait(), 0.5)
+               except asyncio.TimeoutError:
+                  pass
+            else:
+               return self._readend(kind, data, logf)
+      finally:
+         for fd in fds:
+            loop.remove_reader(fd)
+
+      return self._submitresults(self._lsttail(lstf, logcodeo), logf, logcodei, mj)
+
+   def _breakprompt(self, eos):
+        found = False
+        logf  = b''
+        lstf  = b''
+        bc    = False
+
+        if self.pid is None:
+            self._sb.SASpid = None
+            return dict(LOG=b"No SAS process attached. SAS process has terminated unexpectedly.", LST=b'', ABORT=True)
+
+        if True:
+           response = self.sascfg._prompt(
+                     "SAS attention handling is not yet supported over IOM. Please enter (T) to terminate SAS or (C) to continue.")
+           while True:
+              if response is None or response.upper() == 'C':
+                 return dict(LOG=b'', LST=b'', BC=True)
+              if response.upper() == 'T':
+                 break
+              response = self.sascfg._prompt("Please enter (T) to terminate SAS or (C) to continue.")
+
+        if os.name == 'nt':
+           self.pid.kill()
+        else:
+           interrupt = signal.SIGINT
+           os.kill(self.pid, interrupt)
+           sleep(.25)
+
+        self.pid = None
+        self._sb.SASpid = None
+        return dict(LOG=b"SAS process terminated", LST=b'', ABORT=True)
+
+
+
+
+        """
+        while True:
+            rc = os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOHANG)
+            if rc is not None:
+                self.pid = None
+                self._sb.SASpid = None
                 outrc = str(rc)
                 return dict(LOG='SAS process has terminated unexpectedly. Pid State= '+outrc, LST='', ABORT=True)
 
@@ -1021,11 +1341,13 @@ Will use HTML5 for this SASsession.""")
         return dict(LOG=logr, LST=lstr, BC=bc)
         """
 
-   def saslog(self):
+   def saslog(self, last_n_steps: int = None, start: int = None, end: int = None):
       """
-      this method is used to get the current, full contents of the SASLOG
+      this method is used to get the current, full contents of the SASLOG, or part of it
+      last_n_steps - just the LOG of the last n submits
+      start, end   - byte offsets of the part of the LOG to return
       """
-      return self._log
+      return self._log.get(last_n_steps, start, end)
 
 
    def disconnect(self):
@@ -1383,53 +1705,53 @@ Will use HTML5 for this SASsession.""")
       return len(x.encode(self.sascfg.encoding))
 
    def dataframe2sasdata(self, df: '<Pandas Data Frame object>', table: str ='a', 
-                         libref: str ="", keep_outer_quotes: bool=False):
+                         libref: str ="", keep_outer_quotes: bool=False, **kwargs):
       """
       This method imports a Pandas Data Frame to a SAS Data Set, returning the SASdata object for the new Data Set.
       df      - Pandas Data Frame to import to a SAS Data Set
       table   - the name of the SAS Data Set to create
       libref  - the libref for the SAS Data Set being created. Defaults to WORK, or USER if assigned
       keep_outer_quotes - for character columns, have SAS keep any outer quotes instead of stripping them off.
+      method  - BINARY to send the rows as fixed width binary records (see dataframe2sasdataBINARY())
+      lengths - {column name: length} for character columns, in place of their longest value (see charlens())
+      schema  - a SASschema to make the SAS Data Set with, rather than working it out from df (see SASschema)
+      check_lengths - check every character value fits its variable; by default, unless there's a schema
+      df can also be an iterable of Data Frames, which are sent one after the other to the same data step. The columns
+      and lengths are those of the first (or of schema), and the Data Set isn't created if a later one doesn't fit them.
       """
-      input  = ""
-      card   = ""
-      format = ""
-      length = ""
-      dts    = []
-      ncols  = len(df.columns)
-
-      for name in range(ncols):
-         input += "'"+str(df.columns[name])+"'n "
-         if df.dtypes[df.columns[name]].kind in ('O','S','U','V'):
-            try:
-               col_l = df[df.columns[name]].astype(str).apply(self._getbytelen).max()
-            except Exception as e:
-               print("Transcoding error encountered.")
-               print("DataFrame contains characters that can't be transcoded into the SAS session encoding.\n"+str(e))
-               return None
-            if col_l == 0:
-               col_l = 8
-            length += " '"+str(df.columns[name])+"'n $"+str(col_l)
-            if keep_outer_quotes:
-               input  += "~ "
-            dts.append('C')
+      method = kwargs.pop('method', None)
+      if method and method.lower() == 'binary':
+         return self.dataframe2sasdataBINARY(df, table, libref, **kwargs)
+
+      chunks = df2sdchunks(df)
+      first  = next(chunks, None)
+      if first is None:
+         print("There are no Data Frames to import.")
+         return None
+
+      try:
+         schema = kwargs.get('schema')
+         check  = kwargs.get('check_lengths')
+         check  = schema is None if check is None else check
+         if schema is None:
+            schema = SASschema.from_df(first, self.sascfg.encoding, kwargs.get('lengths'))
          else:
-            if df.dtypes[df.columns[name]].kind in ('M'):
-               length += " '"+str(df.columns[name])+"'n 8"
-               input  += ":E8601DT26.6 "
-               format += "'"+str(df.columns[name])+"'n E8601DT26.6 "
-               dts.append('D')
-            else:
-               length += " '"+str(df.columns[name])+"'n 8"
-               if df.dtypes[df.columns[name]] == 'bool':
-                  dts.append('B')
-               else:
-                  dts.append('N')
+            df2sdcheck(first, schema, self.sascfg.encoding, 1, check)
+         length, format, input = df2sdvars(schema, keep_outer_quotes)
+      except Exception as e:
+         if type(e) is ValueError:
+            print(str(e))
+         else:
+            print("Transcoding error encountered.")
+            print("DataFrame contains characters that can't be transcoded into the SAS session encoding.\n"+str(e))
+         return None
 
-      code = "data "
       if len(libref):
-         code += libref+"."
-      code += table+";\n"
+         tabname = libref+"."+table
+      else:
+         tabname = table
+
+      code = "data "+tabname+";\n"
       if len(length):
          code += "length "+length+";\n"
       if len(format):
@@ -1437,35 +1759,102 @@ Will use HTML5 for this SASsession.""")
       code += "infile datalines delimiter='03'x DSD STOPOVER;\ninput @;\nif _infile_ = '' then delete;\ninput "+input+";\ndatalines4;"
       self._asubmit(code, "text")
 
-      code = ""
-      for row in df.itertuples(index=False):
-         card  = ""
-         for col in range(ncols):
-            var = str(row[col])
-
-            if   dts[col] == 'N' and var == 'nan':
-               var = '.'
-            elif dts[col] == 'C' and var == 'nan':
-               var = ' '
-            elif dts[col] == 'B':
-               var = str(int(row[col]))
-            elif dts[col] == 'D':
-               if var == 'nan':
-                  var = '.'
-               else:
-                  var = str(row[col].to_datetime64())[:26]
+      chunks = itertools.chain([first], chunks)
+      del first
 
-            card += var
-            if col < (ncols-1):
-               card += chr(3)
-         code += card+"\n"
-         if len(code) > 4000:
-            self._asubmit(code, "text")
-            code = ""
+      failed = False
+      try:
+         for n, chunk in enumerate(chunks, 1):
+            if n > 1:
+               df2sdcheck(chunk, schema, self.sascfg.encoding, n, check)
+            for card in df2sdcards(chunk, schema.kinds):
+               self._asubmit(card, "text")
+      except Exception as e:
+         print("The Data Frames couldn't all be imported, so the SAS Data Set wasn't created.\n"+str(e))
+         failed = True
 
-      self._asubmit(code+";;;;", "text")
+      self._asubmit(";;;;", "text")
       ll = self.submit("run;", 'text')
-      return
+      if failed:
+         ll = self.submit("proc delete data="+tabname+"; run;", 'text')
+         return None
+      return True
+
+   def dataframe2sasdataBINARY(self, df: '<Pandas Data Frame object>', table: str ='a', libref: str ="", **kwargs):
+      """
+      This method imports a Pandas Data Frame to a SAS Data Set, returning the SASdata object for the new Data Set.
+      Rather than formatting the values as delimited text, each row is packed as one fixed width binary record (see
+      df2sdbin()). The stream to the Java client isn't binary safe, so the records are sent as lines of hex, which the
+      data step reads with HEX16. and $HEXn. Numerics arrive bit for bit, and nothing is formatted or parsed.
+      df      - Pandas Data Frame to import to a SAS Data Set
+      table   - the name of the SAS Data Set to create
+      libref  - the libref for the SAS Data Set being created. Defaults to WORK, or USER if assigned
+      lengths - {column name: length} for character columns, in place of their longest value
+      schema  - a SASschema to make the SAS Data Set with, rather than working it out from df
+      The character values are always checked against their lengths, as they're encoded to be packed anyway.
+      df can also be an iterable of Data Frames, which are all sent to the same data step, as for dataframe2sasdata().
+      """
+      if not self._sb._binhost['ieee']:
+         print("Numerics on this SAS host aren't IEEE doubles, so method='BINARY' can't be used. Using method='MEMORY' instead.")
+         return self.dataframe2sasdata(df, table, libref, **kwargs)
+
+      chunks = df2sdchunks(df)
+      first  = next(chunks, None)
+      if first is None:
+         print("There are no Data Frames to import.")
+         return None
+
+      try:
+         # HEX16. reads doubles big endian on every host
+         schema = kwargs.get('schema')
+         if schema is not None:
+            df2sdcheck(first, schema, self.sascfg.encoding, 1, lengths=False)
+         schema, recs = df2sdbin(first, self.sascfg.encoding, '>', schema, kwargs.get('lengths'))
+         length, format = df2sdvars(schema)[:2]
+      except Exception as e:
+         if type(e) is ValueError:
+            print(str(e))
+         else:
+            print("Transcoding error encountered.")
+            print("DataFrame contains characters that can't be transcoded into the SAS session encoding.\n"+str(e))
+         return None
+
+      input, width = binputcode(schema.meta(), hexed=True)
+
+      if len(libref):
+         tabname = libref+"."+table
+      else:
+         tabname = table
+
+      code = "data "+tabname+";\n"
+      if len(length):
+         code += "length "+length+";\n"
+      if len(format):
+         code += "format "+format+";\n"
+      code += "infile datalines;\ninput @;\nif _infile_ = '' then delete;\ninput "+input+";\ndatalines4;"
+      self._asubmit(code, "text")
+
+      del first
+
+      failed = False
+      try:
+         for card in df2sdhex(recs):
+            self._asubmit(card, "text")
+         del recs
+         for n, chunk in enumerate(chunks, 2):
+            df2sdcheck(chunk, schema, self.sascfg.encoding, n, lengths=False)
+            for card in df2sdhex(df2sdbin(chunk, self.sascfg.encoding, '>', schema)[1]):
+               self._asubmit(card, "text")
+      except Exception as e:
+         print("The Data Frames couldn't all be imported, so the SAS Data Set wasn't created.\n"+str(e))
+         failed = True
+
+      self._asubmit(";;;;", "text")
+      ll = self.submit("run;", 'text')
+      if failed:
+         ll = self.submit("proc delete data="+tabname+"; run;", 'text')
+         return None
+      return True
 
    def sasdata2dataframe(self, table: str, libref: str ='', dsopts: dict = None, rowsep: str = '\x01', colsep: str = '\x02', **kwargs) -> '<Pandas Data Frame object>':
       """
@@ -1480,6 +1869,34 @@ Will use HTML5 for this SASsession.""")
       method = kwargs.pop('method', None)
       if method and method.lower() == 'csv':
          return self.sasdata2dataframeCSV(table, libref, dsopts, **kwargs)
+      if method and method.lower() == 'binary':
+         return self.sasdata2dataframeBINARY(table, libref, dsopts, **kwargs)
+
+      trows = kwargs.pop('trows', None)
+      if not trows:
+         trows = 100000
+
+      dfs = list(self.sasdata2dataframe_iter(table, libref, dsopts, rowsep, colsep, chunksize=trows, **kwargs))
+
+      if len(dfs) == 0:
+         return None
+
+      return concatchunks(dfs)
+
+   def sasdata2dataframe_iter(self, table: str, libref: str ='', dsopts: dict = None, rowsep: str = '\x01', colsep: str = '\x02',
+                              chunksize: int = 100000, **kwargs) -> '<generator of Pandas Data Frame objects>':
+      """
+      This method is a generator version of sasdata2dataframe(). It yields the SAS Data Set as Pandas Data Frames of
+      chunksize rows each (the last one can be shorter) as they're read from the Java client, so only one chunk at a time
+      is held in memory. A table with no rows yields one empty Data Frame with the columns. If the generator is closed
+      before the end, the rest of the data is read and thrown away, so the next submit starts clean.
+      table     - the name of the SAS Data Set you want to export to Pandas Data Frames
+      libref    - the libref for the SAS Data Set.
+      rowsep    - the row seperator character to use; defaults to '\n'
+      colsep    - the column seperator character to use; defaults to '\t'
+      chunksize - the number of rows in each Data Frame
+      """
+      dsopts = dsopts if dsopts is not None else {}
 
       logf     = ''
       logn     = self._logcnt()
@@ -1492,185 +1909,212 @@ Will use HTML5 for this SASsession.""")
       else:
          tabname = table
 
-      code  = "proc sql; create view sasdata2dataframe as select * from "+tabname+self._sb._dsopts(dsopts)+";quit;\n"
-      code += "data _null_; file LOG; d = open('sasdata2dataframe');\n"
-      code += "length var $256;\n"
-      code += "lrecl = attrn(d, 'LRECL'); nvars = attrn(d, 'NVARS');\n"
-      code += "lr='LRECL='; vn='VARNUMS='; vl='VARLIST='; vt='VARTYPE=';\n"
-      code += "put lr lrecl; put vn nvars; put vl;\n"
-      code += "do i = 1 to nvars; var = compress(varname(d, i), '00'x); put var; end;\n"
-      code += "put vt;\n"
-      code += "do i = 1 to nvars; var = vartype(d, i); put var; end;\n"
-      code += "run;"
+      meta    = kwargs.pop('meta', None) or self._sb._tablemeta(table, libref, dsopts, 'LOG')
+      nvars   = len(meta['names'])
+      varlist = meta['names']
+      vartype = meta['types']
+      varcat  = meta['fmts']
 
-      ll = self.submit(code, "text")
+      rdelim = "'"+'%02x' % ord(rowsep.encode(self.sascfg.encoding))+"'x"
+      cdelim = "'"+'%02x' % ord(colsep.encode(self.sascfg.encoding))+"'x "
 
-      l2 = ll['LOG'].rpartition("LRECL= ")
-      l2 = l2[2].partition("\n")
-      lrecl = int(l2[0])
+      code = "data _null_; "+metacheckcode(meta, tabname)+"set "+tabname+self._sb._dsopts(dsopts)+";\n file "+self._tomods1.decode()+" dlm="+cdelim+" termstr=NL; put "
+      code += sd2dfputcode(varlist, vartype, varcat, self._sb, cdelim.strip(), rdelim, meta['lens'])
+      code += ";\n run;"
 
-      l2 = l2[2].partition("VARNUMS= ")
-      l2 = l2[2].partition("\n")
-      nvars = int(l2[0])
+      ll = self._asubmit(code, 'text')
 
-      l2 = l2[2].partition("\n")
-      varlist = l2[2].split("\n", nvars)
-      del varlist[nvars]
+      self.stdin[0].send(b'\n'+logcodei.encode()+b'\n'+b'tom says EOL='+logcodeb+b'\n')
 
-      l2 = l2[2].partition("VARTYPE=")
-      l2 = l2[2].partition("\n")
-      vartype = l2[2].split("\n", nvars)
-      del vartype[nvars]
-
-      topts             = dict(dsopts)
-      topts['obs']      = 0
-      topts['firstobs'] = ''
-   
-      code  = "data work._n_u_l_l_;output;run;\n"
-      code += "data _null_; set "+tabname+self._sb._dsopts(topts)+" work._n_u_l_l_;put 'FMT_CATS=';\n"
-   
-      for i in range(nvars):
-         code += "_tom = vformatn('"+varlist[i]+"'n);put _tom;\n"
-      code += "run;\nproc delete data=work._n_u_l_l_;run;"
-   
-      ll = self.submit(code, "text")
-   
-      l2 = ll['LOG'].rpartition("FMT_CATS=")
-      l2 = l2[2].partition("\n")
-      varcat = l2[2].split("\n", nvars)
-      del varcat[nvars]
 
-      rdelim = "'"+'%02x' % ord(rowsep.encode(self.sascfg.encoding))+"'x"
-      cdelim = "'"+'%02x' % ord(colsep.encode(self.sascfg.encoding))+"'x "
+      BOM   = "\ufeff".encode()
+      first = True
+      bail  = False
+      dead  = False
+      buf   = bytearray(1048576)
+      view  = memoryview(buf)
 
-      code = "data _null_; set "+tabname+self._sb._dsopts(dsopts)+";\n file "+self._tomods1.decode()+" dlm="+cdelim+" termstr=NL; put "
+      def alive() -> bool:
+         nonlocal dead
+         if os.name == 'nt':
+            try:
+               rc = self.pid.wait(0)
+               self.pid = None
+               self._sb.SASpid = None
+               print('\nSAS process has terminated unexpectedly. RC from wait was: '+str(rc))
+               dead = True
+            except:
+               pass
+         else:
+            rc = os.waitpid(self.pid, os.WNOHANG)
+            if rc[1]:
+                self.pid = None
+                self._sb.SASpid = None
+                print('\nSAS process has terminated unexpectedly. RC from wait was: '+str(rc))
+                dead = True
+         return not dead
 
-      for i in range(nvars):
-         code += "'"+varlist[i]+"'n "
-         if vartype[i] == 'N':
-            if varcat[i] in self._sb.sas_date_fmts:
-               code += 'E8601DA10. '+cdelim
+      def readlog():
+         nonlocal logf, bail
+         sleep(0.1)
+         try:
+            log = self.stderr[0].recv(4096).decode(self.sascfg.encoding, errors='replace')
+         except (BlockingIOError):
+            log = b''
+
+         if len(log) > 0:
+            logf += log
+            if logf.count(logcodeo) >= 1:
+               bail = True
+
+      def fill() -> bytes:
+         nonlocal first
+         while alive():
+            try:
+               n = self.stdout[0].recv_into(buf)
+            except (BlockingIOError):
+               n = 0
+
+            if n > 0:
+               data = bytes(view[:n])
+               if first:
+                  if data[0:3] == BOM:
+                     data = data[3:len(data)]
+                  first = False
+               if len(data):
+                  return data
             else:
-               if varcat[i] in self._sb.sas_time_fmts:
-                  code += 'E8601TM15.6 '+cdelim
-               else:
-                  if varcat[i] in self._sb.sas_datetime_fmts:
-                     code += 'E8601DT26.6 '+cdelim
-                  else:
-                     code += 'best32. '+cdelim
-         if not (i < (len(varlist)-1)):
-            code += rdelim
-      code += ";\n run;"
+               readlog()
+         return b''
+
+      # the data ends where the Java client writes the end marker after it
+      rdr   = SASrowreader(fill, rowsep.encode(), logcodeb)
+      empty = None
+      try:
+         for tdf in readrows(rdr, varlist, vartype, varcat, self._sb, self.sascfg.encoding, colsep, rowsep, chunksize):
+            if dead:
+               return
+            if meta.get('cached') and not len(tdf):
+               empty = tdf
+               break
+            yield tdf
+      finally:
+         # also when the generator is closed early; read the rest without keeping it, so the next submit starts clean
+         while not dead and rdr.read(1048576):
+            pass
+         while not dead and not bail and alive():
+            readlog()
+
+      # with cached variables, the data step stops before the first row (or doesn't compile) if they've changed
+      if empty is not None:
+         fresh = self._sb._tablestale(meta, table, libref, dsopts, 'LOG')
+         if fresh:
+            yield from self.sasdata2dataframe_iter(table, libref, dsopts, rowsep, colsep, chunksize, meta=fresh, **kwargs)
+         else:
+            yield empty
+
+   def sasdata2dataframeBINARY(self, table: str, libref: str ='', dsopts: dict = None, **kwargs) -> '<Pandas Data Frame object>':
+      """
+      This method exports the SAS Data Set to a Pandas Data Frame, returning the Data Frame object.
+      Rather than formatting numerics as text, SAS writes each observation as one fixed width record of the bytes of
+      its 8 byte doubles and character values. The stream from the Java client isn't binary safe, so the bytes are sent
+      as hex (HEX16. and $HEX.); they're read straight into numpy arrays, so there's no parsing of numbers.
+      table   - the name of the SAS Data Set you want to export to a Pandas Data Frame
+      libref  - the libref for the SAS Data Set.
+      dsopts  - data set options for the input SAS Data Set
+      """
+      dsopts = dsopts if dsopts is not None else {}
+
+      if libref:
+         tabname = libref+"."+table
+      else:
+         tabname = table
+
+      meta = kwargs.pop('meta', None) or self._sb._tablemeta(table, libref, dsopts, 'LOG')
+
+      if not meta['ieee']:
+         print("Numerics on this SAS host aren't IEEE doubles, so method='BINARY' can't be used. Using method='MEMORY' instead.")
+         return self.sasdata2dataframe(table, libref, dsopts, **kwargs)
+
+      logf     = ''
+      logn     = self._logcnt()
+      logcodei = "%put E3969440A681A24088859985" + logn + ";"
+      logcodeo = "\nE3969440A681A24088859985" + logn
+      logcodeb =  logcodeo.encode()
+
+      put, width = binputcode(meta, hexed=True)
+
+      code  = "data _null_; "+metacheckcode(meta, tabname)+"set "+tabname+self._sb._dsopts(dsopts)+";\n file "+self._tomods1.decode()
+      code += " lrecl="+str(max(width, 1))+" termstr=NL; put "+put+";\n run;"
 
       ll = self._asubmit(code, 'text')
 
       self.stdin[0].send(b'\n'+logcodei.encode()+b'\n'+b'tom says EOL='+logcodeb+b'\n')
 
-
       BOM   = "\ufeff".encode()
-      done  = False
       first = True
-      datar = b''
+      datar = []
+      tail  = b''
       bail  = False
-      r     = []
-      df    = None
-      trows = kwargs.get('trows', None)
-      if not trows:
-         trows = 100000
 
-      while not done:
-         while True:
-             if os.name == 'nt':
-                try:
-                   rc = self.pid.wait(0)
-                   self.pid = None
-                   self._sb.SASpid = None
-                   print('\nSAS process has terminated unexpectedly. RC from wait was: '+str(rc))
-                   return None
-                except:
-                   pass
-             else:
-                rc = os.waitpid(self.pid, os.WNOHANG)
-                if rc[1]:
-                    self.pid = None
-                    self._sb.SASpid = None
-                    print('\nSAS process has terminated unexpectedly. RC from wait was: '+str(rc))
-                    return None
-
-             if bail:
-                if datar.count(logcodeb) >= 1:
-                   break
+      while True:
+          if os.name == 'nt':
              try:
-                data = self.stdout[0].recv(4096)
+                rc = self.pid.wait(0)
+                self.pid = None
+                self._sb.SASpid = None
+                print('\nSAS process has terminated unexpectedly. RC from wait was: '+str(rc))
+                return None
+             except:
+                pass
+          else:
+             rc = os.waitpid(self.pid, os.WNOHANG)
+             if rc[1]:
+                 self.pid = None
+                 self._sb.SASpid = None
+                 print('\nSAS process has terminated unexpectedly. RC from wait was: '+str(rc))
+                 return None
+
+          if bail:
+             if tail.count(logcodeb) >= 1:
+                break
+          try:
+             data = self.stdout[0].recv(1048576)
+          except (BlockingIOError):
+             data = b''
+
+          if len(data) > 0:
+             if first:
+                if data[0:3] == BOM:
+                   data = data[3:len(data)]
+                first = False
+
+             datar.append(data)
+             # just enough of the end to see the marker in, even if it came in pieces
+             tail = (tail+data)[-(len(logcodeb)+64):]
+          else:
+             sleep(0.1)
+             try:
+                log = self.stderr[0].recv(4096).decode(self.sascfg.encoding, errors='replace')
              except (BlockingIOError):
-                data = b''
-
-             if len(data) > 0:
-                if first:
-                   if data[0:3] == BOM:
-                      data = data[3:len(data)]
-                   first = False
-
-                datar += data
-                data   = datar.rpartition(colsep.encode()+rowsep.encode()+b'\n')
-                datap  = data[0]+data[1]
-                datar  = data[2]
-
-                datap = datap.decode(self.sascfg.encoding, errors='replace')
-                for i in datap.split(sep=colsep+rowsep+'\n'):
-                   if i != '':
-                      r.append(tuple(i.split(sep=colsep)))
-
-                if len(r) > trows:
-                   tdf = pd.DataFrame.from_records(r, columns=varlist)
-
-                   for i in range(nvars):
-                      if vartype[i] == 'N':
-                         if varcat[i] not in self._sb.sas_date_fmts + self._sb.sas_time_fmts + self._sb.sas_datetime_fmts:
-                            if tdf.dtypes[tdf.columns[i]].kind not in ('f','u','i','b','B','c','?'):
-                               tdf[varlist[i]] = pd.to_numeric(tdf[varlist[i]], errors='coerce')
-                         else:
-                            if tdf.dtypes[tdf.columns[i]].kind not in ('M'):
-                               tdf[varlist[i]] = pd.to_datetime(tdf[varlist[i]], errors='coerce')
-                      else:
-                         tdf[varlist[i]].replace(' ', np.NaN, True)
-
-                   if df is not None:
-                      df = df.append(tdf, ignore_index=True)
-                   else:
-                      df = tdf
-                   r = []
-             else:
-                sleep(0.1)
-                try:
-                   log = self.stderr[0].recv(4096).decode(self.sascfg.encoding, errors='replace')
-                except (BlockingIOError):
-                   log = b''
+                log = b''
 
-                if len(log) > 0:
-                   logf += log
-                   if logf.count(logcodeo) >= 1:
-                      bail = True
-         done = True
-
-      if len(r) > 0 or df is None:
-         tdf = pd.DataFrame.from_records(r, columns=varlist)
+             if len(log) > 0:
+                logf += log
+                if logf.count(logcodeo) >= 1:
+                   bail = True
 
-         for i in range(nvars):
-            if vartype[i] == 'N':
-               if varcat[i] not in self._sb.sas_date_fmts + self._sb.sas_time_fmts + self._sb.sas_datetime_fmts:
-                  if tdf.dtypes[tdf.columns[i]].kind not in ('f','u','i','b','B','c','?'):
-                     tdf[varlist[i]] = pd.to_numeric(tdf[varlist[i]], errors='coerce')
-               else:
-                  if tdf.dtypes[tdf.columns[i]].kind not in ('M'):
-                     tdf[varlist[i]] = pd.to_datetime(tdf[varlist[i]], errors='coerce')
-            else:
-               tdf[varlist[i]].replace(' ', np.NaN, True)
+      try:
+         df = bin2df(b''.join(datar).partition(logcodeb)[0], meta, self._sb, self.sascfg.encoding, hexed=True)
+      except ValueError as e:
+         print("sasdata2dataframe didn't get all of the data: "+str(e)+" Returning the saslog instead of a data frame.")
+         return logf
 
-         if df is not None:
-            df = df.append(tdf, ignore_index=True)
-         else:
-            df = tdf
+      if not len(df):
+         # with cached variables, the data step stops before the first row (or doesn't compile) if they've changed
+         fresh = self._sb._tablestale(meta, table, libref, dsopts, 'LOG')
+         if fresh:
+            return self.sasdata2dataframeBINARY(table, libref, dsopts, meta=fresh, **kwargs)
 
       return df
 
@@ -1683,6 +2127,8 @@ Will use HTML5 for this SASsession.""")
       tempfile - file to use to store CSV, else temporary file will be used.
       tempkeep - if you specify your own file to use with tempfile=, this controls whether it's cleaned up after using it
       """
+      import pandas as pd
+
       dsopts = dsopts if dsopts is not None else {}
 
       logf     = ''
@@ -1705,72 +2151,25 @@ Will use HTML5 for this SASsession.""")
       else:
          tmpcsv  = tempfile
 
-      code  = "proc sql; create view sasdata2dataframe as select * from "+tabname+self._sb._dsopts(dsopts)+";quit;\n"
-      code += "data _null_; file LOG; d = open('sasdata2dataframe');\n"
-      code += "length var $256;\n"
-      code += "lrecl = attrn(d, 'LRECL'); nvars = attrn(d, 'NVARS');\n"
-      code += "lr='LRECL='; vn='VARNUMS='; vl='VARLIST='; vt='VARTYPE=';\n"
-      code += "put lr lrecl; put vn nvars; put vl;\n"
-      code += "do i = 1 to nvars; var = compress(varname(d, i), '00'x); put var; end;\n"
-      code += "put vt;\n"
-      code += "do i = 1 to nvars; var = vartype(d, i); put var; end;\n"
-      code += "run;"
-
-      ll = self.submit(code, "text")
-
-      l2 = ll['LOG'].rpartition("LRECL= ")
-      l2 = l2[2].partition("\n")
-      lrecl = int(l2[0])
+      meta    = kwargs.pop('meta', None) or self._sb._tablemeta(table, libref, dsopts, 'LOG')
+      nvars   = len(meta['names'])
+      varlist = meta['names']
+      vartype = meta['types']
+      varcat  = meta['fmts']
 
-      l2 = l2[2].partition("VARNUMS= ")
-      l2 = l2[2].partition("\n")
-      nvars = int(l2[0])
-
-      l2 = l2[2].partition("\n")
-      varlist = l2[2].split("\n", nvars)
-      del varlist[nvars]
-
-      l2 = l2[2].partition("VARTYPE=")
-      l2 = l2[2].partition("\n")
-      vartype = l2[2].split("\n", nvars)
-      del vartype[nvars]
-
-      topts             = dict(dsopts)
-      topts['obs']      = 0
-      topts['firstobs'] = ''
-
-      code  = "data work._n_u_l_l_;output;run;\n"
-      code += "data _null_; set "+tabname+self._sb._dsopts(topts)+" work._n_u_l_l_;put 'FMT_CATS=';\n"
-
-      for i in range(nvars):
-         code += "_tom = vformatn('"+varlist[i]+"'n);put _tom;\n"
-      code += "run;\nproc delete data=work._n_u_l_l_;run;"
-
-      ll = self.submit(code, "text")
-
-      l2 = ll['LOG'].rpartition("FMT_CATS=")
-      l2 = l2[2].partition("\n")
-      varcat = l2[2].split("\n", nvars)
-      del varcat[nvars]
-
-      code = "data sasdata2dataframe / view=sasdata2dataframe; set "+tabname+self._sb._dsopts(dsopts)+";\nformat "
-
-      for i in range(nvars):
-         if vartype[i] == 'N':
-            code += "'"+varlist[i]+"'n "
-            if varcat[i] in self._sb.sas_date_fmts:
-               code += 'E8601DA10. '
-            else:
-               if varcat[i] in self._sb.sas_time_fmts:
-                  code += 'E8601TM15.6 '
-               else:
-                  if varcat[i] in self._sb.sas_datetime_fmts:
-                     code += 'E8601DT26.6 '
-                  else:
-                     code += 'best32. '
+      code  = "data sasdata2dataframe / view=sasdata2dataframe; "+metacheckcode(meta, tabname)
+      code += "set "+tabname+self._sb._dsopts(dsopts)+";\nformat "
+      code += sd2dfformatcode(varlist, vartype, varcat, self._sb)
       code += ";\n run;\n"
       ll = self.submit(code, "text")
 
+      if meta.get('cached') and re.search(r'^ERROR', ll['LOG'], re.M):
+         # the view doesn't compile with the cached variables; they've changed
+         if tmpdir:
+            tmpdir.cleanup()
+         meta = self._sb._tablemeta(table, libref, dsopts, 'LOG', refresh=True)
+         return self.sasdata2dataframeCSV(table, libref, dsopts, tempfile, tempkeep, meta=meta, **kwargs)
+
       dts = kwargs.pop('dtype', '')
       if dts == '':
          dts = {}
@@ -1899,6 +2298,12 @@ Will use HTML5 for this SASsession.""")
          if not tempkeep:
             os.remove(tmpcsv)
 
+      if not len(df):
+         # with cached variables, the view stops before the first row if they've changed
+         fresh = self._sb._tablestale(meta, table, libref, dsopts, 'LOG')
+         if fresh:
+            return self.sasdata2dataframeCSV(table, libref, dsopts, tempfile, tempkeep, meta=fresh, **kwargs)
+
       for i in range(nvars):
          if varcat[i] in self._sb.sas_date_fmts + self._sb.sas_time_fmts + self._sb.sas_datetime_fmts:
             df[varlist[i]] = pd.to_datetime(df[varlist[i]], errors='coerce')
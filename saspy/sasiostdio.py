@@ -15,18 +15,20 @@
 #
 import fcntl
 import os
+import re
 import signal
+import selectors
 import subprocess
 import tempfile as tf
-from time import sleep
+from time import sleep, time
 import socket as socks
 import codecs
+import itertools
 
-try:
-   import pandas as pd
-   import numpy  as np
-except ImportError:
-   pass
+from saspy.sasiocommons import SASbuffer, SASevent, SASlogLines, SASsessionLog, lstmarkcode, splitlog, splitlst
+from saspy.sasiocommons import binputcode, bin2df, concatchunks, SASrowreader, readrows, sd2dfputcode, sd2dfformatcode
+from saspy.sasiocommons import lstclean, metacheckcode, promptcode
+from saspy.sasiocommons import df2sdchunks, df2sdcheck, df2sdvars, df2sdcards, df2sdbin, SASschema
 
 class SASconfigSTDIO:
    """
@@ -50,6 +52,7 @@ class SASconfigSTDIO:
       self.encoding = cfg.get('encoding', '')
       self.metapw   = cfg.get('metapw', '')
       self.lrecl    = cfg.get('lrecl', None)
+      self.rsize    = cfg.get('rsize', None)
       self.iomc     = cfg.get('iomc', '')
 
       try:
@@ -156,6 +159,15 @@ class SASconfigSTDIO:
       if not self.lrecl:
          self.lrecl = 1048576
 
+      inrsize = kwargs.get('rsize', None)
+      if inrsize:
+         if lock and self.rsize:
+            print("Parameter 'rsize' passed to SAS_session was ignored due to configuration restriction.")
+         else:
+            self.rsize = inrsize
+      if not self.rsize:
+         self.rsize = 65536
+
       self._prompt = session._sb.sascfg._prompt
 
       self.hostip = socks.gethostname()
@@ -195,13 +207,21 @@ class SASsessionSTDIO():
       self.stdin  = None
       self.stderr = None
       self.stdout = None
+      self._sel   = {}
 
       self._sb      = kwargs.get('sb', None)
       self.sascfg   = SASconfigSTDIO(self, **kwargs)
       self._log_cnt = 0
-      self._log     = ""
+      self._log     = SASsessionLog(self._sb.sascfg.logsize, self._sb.sascfg.logspill)
+      # True while the SAS process of a standby session is started, but not set up yet
+      self._spawned = False
+      # seconds the sasdata2dataframe sockets wait for SAS to connect or send more; None waits as long as it takes
+      self._socktimeout = None
+      # with cached variables, seconds sasdata2dataframe waits for SAS to connect before taking it that the data step
+      # didn't compile because they've changed since, and redoing it with them got again
+      self._metawait    = 60
 
-      self._startsas()
+      self._startsas(not kwargs.get('_standby', False))
 
    def __del__(self):
       if self.pid:
@@ -267,9 +287,9 @@ Will use HTML5 for this SASsession.""")
 
       return [pgm, parms]
 
-   def _startsas(self):
+   def _startsas(self, setup: bool = True):
       #import pdb;pdb.set_trace()
-      if self.pid:
+      if self.pid and not self._spawned:
          return self.pid
 
       pgm, parms = self._buildcommand(self.sascfg)
@@ -278,6 +298,36 @@ Will use HTML5 for this SASsession.""")
       for i in range(len(parms)):
             s += parms[i]+' '
 
+      if not self.pid:
+         if self._spawnsas(pgm, parms, s) is None:
+            return None
+         if not setup:
+            # a standby session (see SASsession's standby): SAS starts up on its own, and setting it up is left for the
+            # SASsession that takes it over, which calls this again
+            self._spawned = True
+            return self.pid
+      self._spawned = False
+
+      enc = self.sascfg.encoding #validating encoding is done next, so handle it not being set for this one call
+      if enc == '':
+         self.sascfg.encoding = 'utf-8'
+      # the session's own setup goes in the same submit as saspy's, to connect in one round trip
+      boot = time()
+      ll   = self.submit("options svgtitle='svgtitle'; options validvarname=any; ods graphics on;\n"+self._sb._bootcode(), "text")
+      self._boottime = time() - boot
+      self._bootlog  = ll['LOG']
+      self.sascfg.encoding = enc
+      if self.pid is None:
+         print("SAS Connection failed. No connection established. Double check your settings in sascfg_personal.py file.\n")
+         print("Attempted to run program "+pgm+" with the following parameters:"+str(parms)+"\n")
+         print("Try running the following command (where saspy is running) manually to see if you can get more information on what went wrong:\n"+s+"\n")
+         return None
+
+      if self.sascfg.verbose:
+         print("SAS Connection established. Subprocess id is "+str(self.pid)+"\n")
+      return self.pid
+
+   def _spawnsas(self, pgm: str, parms: list, s: str):
       PIPE_READ  = 0
       PIPE_WRITE = 1
 
@@ -339,6 +389,8 @@ Will use HTML5 for this SASsession.""")
       fcntl.fcntl(self.stdout, fcntl.F_SETFL, os.O_NONBLOCK)
       fcntl.fcntl(self.stderr, fcntl.F_SETFL, os.O_NONBLOCK)
 
+      self._selectors()
+
       rc = os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOHANG)
       if rc != None:
          self.pid = None
@@ -351,20 +403,6 @@ Will use HTML5 for this SASsession.""")
          print("Attempted to run program "+pgm+" with the following parameters:"+str(parms)+"\n")
          print("Try running the following command (where saspy is running) manually to see if you can get more information on what went wrong:\n"+s+"\n")
          return None
-      else:
-         enc = self.sascfg.encoding #validating encoding is done next, so handle it not being set for this one call
-         if enc == '':
-            self.sascfg.encoding = 'utf-8'
-         self.submit("options svgtitle='svgtitle'; options validvarname=any; ods graphics on;", "text")
-         self.sascfg.encoding = enc
-         if self.pid is None:
-            print("SAS Connection failed. No connection established. Double check your settings in sascfg_personal.py file.\n")
-            print("Attempted to run program "+pgm+" with the following parameters:"+str(parms)+"\n")
-            print("Try running the following command (where saspy is running) manually to see if you can get more information on what went wrong:\n"+s+"\n")
-            return None
-
-      if self.sascfg.verbose:
-         print("SAS Connection established. Subprocess id is "+str(self.pid)+"\n")
       return self.pid
 
    def _endsas(self):
@@ -388,10 +426,60 @@ Will use HTML5 for this SASsession.""")
             print("SAS Connection terminated. Subprocess id was "+str(self.pid))
          self.pid        = None
          self._sb.SASpid = None
+         self._closeselectors()
       return ret
 
+   def _selectors(self):
+      '''
+      Build the readiness selectors used to wait on the stdout (LST) and stderr (LOG) pipes of the SAS process,
+      instead of spinning on non-blocking reads.
+      '''
+      self._closeselectors()
+      for which, fobjs in (('LST', (self.stdout,)), ('LOG', (self.stderr,)), ('ALL', (self.stdout, self.stderr))):
+         sel = selectors.DefaultSelector()
+         for fobj in fobjs:
+            sel.register(fobj, selectors.EVENT_READ)
+         self._sel[which] = sel
+
+   def _closeselectors(self):
+      for sel in self._sel.values():
+         sel.close()
+      self._sel = {}
+
+   def _readio(self, timeout, which='ALL'):
+      '''
+      Wait up to timeout seconds for the SAS process to write to its stdout and/or stderr pipe, then read
+      what is available from each ready pipe, up to sascfg.rsize bytes apiece.
+      timeout - seconds to wait for data; 0 just checks what is already there
+      which   - 'LST' for stdout only, 'LOG' for stderr only, 'ALL' for both
+      Returns - a tuple of (lst, log) bytes; either is b'' if nothing was read from that pipe
+      '''
+      lst = b''
+      log = b''
+
+      if not self._sel:
+         return lst, log
+
+      for key, events in self._sel[which].select(timeout):
+         data = key.fileobj.read1(self.sascfg.rsize)
+         if data is None:
+            continue
+         if len(data) == 0:
+            # ready with nothing to read is EOF; stop watching it so we don't spin on it
+            for sel in self._sel.values():
+               try:
+                  sel.unregister(key.fileobj)
+               except KeyError:
+                  pass
+         elif key.fileobj is self.stdout:
+            lst = data
+         else:
+            log = data
+
+      return lst, log
+
    def _getlog(self, wait=5, jobid=None):
-      logf   = b''
+      logf   = bytearray()
       quit   = wait * 2
       logn   = self._logcnt(False)
       code1  = "%put E3969440A681A24088859985"+logn+";\nE3969440A681A24088859985"+logn
@@ -403,17 +491,17 @@ Will use HTML5 for this SASsession.""")
          return 'SAS process has terminated unexpectedly. Pid State= '+str(rc)
 
       while True:
-         log = self.stderr.read1(4096)
+         log = self._readio(0 if len(logf) else 0.5, 'LOG')[1]
          if len(log) > 0:
             logf += log
          else:
             quit -= 1
             if quit < 0 or len(logf) > 0:
                break
-            sleep(0.5)
 
       x = logf.decode(self.sascfg.encoding, errors='replace').replace(code1, " ")
-      self._log += x
+      # what's left of the LOG of the last step, not a step of its own
+      self._log.append(x, newstep=False)
 
       if self.pid == None:
          self._sb.SASpid = None
@@ -427,20 +515,20 @@ Will use HTML5 for this SASsession.""")
       return x
 
    def _getlst(self, wait=5, jobid=None):
-      lstf = b''
+      lstf = bytearray()
       quit = wait * 2
       eof = 0
       bof = False
       lenf = 0
 
       while True:
-         lst = self.stdout.read1(4096)
+         lst = self._readio(0.5, 'LST')[0]
          if len(lst) > 0:
             lstf += lst
 
             if ((not bof) and lst.count(b"<!DOCTYPE html>", 0, 20) > 0):
                bof = True
-         else:
+
             lenf = len(lstf)
 
             if (lenf > 15):
@@ -448,12 +536,10 @@ Will use HTML5 for this SASsession.""")
 
             if (eof > 0):
                   break
-
-            if not bof:
-               quit -= 1
-               if quit < 0:
-                  break
-               sleep(0.5)
+         elif not bof:
+            quit -= 1
+            if quit < 0:
+               break
 
       if self.pid == None:
          self._sb.SASpid = None
@@ -471,13 +557,13 @@ Will use HTML5 for this SASsession.""")
 
    def _getlsttxt(self, wait=5, jobid=None):
       f2 = [None]
-      lstf = b''
+      lstf = bytearray()
       quit = wait * 2
       eof = 0
       self._asubmit("data _null_;file print;put 'Tom was here';run;", "text")
 
       while True:
-         lst = self.stdout.read1(4096)
+         lst = self._readio(0.5, 'LST')[0]
          if len(lst) > 0:
             lstf += lst
 
@@ -563,18 +649,11 @@ Will use HTML5 for this SASsession.""")
       odsclose = b"ods "+self.sascfg.output.encode()+b" (id=saspy_internal) close;ods listing;\n"
       ods      = True;
       mj       = b";*\';*\";*/;"
-      lstf     = b''
-      logf     = b''
-      bail     = False
-      eof      = 5
-      bc       = False
-      done     = False
       logn     = self._logcnt()
       logcodei = "%put E3969440A681A24088859985" + logn + ";"
       logcodeo = b"\nE3969440A681A24088859985" + logn.encode()
-      pcodei   = ''
-      pcodeiv  = ''
-      pcodeo   = ''
+      lstf     = SASbuffer()
+      logf     = SASbuffer(logcodeo)
 
       if self.pid == None:
          self._sb.SASpid = None
@@ -595,26 +674,7 @@ Will use HTML5 for this SASsession.""")
       if results.upper() != "HTML":
          ods = False
 
-      if len(prompt):
-         pcodei += 'options nosource nonotes;\n'
-         pcodeo += 'options nosource nonotes;\n'
-         for key in prompt:
-            gotit = False
-            while not gotit:
-               var = self.sascfg._prompt('Please enter value for macro variable '+key+' ', pw=prompt[key])
-               if var is None:
-                  raise KeyboardInterrupt
-               if len(var) > 0:
-                  gotit = True
-               else:
-                  print("Sorry, didn't get a value for that variable.")
-            if prompt[key]:
-               pcodei += '%let '+key+'='+var+';\n'
-               pcodeo += '%symdel '+key+';\n'
-            else:
-               pcodeiv += '%let '+key+'='+var+';\n'
-         pcodei += 'options source notes;\n'
-         pcodeo += 'options source notes;\n'
+      pcodei, pcodeiv, pcodeo = promptcode(prompt, self.sascfg._prompt)
 
       if ods:
          self.stdin.write(odsopen)
@@ -629,80 +689,118 @@ Will use HTML5 for this SASsession.""")
       out = self.stdin.write(b'\n'+logcodei.encode(self.sascfg.encoding)+b'\n')
       self.stdin.flush()
 
-      while not done:
+      for kind, data in self._readloop(logcodei, logcodeo, odsclose, lambda: logf.found):
+         if kind == 'LST':
+            lstf += data
+         elif kind == 'LOG':
+            logf += data
+         else:
+            return self._readend(kind, data, logf)
+
+      return self._submitresults(lstf, logf, logcodei, mj, ods)
+
+   def _readloop(self, logcodei: str, logcodeo: bytes, odsclose: bytes, done, wait: float = 0.5):
+      '''
+      Generator of what SAS writes for the code submit(), submit_stream(), submit_batch() and submit_async() just wrote
+      to it: ('LST', bytes) and ('LOG', bytes) as they're read, until done() says the caller has seen the end of step
+      marker (logcodeo) in the LOG and what's already there after it has been drained. Each read waits up to wait
+      seconds; with wait=0, ('WAIT', None) is yielded when there was nothing to read, for the caller to wait itself.
+      If the SAS process ends, ('EXIT', rc) is yielded last, ('RESET', rc) if the pipe is reset, and ('ABORT', dict)
+      if SAS is terminated at the attention prompt; see _readend(). An interrupt goes to _breakprompt(), and then the
+      LOG and LST it read are yielded like the rest.
+      '''
+      eof = 5
+      bc  = False
+
+      while True:
          try:
-             while True:
-                 rc = os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOHANG)
-                 if rc is not None:
+            while True:
+               rc = os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOHANG)
+               if rc is not None:
+                  try:
+                     log = self._readio(0, 'LOG')[1]
+                  except Exception:
                      log = b''
-                     try:
-                        log = self.stderr.read1(4096)
-                        if len(log) > 0:
-                            logf += log
-                        self._log += logf.decode(self.sascfg.encoding, errors='replace')
-                     except:
-                        pass
-                     self.pid = None
-                     self._sb.SASpid = None
-                     return dict(LOG='SAS process has terminated unexpectedly. Pid State= ' +
-                                 str(rc)+'\n'+logf.decode(self.sascfg.encoding, errors='replace'), LST='')
-                 if bail:
-                     eof -= 1
-                 if eof < 0:
-                     break
-                 if ods:
-                    lst = self.stdout.read1(4096)
-                 else:
-                    lst = self.stdout.read1(4096)
-                 if len(lst) > 0:
-                     lstf += lst
-                 else:
-                     log = self.stderr.read1(4096)
-                     if len(log) > 0:
-                         logf += log
-                         if logf.count(logcodeo) >= 1:
-                             bail = True
-                         if not bail and bc:
-                             self.stdin.write(odsclose+logcodei.encode(self.sascfg.encoding) + b'\n')
-                             self.stdin.flush()
-                             bc = False
-             done = True
+                  self.pid = None
+                  self._sb.SASpid = None
+                  if len(log) > 0:
+                     yield 'LOG', log
+                  yield 'EXIT', rc
+                  return
+               if done():
+                  eof -= 1
+               if eof < 0:
+                  return
+               # block until SAS writes something (or the timeout passes, to recheck the process); once the
+               # end of step is seen, just drain whatever is already there
+               lst, log = self._readio(0 if done() else wait)
+               if len(lst) > 0:
+                  yield 'LST', lst
+               if len(log) > 0:
+                  yield 'LOG', log
+                  if not done() and bc:
+                     self.stdin.write(odsclose+logcodei.encode(self.sascfg.encoding) + b'\n')
+                     self.stdin.flush()
+                     bc = False
+               elif not len(lst) and not wait and not done():
+                  yield 'WAIT', None
 
          except (ConnectionResetError):
-             log = ''
-             try:
-                log = self.stderr.read1(4096)
-                if len(log) > 0:
-                   logf += log
-                self._log += logf.decode(self.sascfg.encoding, errors='replace')
-             except:
-                pass
-             rc = 0
-             rc = os.waitpid(self.pid, 0)
-             self.pid = None
-             self._sb.SASpid = None
-             log = logf.partition(logcodeo)[0]+b'\nConnection Reset: SAS process has terminated unexpectedly. Pid State= '+str(rc).encode()+b'\n'+logf
-             return dict(LOG=log.encode(), LST='')
+            try:
+               log = self._readio(0, 'LOG')[1]
+            except Exception:
+               log = b''
+            if len(log) > 0:
+               yield 'LOG', log
+            rc = os.waitpid(self.pid, 0)
+            self.pid = None
+            self._sb.SASpid = None
+            yield 'RESET', rc
+            return
 
          except (KeyboardInterrupt, SystemExit):
-             print('Exception caught!')
-             ll = self._breakprompt(logcodeo)
+            print('Exception caught!')
+            ll = self._breakprompt(logcodeo)
 
-             if ll.get('ABORT', False):
-                return ll
+            if ll.get('ABORT', False):
+               yield 'ABORT', ll
+               return
 
-             logf += ll['LOG']
-             lstf += ll['LST']
-             bc    = ll['BC']
+            if len(ll['LOG']):
+               yield 'LOG', ll['LOG']
+            if len(ll['LST']):
+               yield 'LST', ll['LST']
+            bc = ll['BC']
 
-             if not bc:
-                print('Exception handled :)\n')
-             else:
-                print('Exception ignored, continuing to process...\n')
+            if not bc:
+               print('Exception handled :)\n')
+            else:
+               print('Exception ignored, continuing to process...\n')
 
-             self.stdin.write(odsclose+logcodei.encode(self.sascfg.encoding)+b'\n')
-             self.stdin.flush()
+            self.stdin.write(odsclose+logcodei.encode(self.sascfg.encoding)+b'\n')
+            self.stdin.flush()
 
+   def _readend(self, kind: str, data, logf: SASbuffer = None) -> dict:
+      '''
+      Return the Dict for a submit to return when _readloop() ends with EXIT, RESET or ABORT (data is what came with
+      it), with the LOG read so far (logf), which is added to the session log.
+      '''
+      logf = logf if logf is not None else SASbuffer()
+      if kind == 'ABORT':
+         return data
+
+      self._log += logf.decode(self.sascfg.encoding, errors='replace')
+      if kind == 'EXIT':
+         return dict(LOG='SAS process has terminated unexpectedly. Pid State= '+str(data)+'\n'+
+                     logf.decode(self.sascfg.encoding, errors='replace'), LST='')
+      log = logf.partition()[0]+b'\nConnection Reset: SAS process has terminated unexpectedly. Pid State= '+ \
+            str(data).encode()+b'\n'+logf.getvalue()
+      return dict(LOG=log.decode(self.sascfg.encoding, errors='replace'), LST='')
+
+   def _submitresults(self, lstf, logf, logcodei: str, mj: bytes, ods: bool) -> dict:
+      '''
+      Decode and trim the LST and LOG a submit read, add the LOG to the session log and return them as submit() does.
+      '''
       if ods:
          try:
             lstf = lstf.decode()
@@ -727,15 +825,268 @@ Will use HTML5 for this SASsession.""")
       zz = z[0].rpartition("\nE3969440A681A24088859985" + prev +'\n')
       logd = zz[2].replace(mj.decode(self.sascfg.encoding), '')
 
-      lstd = lstf.replace(chr(12), chr(10)).replace('<body class="c body">',
-                                                    '<body class="l body">').replace("font-size: x-small;",
-                                                                                     "font-size:  normal;")
+      lstd = lstclean(lstf)
       return dict(LOG=logd, LST=lstd)
 
+   def submit_stream(self, code: str, results: str ="html", prompt: dict = None):
+      '''
+      This method is a generator version of submit(). Rather than returning the whole LOG and LST once the code has finished,
+      it yields SASevent(type, data) tuples as SAS writes them, so you can follow a long running job and keep only what you need.
+      code    - the SAS statements you want to execute
+      results - format of results, HTML is default, TEXT is the alternative
+      prompt  - dict of names:flags to prompt for; see submit()
+
+      Yields - SASevent tuples; type is 'LOG' (a line of the LOG), 'STEP' (a step finished; data is the NOTE: line that said so),
+               'LST' (the next chunk of the listing) or 'DONE' (finished; always the last event)
+
+      i.e,: for ev in sas.submit_stream("proc means data=sashelp.cars; run;"):
+               if ev.type == 'LOG':
+                  print(ev.data)
+      '''
+      prompt = prompt if prompt is not None else {}
+
+      odsopen  = b"ods listing close;ods "+self.sascfg.output.encode()+ \
+                 b" (id=saspy_internal) file=stdout options(bitmap_mode='inline') device=svg style="+self._sb.HTML_Style.encode()+ \
+                 b"; ods graphics on / outputfmt=png;\n"
+      odsclose = b"ods "+self.sascfg.output.encode()+b" (id=saspy_internal) close;ods listing;\n"
+      ods      = True;
+      mj       = b";*\';*\";*/;"
+      logn     = self._logcnt()
+      logcodei = "%put E3969440A681A24088859985" + logn + ";"
+      logcodeo = b"\nE3969440A681A24088859985" + logn.encode()
+
+      if self.pid == None:
+         self._sb.SASpid = None
+         print("No SAS process attached. SAS process has terminated unexpectedly.")
+         yield SASevent('LOG', "No SAS process attached. SAS process has terminated unexpectedly.")
+         yield SASevent('DONE', None)
+         return
+
+      rc = os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOHANG)
+      if rc != None:
+         self.pid = None
+         self._sb.SASpid = None
+         yield SASevent('LOG', 'SAS process has terminated unexpectedly. Pid State= '+str(rc))
+         yield SASevent('DONE', None)
+         return
+
+      if results.upper() != "HTML":
+         ods = False
+
+      pcodei, pcodeiv, pcodeo = promptcode(prompt, self.sascfg._prompt)
+
+      lines   = SASlogLines(self.sascfg.encoding, logcodeo.decode(), mj.decode())
+      lstd    = codecs.getincrementaldecoder('utf-8' if ods else self.sascfg.encoding)(errors='replace')
+      steplog = False
+
+      if ods:
+         self.stdin.write(odsopen)
+
+      pgm  = mj+b'\n'+pcodei.encode(self.sascfg.encoding)+pcodeiv.encode(self.sascfg.encoding)
+      pgm += code.encode(self.sascfg.encoding)+b'\n'+pcodeo.encode(self.sascfg.encoding)+b'\n'+mj
+      out  = self.stdin.write(pgm)
+
+      if ods:
+         self.stdin.write(odsclose)
+
+      out = self.stdin.write(b'\n'+logcodei.encode(self.sascfg.encoding)+b'\n')
+      self.stdin.flush()
+
+      for kind, data in self._readloop(logcodei, logcodeo, odsclose, lambda: lines.done):
+         if kind == 'LST':
+            yield SASevent('LST', lstclean(lstd.decode(data)))
+         elif kind == 'LOG':
+            evs = lines.feed(data)
+            self._log.append(''.join(ev.data+'\n' for ev in evs if ev.type == 'LOG'), newstep=not steplog)
+            steplog = True
+            for ev in evs:
+               yield ev
+         else:
+            for ev in lines.flush():
+               yield ev
+            if kind == 'ABORT':
+               yield SASevent('LOG', data['LOG'].decode(self.sascfg.encoding, errors='replace'))
+            else:
+               yield SASevent('LOG', self._readend(kind, data)['LOG'].strip())
+            yield SASevent('DONE', None)
+            return
+
+      for ev in lines.flush():
+         yield ev
+
+      rest = lstd.decode(b'', final=True)
+      if len(rest):
+         yield SASevent('LST', lstclean(rest))
+
+      yield SASevent('DONE', None)
+
+   def submit_batch(self, code_list: list, results: str ="html") -> list:
+      '''
+      This method submits a list of code blocks at once and returns the results of each, as if each had been submit()'d.
+      All of the blocks are written to SAS together, each followed by its own end of step marker, so there is only one
+      round trip for the whole batch instead of one per block.
+      code_list - list of strings of SAS statements; each one is a block
+      results   - format of results, HTML is default, TEXT is the alternative
+
+      Returns - a list with a Dict for each block, in order, containing two keys:values, [LOG, LST], like submit()
+      '''
+      odsopen  = b"ods listing close;ods "+self.sascfg.output.encode()+ \
+                 b" (id=saspy_internal) file=stdout options(bitmap_mode='inline') device=svg style="+self._sb.HTML_Style.encode()+ \
+                 b"; ods graphics on / outputfmt=png;\n"
+      odsclose = b"ods "+self.sascfg.output.encode()+b" (id=saspy_internal) close;ods listing;\n"
+      ods      = True;
+      mj       = b";*\';*\";*/;"
+      logns    = []
+      pgm      = b''
+
+      if not len(code_list):
+         return []
+
+      if self.pid == None:
+         self._sb.SASpid = None
+         print("No SAS process attached. SAS process has terminated unexpectedly.")
+         return [dict(LOG="No SAS process attached. SAS process has terminated unexpectedly.", LST='')]
+
+      rc = os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOHANG)
+      if rc != None:
+         self.pid = None
+         self._sb.SASpid = None
+         return [dict(LOG='SAS process has terminated unexpectedly. Pid State= '+str(rc), LST='')]
+
+      if results.upper() != "HTML":
+         ods = False
+
+      for code in code_list:
+         logn = self._logcnt()
+         logns.append(logn)
+
+         if ods:
+            pgm += odsopen
+         pgm += mj+b'\n'+code.encode(self.sascfg.encoding)+b'\n'+mj
+         if ods:
+            pgm += odsclose
+         else:
+            pgm += b'\n'+lstmarkcode(logn).encode(self.sascfg.encoding)
+         pgm += b'\n'+("%put E3969440A681A24088859985" + logn + ";").encode(self.sascfg.encoding)+b'\n'
+
+      logcodei = "%put E3969440A681A24088859985" + logns[-1] + ";"
+      logcodeo = b"\nE3969440A681A24088859985" + logns[-1].encode()
+      lstf     = SASbuffer()
+      logf     = SASbuffer(logcodeo)
+
+      self.stdin.write(pgm)
+      self.stdin.flush()
+
+      for kind, data in self._readloop(logcodei, logcodeo, odsclose, lambda: logf.found):
+         if kind == 'LST':
+            lstf += data
+         elif kind == 'LOG':
+            logf += data
+         else:
+            return [self._readend(kind, data, logf)]
+
+      if ods:
+         try:
+            lstf = lstf.decode()
+         except UnicodeDecodeError:
+            try:
+               lstf = lstf.decode(self.sascfg.encoding)
+            except UnicodeDecodeError:
+               lstf = lstf.decode(errors='replace')
+         # each block's ODS output is its own HTML document
+         lsts = [doc.lstrip()+'</html>' for doc in lstf.split('</html>')[:-1]]
+         for i in range(len(lsts)):
+            trip = lsts[i].rpartition("/*]]>*/")
+            if len(trip[1]) > 0 and len(trip[2]) < 200:
+               lsts[i] = ''
+      else:
+         lsts = splitlst(lstf.decode(self.sascfg.encoding, errors='replace'), logns)
+
+      logf = logf.decode(self.sascfg.encoding, errors='replace')
+      self._log += logf
+
+      logs = splitlog(logf, logns, mj.decode(self.sascfg.encoding))
+      lsts = (lsts + ['']*len(logs))[:len(logs)]
+
+      return [dict(LOG=logs[i], LST=lstclean(lsts[i])) for i in range(len(logs))]
+
+   async def submit_async(self, code: str, results: str ="html", prompt: dict = None) -> dict:
+      '''
+      This method is the asyncio version of submit(); it takes the same parameters and returns the same Dict.
+      Rather than blocking while SAS runs the code, it waits on the stdout and stderr pipes with the event loop's
+      add_reader(), so other tasks keep running. Cancelling it stops the wait, not the code running in SAS.
+      '''
+      import asyncio
+
+      prompt = prompt if prompt is not None else {}
+
+      odsopen  = b"ods listing close;ods "+self.sascfg.output.encode()+ \
+                 b" (id=saspy_internal) file=stdout options(bitmap_mode='inline') device=svg style="+self._sb.HTML_Style.encode()+ \
+                 b"; ods graphics on / outputfmt=png;\n"
+      odsclose = b"ods "+self.sascfg.output.encode()+b" (id=saspy_internal) close;ods listing;\n"
+      ods      = True;
+      mj       = b";*\';*\";*/;"
+      logn     = self._logcnt()
+      logcodei = "%put E3969440A681A24088859985" + logn + ";"
+      logcodeo = b"\nE3969440A681A24088859985" + logn.encode()
+      lstf     = SASbuffer()
+      logf     = SASbuffer(logcodeo)
+
+      if self.pid == None:
+         self._sb.SASpid = None
+         print("No SAS process attached. SAS process has terminated unexpectedly.")
+         return dict(LOG="No SAS process attached. SAS process has terminated unexpectedly.", LST='')
+
+      rc = os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOHANG)
+      if rc != None:
+         self.pid = None
+         self._sb.SASpid = None
+         return dict(LOG='SAS process has terminated unexpectedly. Pid State= '+str(rc), LST='')
+
+      if results.upper() != "HTML":
+         ods = False
+
+      pcodei, pcodeiv, pcodeo = promptcode(prompt, self.sascfg._prompt)
+
+      pgm  = odsopen if ods else b''
+      pgm += mj+b'\n'+pcodei.encode(self.sascfg.encoding)+pcodeiv.encode(self.sascfg.encoding)
+      pgm += code.encode(self.sascfg.encoding)+b'\n'+pcodeo.encode(self.sascfg.encoding)+b'\n'+mj
+      pgm += odsclose if ods else b''
+      pgm += b'\n'+logcodei.encode(self.sascfg.encoding)+b'\n'
+
+      loop  = asyncio.get_running_loop()
+      ready = asyncio.Event()
+      fds   = [self.stdout.fileno(), self.stderr.fileno()]
+      for fd in fds:
+         loop.add_reader(fd, ready.set)
+
+      try:
+         self.stdin.write(pgm)
+         self.stdin.flush()
+
+         for kind, data in self._readloop(logcodei, logcodeo, odsclose, lambda: logf.found, wait=0):
+            if kind == 'LST':
+               lstf += data
+            elif kind == 'LOG':
+               logf += data
+            elif kind == 'WAIT':
+               ready.clear()
+               try:
+                  await asyncio.wait_for(ready.wait(), 0.5)
+               except asyncio.TimeoutError:
+                  pass
+            else:
+               return self._readend(kind, data, logf)
+      finally:
+         for fd in fds:
+            loop.remove_reader(fd)
+
+      return self._submitresults(lstf, logf, logcodei, mj, ods)
+
    def _breakprompt(self, eos):
         found = False
-        logf  = b''
-        lstf  = b''
+        logf  = SASbuffer(eos)
+        lstf  = SASbuffer()
         bc    = False
 
         if self.pid is None:
@@ -764,8 +1115,15 @@ Will use HTML5 for this SASsession.""")
                 outrc = str(rc)
                 return dict(LOG=b'SAS process has terminated unexpectedly. Pid State= '+outrc.encode(), LST=b'',ABORT=True)
 
-            lst = self.stdout.read1(4096)
+            lst, log = self._readio(.25)
             lstf += lst
+            if len(log) > 0:
+                logf += log
+
+                if logf.found and not found:
+                    print("******************Found end of step. No interrupt processed")
+                    found = True
+
             if len(lst) > 0:
                 lsts = lst.rpartition(b'Select:')
                 if lsts[0] != b'' and lsts[1] != b'':
@@ -796,22 +1154,11 @@ Will use HTML5 for this SASsession.""")
                     else:
                         #print("******************No 'Select' or 'Press' found in lst="+lstf.decode(self.sascfg.encoding, errors='replace'))
                         pass
-            else:
-                log = self.stderr.read1(4096)
-                logf += log
-                self._log += log.decode(self.sascfg.encoding, errors='replace')
+            elif found:
+                break
 
-                if log.count(eos) >= 1:
-                    print("******************Found end of step. No interrupt processed")
-                    found = True
-
-                if found:
-                    break
-
-            sleep(.25)
-
-        lstr = lstf
-        logr = logf
+        lstr = lstf.getvalue()
+        logr = logf.getvalue()
 
         return dict(LOG=logr, LST=lstr, BC=bc)
 
@@ -887,11 +1234,13 @@ Will use HTML5 for this SASsession.""")
 
       return log
 
-   def saslog(self):
+   def saslog(self, last_n_steps: int = None, start: int = None, end: int = None):
       """
-      this method is used to get the current, full contents of the SASLOG
+      this method is used to get the current, full contents of the SASLOG, or part of it
+      last_n_steps - just the LOG of the last n submits
+      start, end   - byte offsets of the part of the LOG to return
       """
-      return self._log
+      return self._log.get(last_n_steps, start, end)
 
    def exist(self, table: str, libref: str ="") -> bool:
       """
@@ -1350,87 +1699,194 @@ Will use HTML5 for this SASsession.""")
       return len(x.encode(self.sascfg.encoding))
 
    def dataframe2sasdata(self, df: '<Pandas Data Frame object>', table: str ='a',
-                         libref: str ="", keep_outer_quotes: bool=False):
+                         libref: str ="", keep_outer_quotes: bool=False, **kwargs):
       """
       This method imports a Pandas Data Frame to a SAS Data Set, returning the SASdata object for the new Data Set.
       df      - Pandas Data Frame to import to a SAS Data Set
       table   - the name of the SAS Data Set to create
       libref  - the libref for the SAS Data Set being created. Defaults to WORK, or USER if assigned
       keep_outer_quotes - for character columns, have SAS keep any outer quotes instead of stripping them off.
+      method  - BINARY to send the rows as fixed width binary records over a socket (see dataframe2sasdataBINARY())
+      lengths - {column name: length} for character columns, in place of their longest value (see charlens())
+      schema  - a SASschema to make the SAS Data Set with, rather than working it out from df (see SASschema)
+      check_lengths - check every character value fits its variable; by default, unless there's a schema
+      df can also be an iterable of Data Frames, which are sent one after the other to the same data step. The columns
+      and lengths are those of the first (or of schema), and the Data Set isn't created if a later one doesn't fit them.
       """
-      input  = ""
-      card   = ""
-      format = ""
-      length = ""
-      dts    = []
-      ncols  = len(df.columns)
-
-      for name in range(ncols):
-         input += "'"+str(df.columns[name])+"'n "
-         if df.dtypes[df.columns[name]].kind in ('O','S','U','V'):
-            try:
-               col_l = df[df.columns[name]].astype(str).apply(self._getbytelen).max()
-            except Exception as e:
-               print("Transcoding error encountered.")
-               print("DataFrame contains characters that can't be transcoded into the SAS session encoding.\n"+str(e))
-               return None
-            if col_l == 0:
-               col_l = 8
-            length += " '"+str(df.columns[name])+"'n $"+str(col_l)
-            if keep_outer_quotes:
-               input  += "~ "
-            dts.append('C')
+      method = kwargs.pop('method', None)
+      if method and method.lower() == 'binary':
+         return self.dataframe2sasdataBINARY(df, table, libref, **kwargs)
+
+      chunks = df2sdchunks(df)
+      first  = next(chunks, None)
+      if first is None:
+         print("There are no Data Frames to import.")
+         return None
+
+      try:
+         schema = kwargs.get('schema')
+         check  = kwargs.get('check_lengths')
+         check  = schema is None if check is None else check
+         if schema is None:
+            schema = SASschema.from_df(first, self.sascfg.encoding, kwargs.get('lengths'))
          else:
-            if df.dtypes[df.columns[name]].kind in ('M'):
-               length += " '"+str(df.columns[name])+"'n 8"
-               input  += ":E8601DT26.6 "
-               format += "'"+str(df.columns[name])+"'n E8601DT26.6 "
-               dts.append('D')
-            else:
-               length += " '"+str(df.columns[name])+"'n 8"
-               if df.dtypes[df.columns[name]] == 'bool':
-                  dts.append('B')
-               else:
-                  dts.append('N')
+            df2sdcheck(first, schema, self.sascfg.encoding, 1, check)
+         length, format, input = df2sdvars(schema, keep_outer_quotes)
+      except Exception as e:
+         if type(e) is ValueError:
+            print(str(e))
+         else:
+            print("Transcoding error encountered.")
+            print("DataFrame contains characters that can't be transcoded into the SAS session encoding.\n"+str(e))
+         return None
 
-      code = "data "
       if len(libref):
-         code += libref+"."
-      code += table+";\n"
+         tabname = libref+"."+table
+      else:
+         tabname = table
+
+      code = "data "+tabname+";\n"
       if len(length):
-         code += "length"+length+";\n"
+         code += "length "+length+";\n"
       if len(format):
          code += "format "+format+";\n"
       code += "infile datalines delimiter='03'x DSD STOPOVER;\n input "+input+";\n datalines4;"
       self._asubmit(code, "text")
 
-      for row in df.itertuples(index=False):
-      #for row in df.iterrows():
-         card  = ""
-         for col in range(ncols):
-            var = str(row[col])
-
-            if   dts[col] == 'N' and var == 'nan':
-               var = '.'
-            elif dts[col] == 'C' and var == 'nan':
-               var = ' '
-            elif dts[col] == 'B':
-               var = str(int(row[col]))
-            elif dts[col] == 'D':
-               if var == 'nan':
-                  var = '.'
-               else:
-                  var = str(row[col].to_datetime64())[:26]
+      chunks = itertools.chain([first], chunks)
+      del first
 
-            card += var
-            if col < (ncols-1):
-               card += chr(3)
-         self.stdin.write(card.encode(self.sascfg.encoding)+b'\n')
-         #self._asubmit(card, "text")
+      failed = False
+      try:
+         for n, chunk in enumerate(chunks, 1):
+            if n > 1:
+               df2sdcheck(chunk, schema, self.sascfg.encoding, n, check)
+            for card in df2sdcards(chunk, schema.kinds):
+               self.stdin.write(card.encode(self.sascfg.encoding))
+      except Exception as e:
+         print("The Data Frames couldn't all be imported, so the SAS Data Set wasn't created.\n"+str(e))
+         failed = True
 
       self._asubmit(";;;;", "text")
       ll = self.submit("run;", 'text')
-      return
+      if failed:
+         ll = self.submit("proc delete data="+tabname+"; run;", 'text')
+         return None
+      return True
+
+   def dataframe2sasdataBINARY(self, df: '<Pandas Data Frame object>', table: str ='a', libref: str ="", **kwargs):
+      """
+      This method imports a Pandas Data Frame to a SAS Data Set, returning the SASdata object for the new Data Set.
+      Rather than formatting the values as delimited text, each row is packed as one fixed width binary record (see
+      df2sdbin()) and streamed to a data step over a socket, which reads it with RB8. and $CHARn. Numerics arrive bit
+      for bit, and nothing is formatted or parsed on either side.
+      df      - Pandas Data Frame to import to a SAS Data Set
+      table   - the name of the SAS Data Set to create
+      libref  - the libref for the SAS Data Set being created. Defaults to WORK, or USER if assigned
+      port    - port to use for socket. Defaults to 0 which uses a random available ephemeral port
+      lengths - {column name: length} for character columns, in place of their longest value
+      schema  - a SASschema to make the SAS Data Set with, rather than working it out from df
+      The character values are always checked against their lengths, as they're encoded to be packed anyway.
+      df can also be an iterable of Data Frames, which are all sent over the same socket, as for dataframe2sasdata().
+      """
+      port =  kwargs.get('port', 0)
+
+      if port==0 and self.sascfg.tunnel:
+         # we are using a tunnel; default to that port
+         port = self.sascfg.tunnel
+
+      if not self._sb._binhost['ieee']:
+         print("Numerics on this SAS host aren't IEEE doubles, so method='BINARY' can't be used. Using method='MEMORY' instead.")
+         return self.dataframe2sasdata(df, table, libref, **kwargs)
+
+      chunks = df2sdchunks(df)
+      first  = next(chunks, None)
+      if first is None:
+         print("There are no Data Frames to import.")
+         return None
+
+      order = self._sb._binhost['order']
+      try:
+         schema = kwargs.get('schema')
+         if schema is not None:
+            df2sdcheck(first, schema, self.sascfg.encoding, 1, lengths=False)
+         schema, recs = df2sdbin(first, self.sascfg.encoding, order, schema, kwargs.get('lengths'))
+         length, format = df2sdvars(schema)[:2]
+      except Exception as e:
+         if type(e) is ValueError:
+            print(str(e))
+         else:
+            print("Transcoding error encountered.")
+            print("DataFrame contains characters that can't be transcoded into the SAS session encoding.\n"+str(e))
+         return None
+
+      try:
+         sock = socks.socket()
+         if self.sascfg.tunnel:
+            sock.bind(('localhost', port))
+         else:
+            sock.bind(('', port))
+         port = sock.getsockname()[1]
+      except OSError:
+         print('Error try to open a socket in the dataframe2sasdata method. Call failed.')
+         return None
+
+      if self.sascfg.ssh:
+         if not self.sascfg.tunnel:
+            host = self.sascfg.hostip #socks.gethostname()
+         else:
+            host = 'localhost'
+      else:
+         host = ''
+
+      input, width = binputcode(schema.meta())
+
+      if len(libref):
+         tabname = libref+"."+table
+      else:
+         tabname = table
+
+      code  = "filename sock socket '"+host+":"+str(port)+"' recfm=f lrecl="+str(max(width, 1))+";\n"
+      code += "data "+tabname+";\n"
+      if len(length):
+         code += "length "+length+";\n"
+      if len(format):
+         code += "format "+format+";\n"
+      code += "infile sock;\n input "+input+";\nrun;\n"
+
+      del first
+
+      sock.listen(1)
+      self._asubmit(code, 'text')
+
+      failed  = False
+      newsock = (0,0)
+      try:
+         newsock = sock.accept()
+         newsock[0].sendall(recs.data)
+         del recs
+         for n, chunk in enumerate(chunks, 2):
+            df2sdcheck(chunk, schema, self.sascfg.encoding, n, lengths=False)
+            newsock[0].sendall(df2sdbin(chunk, self.sascfg.encoding, order, schema)[1].data)
+      except Exception as e:
+         print("The Data Frames couldn't all be imported, so the SAS Data Set wasn't created.\n"+str(e))
+         failed = True
+      except:
+         print("dataframe2sasdata was interupted. The SAS Data Set may be incomplete.")
+      finally:
+         if newsock[0]:
+            try:
+               newsock[0].shutdown(socks.SHUT_RDWR)
+            except OSError:
+               pass
+            newsock[0].close()
+         sock.close()
+
+      ll = self.submit("filename sock;", 'text')
+      if failed:
+         ll = self.submit("proc delete data="+tabname+"; run;", 'text')
+         return None
+      return True
 
    def sasdata2dataframe(self, table: str, libref: str ='', dsopts: dict = None, rowsep: str = '\x01', colsep: str = '\x02', **kwargs) -> '<Pandas Data Frame object>':
       """
@@ -1446,6 +1902,42 @@ Will use HTML5 for this SASsession.""")
       method = kwargs.pop('method', None)
       if method and method.lower() == 'csv':
          return self.sasdata2dataframeCSV(table, libref, dsopts, **kwargs)
+      if method and method.lower() == 'binary':
+         return self.sasdata2dataframeBINARY(table, libref, dsopts, **kwargs)
+
+      trows = kwargs.pop('trows', None)
+      if not trows:
+         trows = 100000
+
+      dfs = []
+      try:
+         for tdf in self.sasdata2dataframe_iter(table, libref, dsopts, rowsep, colsep, chunksize=trows, **kwargs):
+            dfs.append(tdf)
+      except:
+         print("sasdata2dataframe was interupted. Trying to return the saslog instead of a data frame.")
+         ll = self.submit("", 'text')
+         return ll['LOG']
+
+      if len(dfs) == 0:
+         return None
+
+      return concatchunks(dfs)
+
+   def sasdata2dataframe_iter(self, table: str, libref: str ='', dsopts: dict = None, rowsep: str = '\x01', colsep: str = '\x02',
+                              chunksize: int = 100000, **kwargs) -> '<generator of Pandas Data Frame objects>':
+      """
+      This method is a generator version of sasdata2dataframe(). It yields the SAS Data Set as Pandas Data Frames of
+      chunksize rows each (the last one can be shorter) as they're read from the socket, so only one chunk at a time is
+      held in memory. A table with no rows yields one empty Data Frame with the columns. If the generator is closed before
+      the end, the socket is closed, which ends the data step in SAS.
+      table     - the name of the SAS Data Set you want to export to Pandas Data Frames
+      libref    - the libref for the SAS Data Set.
+      rowsep    - the row seperator character to use; defaults to '\n'
+      colsep    - the column seperator character to use; defaults to '\t'
+      chunksize - the number of rows in each Data Frame
+      port      - port to use for socket. Defaults to 0 which uses a random available ephemeral port
+      """
+      dsopts = dsopts if dsopts is not None else {}
 
       port =  kwargs.get('port', 0)
 
@@ -1453,59 +1945,128 @@ Will use HTML5 for this SASsession.""")
          # we are using a tunnel; default to that port
          port = self.sascfg.tunnel
 
-      datar = ""
-
       if libref:
          tabname = libref+"."+table
       else:
          tabname = table
 
-      code  = "proc sql; create view sasdata2dataframe as select * from "+tabname+self._sb._dsopts(dsopts)+";quit;\n"
-      code += "data _null_; file STDERR;d = open('sasdata2dataframe');\n"
-      code += "lrecl = attrn(d, 'LRECL'); nvars = attrn(d, 'NVARS');\n"
-      code += "lr='LRECL='; vn='VARNUMS='; vl='VARLIST='; vt='VARTYPE=';\n"
-      code += "put lr lrecl; put vn nvars; put vl;\n"
-      code += "do i = 1 to nvars; var = varname(d, i); put var; end;\n"
-      code += "put vt;\n"
-      code += "do i = 1 to nvars; var = vartype(d, i); put var; end;\n"
-      code += "run;"
+      meta    = kwargs.pop('meta', None) or self._sb._tablemeta(table, libref, dsopts, 'STDERR')
+      nvars   = len(meta['names'])
+      varlist = meta['names']
+      vartype = meta['types']
+      varcat  = meta['fmts']
 
-      ll = self.submit(code, "text")
+      try:
+         sock = socks.socket()
+         if self.sascfg.tunnel:
+            sock.bind(('localhost', port))
+         else:
+            sock.bind(('', port))
+         port = sock.getsockname()[1]
+      except OSError:
+         print('Error try to open a socket in the sasdata2dataframe method. Call failed.')
+         return
 
-      l2 = ll['LOG'].rpartition("LRECL= ")
-      l2 = l2[2].partition("\n")
-      lrecl = int(l2[0])
+      if self.sascfg.ssh:
+         if not self.sascfg.tunnel:
+            host = self.sascfg.hostip #socks.gethostname()
+         else:
+            host = 'localhost'
+      else:
+         host = ''
 
-      l2 = l2[2].partition("VARNUMS= ")
-      l2 = l2[2].partition("\n")
-      nvars = int(l2[0])
+      rdelim = "'"+'%02x' % ord(rowsep.encode(self.sascfg.encoding))+"'x"
+      cdelim = "'"+'%02x' % ord(colsep.encode(self.sascfg.encoding))+"'x "
 
-      l2 = l2[2].partition("\n")
-      varlist = l2[2].split("\n", nvars)
-      del varlist[nvars]
+      code  = ""
+      code += "filename sock socket '"+host+":"+str(port)+"' lrecl="+str(self.sascfg.lrecl)+" recfm=v termstr=LF;\n"
+      code += " data _null_; "+metacheckcode(meta, tabname)+"set "+tabname+self._sb._dsopts(dsopts)+";\n file sock dlm="+cdelim+"; put "
+      code += sd2dfputcode(varlist, vartype, varcat, self._sb, cdelim.strip(), rdelim, meta['lens'])
+      code += "; run;\n"
 
-      l2 = l2[2].partition("VARTYPE=")
-      l2 = l2[2].partition("\n")
-      vartype = l2[2].split("\n", nvars)
-      del vartype[nvars]
+      sock.listen(1)
+      self._asubmit(code, 'text')
 
-      topts             = dict(dsopts)
-      topts['obs']      = 0
-      topts['firstobs'] = ''
-      
-      code  = "data work._n_u_l_l_;output;run;\n"
-      code += "data _null_; set "+tabname+self._sb._dsopts(topts)+" work._n_u_l_l_;put 'FMT_CATS=';\n"
+      newsock = (0,0)
+      empty   = None
+      try:
+         newsock = self._metaaccept(sock, meta)
+         if newsock:
+            newsock[0].settimeout(self._socktimeout)
+            buf     = bytearray(1048576)
+            view    = memoryview(buf)
+
+            def fill():
+               n = newsock[0].recv_into(buf)
+               return bytes(view[:n])
+
+            rdr = SASrowreader(fill, rowsep.encode())
+            for tdf in readrows(rdr, varlist, vartype, varcat, self._sb, self.sascfg.encoding, colsep, rowsep, chunksize):
+               if meta.get('cached') and not len(tdf):
+                  empty = tdf
+                  break
+               yield tdf
+      finally:
+         # also when the generator is closed early; SAS's data step ends when it can't write to the socket
+         if newsock and newsock[0]:
+            newsock[0].shutdown(socks.SHUT_RDWR)
+            newsock[0].close()
+         sock.close()
 
-      for i in range(nvars):
-         code += "_tom = vformatn('"+varlist[i]+"'n);put _tom;\n"
-      code += "run;\nproc delete data=work._n_u_l_l_;run;"
-      
-      ll = self.submit(code, "text")
-      
-      l2 = ll['LOG'].rpartition("FMT_CATS=")
-      l2 = l2[2].partition("\n")
-      varcat = l2[2].split("\n", nvars)
-      del varcat[nvars]
+      # with cached variables, SAS didn't connect, or sent no rows: if they'd changed, do it again with them as they are
+      redo = None
+      if newsock is None:
+         redo = self._sb._tablemeta(table, libref, dsopts, 'STDERR', refresh=True)
+      elif empty is not None:
+         redo = self._sb._tablestale(meta, table, libref, dsopts, 'STDERR')
+      if redo:
+         yield from self.sasdata2dataframe_iter(table, libref, dsopts, rowsep, colsep, chunksize, meta=redo, **kwargs)
+      elif empty is not None:
+         yield empty
+
+   def _metaaccept(self, sock, meta: dict) -> tuple:
+      """
+      Accept SAS's connection to sock for a sasdata2dataframe method. With meta from the cache, the data step may not
+      compile, if the variables it was written for have changed, so this waits only _metawait seconds, and returns
+      None if SAS hasn't connected by then, for the transfer to be redone with the variables got again.
+      """
+      sock.settimeout(self._metawait if meta.get('cached') else self._socktimeout)
+      try:
+         return sock.accept()
+      except socks.timeout:
+         if not meta.get('cached'):
+            raise
+      return None
+
+   def sasdata2dataframeBINARY(self, table: str, libref: str ='', dsopts: dict = None, **kwargs) -> '<Pandas Data Frame object>':
+      """
+      This method exports the SAS Data Set to a Pandas Data Frame, returning the Data Frame object.
+      Rather than formatting numerics as text, SAS writes each observation to the socket as one fixed width binary
+      record: numerics as 8 byte doubles (RB8.) and character variables at their length ($CHAR.). These are read
+      straight into numpy arrays, so there's no formatting or parsing of numbers on either side.
+      table   - the name of the SAS Data Set you want to export to a Pandas Data Frame
+      libref  - the libref for the SAS Data Set.
+      dsopts  - data set options for the input SAS Data Set
+      port    - port to use for socket. Defaults to 0 which uses a random available ephemeral port
+      """
+      dsopts = dsopts if dsopts is not None else {}
+
+      port =  kwargs.get('port', 0)
+
+      if port==0 and self.sascfg.tunnel:
+         # we are using a tunnel; default to that port
+         port = self.sascfg.tunnel
+
+      if libref:
+         tabname = libref+"."+table
+      else:
+         tabname = table
+
+      meta = kwargs.pop('meta', None) or self._sb._tablemeta(table, libref, dsopts, 'STDERR')
+
+      if not meta['ieee']:
+         print("Numerics on this SAS host aren't IEEE doubles, so method='BINARY' can't be used. Using method='MEMORY' instead.")
+         return self.sasdata2dataframe(table, libref, dsopts, **kwargs)
 
       try:
          sock = socks.socket()
@@ -1526,78 +2087,30 @@ Will use HTML5 for this SASsession.""")
       else:
          host = ''
 
-      rdelim = "'"+'%02x' % ord(rowsep.encode(self.sascfg.encoding))+"'x"
-      cdelim = "'"+'%02x' % ord(colsep.encode(self.sascfg.encoding))+"'x "
+      put, width = binputcode(meta)
 
-      code  = ""
-      code += "filename sock socket '"+host+":"+str(port)+"' lrecl="+str(self.sascfg.lrecl)+" recfm=v termstr=LF;\n"
-      code += " data _null_; set "+tabname+self._sb._dsopts(dsopts)+";\n file sock dlm="+cdelim+"; put "
-      for i in range(nvars):
-         code += "'"+varlist[i]+"'n "
-         if vartype[i] == 'N':
-            if varcat[i] in self._sb.sas_date_fmts:
-               code += 'E8601DA10. '+cdelim
-            else:
-               if varcat[i] in self._sb.sas_time_fmts:
-                  code += 'E8601TM15.6 '+cdelim
-               else:
-                  if varcat[i] in self._sb.sas_datetime_fmts:
-                     code += 'E8601DT26.6 '+cdelim
-                  else:
-                     code += 'best32. '+cdelim
-         if not (i < (len(varlist)-1)):
-            code += rdelim
-      code += "; run;\n"
+      code  = "filename sock socket '"+host+":"+str(port)+"' recfm=f lrecl="+str(max(width, 1))+";\n"
+      code += "data _null_; "+metacheckcode(meta, tabname)+"set "+tabname+self._sb._dsopts(dsopts)+";\n file sock; put "+put+"; run;\n"
 
       sock.listen(1)
       self._asubmit(code, 'text')
 
-      r     = []
-      df    = None
-      datar = b''
-      trows = kwargs.get('trows', None)
-      if not trows:
-         trows = 100000
-
+      datar   = []
       newsock = (0,0)
       try:
-         newsock = sock.accept()
+         newsock = self._metaaccept(sock, meta)
+         if newsock is None:
+            sock.close()
+            meta = self._sb._tablemeta(table, libref, dsopts, 'STDERR', refresh=True)
+            return self.sasdata2dataframeBINARY(table, libref, dsopts, meta=meta, **kwargs)
+         newsock[0].settimeout(self._socktimeout)
          while True:
-            data = newsock[0].recv(4096)
+            data = newsock[0].recv(1048576)
 
             if len(data):
-               datar += data
+               datar.append(data)
             else:
                break
-
-            data  = datar.rpartition(colsep.encode()+rowsep.encode()+b'\n')
-            datap = data[0]+data[1]
-            datar = data[2]
-
-            datap = datap.decode(self.sascfg.encoding, errors='replace')
-            for i in datap.split(sep=colsep+rowsep+'\n'):
-               if i != '':
-                  r.append(tuple(i.split(sep=colsep)))
-
-            if len(r) > trows:
-               tdf = pd.DataFrame.from_records(r, columns=varlist)
-
-               for i in range(nvars):
-                  if vartype[i] == 'N':
-                     if varcat[i] not in self._sb.sas_date_fmts + self._sb.sas_time_fmts + self._sb.sas_datetime_fmts:
-                        if tdf.dtypes[tdf.columns[i]].kind not in ('f','u','i','b','B','c','?'):
-                           tdf[varlist[i]] = pd.to_numeric(tdf[varlist[i]], errors='coerce')
-                     else:
-                        if tdf.dtypes[tdf.columns[i]].kind not in ('M'):
-                           tdf[varlist[i]] = pd.to_datetime(tdf[varlist[i]], errors='coerce')
-                  else:
-                     tdf[varlist[i]].replace(' ', np.NaN, True)
-
-               if df is not None:
-                  df = df.append(tdf, ignore_index=True)
-               else:
-                  df = tdf
-               r = []
       except:
          print("sasdata2dataframe was interupted. Trying to return the saslog instead of a data frame.")
          if newsock[0]:
@@ -1611,24 +2124,18 @@ Will use HTML5 for this SASsession.""")
       newsock[0].close()
       sock.close()
 
-      if len(r) > 0 or df is None:
-         tdf = pd.DataFrame.from_records(r, columns=varlist)
-
-         for i in range(nvars):
-            if vartype[i] == 'N':
-               if varcat[i] not in self._sb.sas_date_fmts + self._sb.sas_time_fmts + self._sb.sas_datetime_fmts:
-                  if tdf.dtypes[tdf.columns[i]].kind not in ('f','u','i','b','B','c','?'):
-                     tdf[varlist[i]] = pd.to_numeric(tdf[varlist[i]], errors='coerce')
-               else:
-                  if tdf.dtypes[tdf.columns[i]].kind not in ('M'):
-                     tdf[varlist[i]] = pd.to_datetime(tdf[varlist[i]], errors='coerce')
-            else:
-               tdf[varlist[i]].replace(' ', np.NaN, True)
+      try:
+         df = bin2df(b''.join(datar), meta, self._sb, self.sascfg.encoding)
+      except ValueError as e:
+         print("sasdata2dataframe didn't get all of the data: "+str(e)+" Returning the saslog instead of a data frame.")
+         ll = self.submit("", 'text')
+         return ll['LOG']
 
-         if df is not None:
-            df = df.append(tdf, ignore_index=True)
-         else:
-            df = tdf
+      if not len(df):
+         # with cached variables, the data step stops before the first row if they've changed
+         fresh = self._sb._tablestale(meta, table, libref, dsopts, 'STDERR')
+         if fresh:
+            return self.sasdata2dataframeBINARY(table, libref, dsopts, meta=fresh, **kwargs)
 
       return df
 
@@ -1642,6 +2149,8 @@ Will use HTML5 for this SASsession.""")
       tempfile - file to use to store CSV, else temporary file will be used.
       tempkeep - if you specify your own file to use with tempfile=, this controls whether it's cleaned up after using it
       """
+      import pandas as pd
+
       dsopts = dsopts if dsopts is not None else {}
 
       port =  kwargs.get('port', 0)
@@ -1663,52 +2172,11 @@ Will use HTML5 for this SASsession.""")
       else:
          tmpcsv  = tempfile
 
-      code  = "proc sql; create view sasdata2dataframe as select * from "+tabname+self._sb._dsopts(dsopts)+";quit;\n"
-      code += "data _null_; file STDERR;d = open('sasdata2dataframe');\n"
-      code += "lrecl = attrn(d, 'LRECL'); nvars = attrn(d, 'NVARS');\n"
-      code += "lr='LRECL='; vn='VARNUMS='; vl='VARLIST='; vt='VARTYPE=';\n"
-      code += "put lr lrecl; put vn nvars; put vl;\n"
-      code += "do i = 1 to nvars; var = varname(d, i); put var; end;\n"
-      code += "put vt;\n"
-      code += "do i = 1 to nvars; var = vartype(d, i); put var; end;\n"
-      code += "run;"
-
-      ll = self.submit(code, "text")
-
-      l2 = ll['LOG'].rpartition("LRECL= ")
-      l2 = l2[2].partition("\n")
-      lrecl = int(l2[0])
-
-      l2 = l2[2].partition("VARNUMS= ")
-      l2 = l2[2].partition("\n")
-      nvars = int(l2[0])
-
-      l2 = l2[2].partition("\n")
-      varlist = l2[2].split("\n", nvars)
-      del varlist[nvars]
-
-      l2 = l2[2].partition("VARTYPE=")
-      l2 = l2[2].partition("\n")
-      vartype = l2[2].split("\n", nvars)
-      del vartype[nvars]
-
-      topts             = dict(dsopts)
-      topts['obs']      = 0
-      topts['firstobs'] = ''
-
-      code  = "data work._n_u_l_l_;output;run;\n"
-      code += "data _null_; set "+tabname+self._sb._dsopts(topts)+" work._n_u_l_l_;put 'FMT_CATS=';\n"
-
-      for i in range(nvars):
-         code += "_tom = vformatn('"+varlist[i]+"'n);put _tom;\n"
-      code += "run;\nproc delete data=work._n_u_l_l_;run;"
-
-      ll = self.submit(code, "text")
-
-      l2 = ll['LOG'].rpartition("FMT_CATS=")
-      l2 = l2[2].partition("\n")
-      varcat = l2[2].split("\n", nvars)
-      del varcat[nvars]
+      meta    = kwargs.pop('meta', None) or self._sb._tablemeta(table, libref, dsopts, 'STDERR')
+      nvars   = len(meta['names'])
+      varlist = meta['names']
+      vartype = meta['types']
+      varcat  = meta['fmts']
 
       if self.sascfg.ssh:
          try:
@@ -1731,24 +2199,21 @@ Will use HTML5 for this SASsession.""")
          host = ''
          code = "filename sock '"+tmpcsv+"' lrecl="+str(self.sascfg.lrecl)+" recfm=v encoding='utf-8';\n"
 
-      code += "data sasdata2dataframe / view=sasdata2dataframe; set "+tabname+self._sb._dsopts(dsopts)+";\nformat "
-
-      for i in range(nvars):
-         if vartype[i] == 'N':
-            code += "'"+varlist[i]+"'n "
-            if varcat[i] in self._sb.sas_date_fmts:
-               code += 'E8601DA10. '
-            else:
-               if varcat[i] in self._sb.sas_time_fmts:
-                  code += 'E8601TM15.6 '
-               else:
-                  if varcat[i] in self._sb.sas_datetime_fmts:
-                     code += 'E8601DT26.6 '
-                  else:
-                     code += 'best32. '
+      code += "data sasdata2dataframe / view=sasdata2dataframe; "+metacheckcode(meta, tabname)
+      code += "set "+tabname+self._sb._dsopts(dsopts)+";\nformat "
+      code += sd2dfformatcode(varlist, vartype, varcat, self._sb)
       code += ";\n run;\n"
       ll = self.submit(code, "text")
 
+      if meta.get('cached') and re.search(r'^ERROR', ll['LOG'], re.M):
+         # the view doesn't compile with the cached variables; they've changed
+         if self.sascfg.ssh:
+            sock.close()
+         if tmpdir:
+            tmpdir.cleanup()
+         meta = self._sb._tablemeta(table, libref, dsopts, 'STDERR', refresh=True)
+         return self.sasdata2dataframeCSV(table, libref, dsopts, tempfile, tempkeep, meta=meta, **kwargs)
+
       dts = kwargs.pop('dtype', '')
       if dts == '':
          dts = {}
@@ -1769,11 +2234,13 @@ Will use HTML5 for this SASsession.""")
       if self.sascfg.ssh:
          csv = open(tmpcsv, mode='wb')
          sock.listen(1)
+         sock.settimeout(self._socktimeout)
          self._asubmit(code, 'text')
 
          newsock = (0,0)
          try:
             newsock = sock.accept()
+            newsock[0].settimeout(self._socktimeout)
             while True:
                data = newsock[0].recv(4096)
 
@@ -1807,6 +2274,12 @@ Will use HTML5 for this SASsession.""")
          if not tempkeep:
             os.remove(tmpcsv)
 
+      if not len(df):
+         # with cached variables, the view stops before the first row if they've changed
+         fresh = self._sb._tablestale(meta, table, libref, dsopts, 'STDERR')
+         if fresh:
+            return self.sasdata2dataframeCSV(table, libref, dsopts, tempfile, tempkeep, meta=fresh, **kwargs)
+
       for i in range(nvars):
          if varcat[i] in self._sb.sas_date_fmts + self._sb.sas_time_fmts + self._sb.sas_datetime_fmts:
             df[varlist[i]] = pd.to_datetime(df[varlist[i]], errors='coerce')
@@ -0,0 +1,190 @@
+#
+# Copyright SAS Institute
+#
+#  Licensed under the Apache License, Version 2.0 (the License);
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+#
+# SASsessionPool runs independent work on several SAS sessions at once:
+#
+# import saspy
+# with saspy.SASsessionPool('default', size=4, init="libname mydata '/data';") as pool:
+#     futs = [pool.submit("proc means data=mydata.sales; where region='"+r+"'; run;") for r in regions]
+#     logs = [f.result()['LOG'] for f in futs]
+#     dfs  = list(pool.map(lambda sas, t: sas.sd2df(t, 'mydata'), tables))
+#
+
+import queue
+
+from concurrent.futures import ThreadPoolExecutor
+
+from saspy.sasbase import SASsession
+
+
+class SASsessionPool():
+    """
+    **Overview**
+
+    A SASsession is one SAS process, which runs one thing at a time. This object starts size SAS sessions (workers) of
+    any access method and runs the work given to it on whichever worker is free, so independent jobs run in parallel.
+    Work is dispatched like a concurrent.futures Executor: submit() returns a Future and map() returns the results in
+    order. Each piece of work is either a string of SAS code, which is submit()'d, or a function that is called with the
+    worker's SASsession as its first argument.
+
+    Before a worker is handed out, it is checked, and if its SAS process has gone away it is replaced with a new one.
+    health_check() checks all of the idle workers at once.
+
+    :param cfgname: the configuration definition to use for the workers
+    :param size: the number of workers (SAS sessions) to start
+    :param init: SAS code to submit, or a function to call with the SASsession, on each worker when it starts,
+        i.e. to assign librefs. It runs after the autoexec of the configuration, if there is one
+    :param kwargs: any of the other parameters SASsession takes; they are used for every worker
+    """
+
+    def __init__(self, cfgname: str = '', size: int = 2, init=None, **kwargs):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+
+        self.size     = size
+        self.init     = init
+        self._kwargs  = dict(kwargs)
+        self._idle    = queue.Queue()
+        self._workers = []
+        self._closed  = False
+        self._exec    = ThreadPoolExecutor(max_workers=size, thread_name_prefix='saspy')
+
+        if len(cfgname):
+            self._kwargs['cfgname'] = cfgname
+
+        for sas in self._exec.map(lambda i: self._start(), range(size)):
+            self._workers.append(sas)
+            self._idle.put(sas)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def __repr__(self):
+        x  = "SAS session pool\n"
+        x += "Workers               = %d\n" % self.size
+        x += "Idle workers          = %d\n" % self._idle.qsize()
+        x += "SAS process Pid values= %s\n" % str([sas.SASpid for sas in self._workers])
+        return x
+
+    def _start(self) -> SASsession:
+        """
+        Start a worker and run the init code on it.
+        """
+        sas = SASsession(**self._kwargs)
+
+        if self.init is not None:
+            if callable(self.init):
+                self.init(sas)
+            else:
+                sas.submit(self.init)
+        return sas
+
+    def _restart(self, sas: SASsession) -> SASsession:
+        """
+        Replace a dead worker with a new one.
+        """
+        try:
+            sas._endsas()
+        except Exception:
+            pass
+
+        new = self._start()
+        self._workers[self._workers.index(sas)] = new
+        return new
+
+    def _call(self, work, args, kwargs):
+        sas = self._idle.get()
+        try:
+            if not sas._alive():
+                sas = self._restart(sas)
+            if isinstance(work, str):
+                return sas.submit(work, *args, **kwargs)
+            return work(sas, *args, **kwargs)
+        finally:
+            self._idle.put(sas)
+
+    def submit(self, work, *args, **kwargs) -> 'concurrent.futures.Future':
+        """
+        Run work on the next free worker.
+
+        :param work: a string of SAS code to submit, or a function to call with the worker's SASsession as the first argument
+        :param args: the other arguments to pass; for SAS code these are the other arguments of SASsession.submit()
+        :param kwargs: the other keyword arguments to pass
+        :return: a concurrent.futures.Future for the result; the LOG/LST dict for SAS code, or what the function returned
+        """
+        if self._closed:
+            raise RuntimeError("cannot submit to a SASsessionPool after shutdown")
+        return self._exec.submit(self._call, work, args, kwargs)
+
+    def map(self, work, *iterables, timeout: float = None):
+        """
+        Run work for each set of arguments from the iterables, on the workers in parallel, like the builtin map().
+
+        :param work: a string of SAS code to submit, or a function to call with the worker's SASsession as the first argument
+        :param iterables: the arguments to pass for each call
+        :param timeout: seconds to wait for the results, in total; None to wait as long as it takes
+        :return: an iterator of the results, in order
+        """
+        if self._closed:
+            raise RuntimeError("cannot submit to a SASsessionPool after shutdown")
+        return self._exec.map(lambda *args: self._call(work, args, {}), *iterables, timeout=timeout)
+
+    def health_check(self) -> int:
+        """
+        Check all of the workers not busy running something and replace any whose SAS process has gone away.
+
+        :return: the number of workers that were replaced
+        """
+        idle = []
+        cnt  = 0
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+        try:
+            for i in range(len(idle)):
+                if not idle[i]._alive():
+                    idle[i] = self._restart(idle[i])
+                    cnt    += 1
+        finally:
+            for sas in idle:
+                self._idle.put(sas)
+        return cnt
+
+    @property
+    def sessions(self) -> list:
+        """
+        The SASsession of each worker
+        """
+        return list(self._workers)
+
+    def shutdown(self):
+        """
+        Stop taking work, wait for the work already submitted to finish and end the SAS sessions of all of the workers.
+        """
+        self._closed = True
+        self._exec.shutdown(wait=True)
+        for sas in self._workers:
+            try:
+                sas._endsas()
+            except Exception:
+                pass
@@ -13,9 +13,6 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
-from saspy.SASLogLexer import SASLogStyle, SASLogLexer
-from pygments.formatters import HtmlFormatter
-from pygments import highlight
 
 
 class SASresults(object):
@@ -74,6 +71,11 @@ class SASresults(object):
            return data
 
     def _colorLog(self,log:str)-> str:
+        # pygments is only needed to show a LOG, so it isn't imported until then
+        from saspy.SASLogLexer import SASLogStyle, SASLogLexer
+        from pygments.formatters import HtmlFormatter
+        from pygments import highlight
+
         color_log = highlight(log, SASLogLexer(), HtmlFormatter(full=True, style=SASLogStyle, lineseparator="<br>"))
         return color_log
 
@@ -1,11 +1,6 @@
 import logging
 from typing import TYPE_CHECKING
 
-try:
-    import pandas as pd
-except ImportError:
-    pass
-
 from collections import ChainMap
 import saspy as sp
 
@@ -332,6 +327,8 @@ class Tabulate:
             return self.to_nested_dataframe(code)
 
     def to_nested_dataframe(self, code):
+        import pandas as pd
+
         result = self.sas.submit(code)
         outdata = self.sas.sd2df('temptab')
 
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+import unittest
+
+
+# modules that importing saspy used to pull in, but which only some sessions ever use
+HEAVY = ['pandas', 'numpy', 'pygments', 'IPython', 'asyncio', 'concurrent.futures',
+         'saspy.sasiostdio', 'saspy.sasioiom', 'saspy.sasiohttp', 'saspy.sasiocom']
+
+
+def import_time(runs: int = 5) -> float:
+    """
+    Import saspy in a fresh interpreter runs times, per -X importtime, and return the best time in seconds.
+    """
+    best = None
+    for i in range(runs):
+        res = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import saspy'],
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        last = [l for l in res.stderr.splitlines() if l.endswith('| saspy')][-1]
+        us   = int(last.split('|')[1])
+        best = us if best is None else min(best, us)
+    return best / 1000000
+
+
+class TestImport(unittest.TestCase):
+    def test_import_is_lazy(self):
+        """
+        Test that importing saspy doesn't import pandas, IPython, pygments or the access method modules.
+        """
+        code = 'import sys, saspy; print(" ".join(m for m in {} if m in sys.modules))'.format(HEAVY)
+        res  = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        self.assertEqual(res.stdout.strip(), '')
+
+    def test_lazy_exports(self):
+        """
+        Test that the lazily imported classes are still available from the package.
+        """
+        import saspy
+        from saspy.sasasync import AsyncSASsession
+        from saspy.saspool import SASsessionPool
+
+        self.assertIs(saspy.AsyncSASsession, AsyncSASsession)
+        self.assertIs(saspy.SASsessionPool, SASsessionPool)
+        with self.assertRaises(AttributeError):
+            saspy.NotAThing
+
+
+if __name__ == '__main__':
+    print('import saspy: {:.3f} seconds'.format(import_time()))
@@ -62,6 +62,18 @@ class TestSASIO(unittest.TestCase):
         """
         self.assertTrue(self.is_method(self.io, 'submit'))
 
+    def test_sasio_mexist_submit_stream(self):
+        """
+        Test that the SAS IO object has a `submit_stream` method.
+        """
+        self.assertTrue(self.is_method(self.io, 'submit_stream'))
+
+    def test_sasio_mexist_submit_batch(self):
+        """
+        Test that the SAS IO object has a `submit_batch` method.
+        """
+        self.assertTrue(self.is_method(self.io, 'submit_batch'))
+
     def test_sasio_mexist_submit(self):
         """
         Test that the SAS IO object has a `write_csv` method.
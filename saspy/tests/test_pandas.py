@@ -55,6 +55,121 @@ class TestPandasDataFrameIntegration(unittest.TestCase):
 
         self.assertIn(EXPECTED, retrieved, msg="df.head() result didn't contain row 1")
 
+    def test_pandas_sd2df_binary(self):
+        """
+        Test method sasdata2dataframe with method='BINARY' returns the same
+        data as the default method.
+        """
+        df  = self.sas.sd2df('cars', 'sashelp')
+        dfb = self.sas.sd2df('cars', 'sashelp', method='BINARY')
+
+        self.assertIsInstance(dfb, pd.DataFrame)
+        self.assertEqual(list(dfb.columns), list(df.columns))
+        self.assertTrue(dfb['MSRP'].equals(df['MSRP']))
+        self.assertTrue(dfb['Cylinders'].isna().equals(df['Cylinders'].isna()))
+
+        dfd = self.test_data.to_df(method='BINARY')
+        self.assertEqual(str(dfd['d1'][0].date()), '1966-01-03')
+
+    def test_pandas_sd2df_iter(self):
+        """
+        Test method sd2df_iter yields the data set in chunks of chunksize rows
+        that add up to what sd2df returns.
+        """
+        df     = self.sas.sd2df('cars', 'sashelp')
+        chunks = list(self.sas.sd2df_iter('cars', 'sashelp', chunksize=100))
+
+        self.assertEqual([len(c) for c in chunks], [100, 100, 100, 100, 28])
+        self.assertTrue(pd.concat(chunks, ignore_index=True).equals(df))
+
+        first = next(self.test_data.iter_df(chunksize=2))
+        self.assertEqual(len(first), 2)
+        self.assertEqual(str(first['d1'][0].date()), '1966-01-03')
+
+        # the session is still usable after a generator that wasn't read to the end
+        ll = self.sas.submit('%put still here;')
+        self.assertIn('still here', ll['LOG'])
+
+    def test_pandas_sd2df_parallel(self):
+        """
+        Test method sasdata2dataframe with parallel= returns the same data,
+        in the same order, as fetching it in one session.
+        """
+        df  = self.sas.sd2df('cars', 'sashelp', dsopts={'where': 'cylinders > 4'})
+        dfp = self.sas.sd2df('cars', 'sashelp', dsopts={'where': 'cylinders > 4'}, parallel=3)
+
+        self.assertTrue(dfp.equals(df))
+
+        dfw = self.test_data.to_df(parallel=2)
+        self.assertTrue(dfw.equals(self.test_data.to_df()))
+
+        # the pool is kept for the next call, and one passed in is used, and left running
+        pool = self.sas._sdpool
+        self.sas.sd2df('cars', 'sashelp', parallel=3)
+        self.assertIs(self.sas._sdpool, pool)
+
+        from saspy.saspool import SASsessionPool
+        mine = SASsessionPool(size=2, **self.sas._kwargs)
+        try:
+            self.assertTrue(self.sas.sd2df('cars', 'sashelp', parallel=mine).equals(self.sas.sd2df('cars', 'sashelp')))
+            self.assertEqual(list(mine.map(lambda sas, x: x, [1, 2])), [1, 2])
+        finally:
+            mine.shutdown()
+
+    def test_pandas_sd2df_metacache(self):
+        """
+        Test method sasdata2dataframe reuses the variables it got for a table
+        until the table is replaced.
+        """
+        self.sas.submit("data work.tmeta; x = 1; run;")
+        df = self.sas.sd2df('tmeta', 'work')
+        self.assertIn(('WORK', 'TMETA', ''), self.sas._tabmeta)
+        self.assertTrue(self.sas.sd2df('tmeta', 'work').equals(df))
+
+        # the replaced table has a new modification datetime, and other variables
+        self.sas.submit("data _null_; rc = sleep(1, 1); run; data work.tmeta; y = 'a'; run;")
+        df = self.sas.sd2df('tmeta', 'work')
+        self.assertEqual(list(df.columns), ['y'])
+        self.assertEqual(self.sas._tabmeta[('WORK', 'TMETA', '')]['names'], ['y'])
+
+    def test_pandas_sd2df_dtype_policy(self):
+        """
+        Test method sasdata2dataframe with dtype_policy= returns the same
+        values in smaller dtypes.
+        """
+        df  = self.sas.sd2df('cars', 'sashelp')
+        dfl = self.sas.sd2df('cars', 'sashelp', dtype_policy=True)
+
+        self.assertEqual(str(dfl['Origin'].dtype), 'category')
+        self.assertEqual(str(dfl['MSRP'].dtype), 'Int32')
+        self.assertTrue((dfl['MSRP'].astype(float) == df['MSRP']).all())
+        self.assertTrue((dfl['Origin'].astype(str) == df['Origin']).all())
+
+        dff = self.test_data.to_df(dtype_policy={'float32': True})
+        self.assertEqual(dff['d1'].dtype.kind, 'M')
+
+    def test_pandas_wide(self):
+        """
+        Test a table with thousands of columns round trips through
+        sasdata2dataframe, with each method, and dataframe2sasdata.
+        """
+        self.sas.submit("""
+            data work.wide;
+                array x{3000}; id = 'a'; d = '01Jan2020'd; format d date9.;
+                do i = 1 to 3000; x{i} = i; end;
+                drop i;
+            run;
+        """)
+        df = self.sas.sd2df('wide', 'work')
+        self.assertEqual(df.shape, (1, 3002))
+        self.assertEqual(df['x3000'][0], 3000)
+        self.assertEqual(str(df['d'][0].date()), '2020-01-01')
+        self.assertTrue(self.sas.sd2df('wide', 'work', method='CSV').equals(df))
+        self.assertTrue(self.sas.sd2df('wide', 'work', method='BINARY').equals(df))
+
+        self.sas.df2sd(df, 'wide2', results='text')
+        self.assertTrue(self.sas.sd2df('wide2', 'work').equals(df))
+
     def test_pandas_df2sd_instance(self):
         """
         Test method dataframe2sasdata properly writes.
@@ -80,6 +195,67 @@ class TestPandasDataFrameIntegration(unittest.TestCase):
 
         self.assertIn(EXPECTED, retrieved, msg="td2.head() result didn't contain row 1")
 
+    def test_pandas_df2sd_binary(self):
+        """
+        Test dataframe2sasdata with method='BINARY' writes the same values as
+        the text method, with the numerics bit for bit.
+        """
+        df = self.sas.sd2df('cars', 'sashelp')
+        df['Invoice'] = df['Invoice'] / 3
+
+        self.sas.df2sd(df, 'carsb', method='BINARY')
+        dfb = self.sas.sd2df('carsb', 'work', method='BINARY')
+        self.assertTrue(dfb['Invoice'].equals(df['Invoice']))
+        self.assertTrue(dfb.equals(self.sas.sd2df('cars', 'sashelp').assign(Invoice=df['Invoice'])))
+
+    def test_pandas_df2sd_chunks(self):
+        """
+        Test dataframe2sasdata imports an iterable of Data Frames into one
+        Data Set, appends with if_exists='append', and doesn't create the Data
+        Set when a later chunk has longer values than the first.
+        """
+        df     = self.sas.sd2df('cars', 'sashelp')
+        chunks = [df.iloc[i:i+100] for i in range(0, len(df), 100)]
+
+        for method in ('MEMORY', 'BINARY'):
+            sd = self.sas.df2sd(iter(chunks), 'carsc', method=method, lengths={'Model': 40})
+            self.assertEqual(sd.obs(), 428)
+            self.assertTrue(self.sas.sd2df('carsc', 'work').equals(df))
+
+        sd = self.sas.df2sd(iter(chunks[:2]), 'carsc', if_exists='append', lengths={'Model': 40})
+        self.assertEqual(sd.obs(), 628)
+
+        short = df.assign(Model=df['Model'].where(df.index < 100, 'x' * 60))
+        self.assertIsNone(self.sas.df2sd((short.iloc[i:i+100] for i in range(0, 428, 100)), 'carsbad'))
+        self.assertFalse(self.sas.exist('carsbad'))
+
+        # a load that fails leaves the Data Set it was to replace as it was
+        self.assertIsNone(self.sas.df2sd((short.iloc[i:i+100] for i in range(0, 428, 100)), 'carsc'))
+        self.assertEqual(self.sas.sasdata('carsc').obs(), 628)
+
+        # a single Data Frame replaces the Data Set directly
+        sd = self.sas.df2sd(df.iloc[:7], 'carsc')
+        self.assertEqual(sd.obs(), 7)
+
+    def test_pandas_df2sd_schema(self):
+        """
+        Test a SASschema from sasschema() is used by dataframe2sasdata for
+        Data Frames other than the one it was made from.
+        """
+        df     = self.sas.sd2df('cars', 'sashelp')
+        schema = self.sas.sasschema(df.iloc[:10], lengths={'Model': 40}, formats={'Invoice': 'DOLLAR12.2'})
+        self.assertEqual(schema.lengths[schema.names.index('Model')], 40)
+
+        for method in ('MEMORY', 'BINARY'):
+            sd = self.sas.df2sd(df, 'carss', method=method, schema=schema)
+            self.assertEqual(sd.obs(), 428)
+            self.assertTrue(self.sas.sd2df('carss', 'work').equals(df))
+
+        self.assertIsNone(self.sas.df2sd(df.assign(Model='x' * 60), 'carsbad', schema=schema, check_lengths=True))
+        self.assertIsNone(self.sas.df2sd(df.assign(Model='x' * 60), 'carsbad', schema=schema, method='BINARY'))
+        sd = self.sas.df2sd(df.assign(Model='x' * 60), 'carst', schema=schema)
+        self.assertEqual(self.sas.sd2df('carst', 'work')['Model'][0], 'x' * 40)
+
     def test_pandas_sd2df_csv_instance(self):
         """
         Test method sasdata2dataframe using `method=csv` returns a
@@ -0,0 +1,87 @@
+import importlib.util
+import unittest
+
+from saspy.sasbase import sas_date_fmts, sas_time_fmts, sas_datetime_fmts
+from saspy.sasiocommons import binmeta
+
+
+@unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+class TestArrow(unittest.TestCase):
+    LOG = ("SD2DFB= N|8||x\nSD2DFB= C|8|$8.|make\nSD2DFB= C|8|$8.|name\nSD2DFB= N|8|DATE9.|d\n"
+           "SD2DFB= N|8|DATETIME20.|dt\nSD2DFB= N|8|TIME8.|t\n")
+
+    class SB:
+        sas_date_fmts     = sas_date_fmts
+        sas_time_fmts     = sas_time_fmts
+        sas_datetime_fmts = sas_datetime_fmts
+
+    def chunk(self):
+        import numpy  as np
+        import pandas as pd
+
+        today = pd.Timestamp.now().normalize()
+        return pd.DataFrame({'x': [1.5, np.nan] * 10,
+                             'make': ['Ford', np.nan] * 10,
+                             'name': ['n%d' % i for i in range(20)],
+                             'd': pd.to_datetime(['1966-01-03', None] * 10),
+                             'dt': pd.to_datetime(['1966-01-03 13:30:59.000123', None] * 10),
+                             't': [today + pd.Timedelta(seconds=3600.5), pd.NaT] * 10})
+
+    def test_schema(self):
+        import pyarrow as pa
+        from saspy.sasarrow import arrowschema
+
+        schema = arrowschema(binmeta(self.LOG), self.SB, self.chunk())
+        self.assertEqual(schema.types, [pa.float64(), pa.dictionary(pa.int32(), pa.string()), pa.string(),
+                                        pa.date32(), pa.timestamp('us'), pa.time64('us')])
+
+    def test_batch(self):
+        import datetime
+        from saspy.sasarrow import arrowschema, arrowbatch
+
+        df     = self.chunk()
+        schema = arrowschema(binmeta(self.LOG), self.SB, df)
+        batch  = arrowbatch(df, schema)
+        first  = batch.slice(0, 1).to_pylist()[0]
+
+        self.assertEqual(batch.num_rows, 20)
+        self.assertEqual(first['x'], 1.5)
+        self.assertEqual(first['make'], 'Ford')
+        self.assertEqual(first['d'], datetime.date(1966, 1, 3))
+        self.assertEqual(first['dt'], datetime.datetime(1966, 1, 3, 13, 30, 59, 123))
+        self.assertEqual(first['t'], datetime.time(1, 0, 0, 500000))
+        missing = batch.slice(1, 1).to_pylist()[0]
+        self.assertEqual([k for k, v in missing.items() if v is not None], ['name'])
+
+    def test_spill(self):
+        import os
+        import tempfile
+        import pyarrow as pa
+        from saspy.sasarrow import arrowspill
+
+        test = self
+
+        class Session(self.SB):
+            def _tablemeta(self, table, libref, dsopts):
+                return binmeta(test.LOG)
+
+            def sd2df_iter(self, table, libref, dsopts, chunksize):
+                for i in range(3):
+                    df = test.chunk()
+                    df['make'] = ['Ford', 'Kia'][i % 2]
+                    yield df
+
+        with tempfile.TemporaryDirectory() as temppath:
+            path      = os.path.join(temppath, 'spill.arrow')
+            allocated = pa.total_allocated_bytes()
+            tab       = arrowspill(Session(), 't', 'work', {}, path)
+
+            self.assertEqual(tab.num_rows, 60)
+            self.assertEqual(tab.column('make').to_pylist()[::20], ['Ford', 'Kia', 'Ford'])
+            # the columns are mapped from the file, not read into memory allocated by Arrow
+            self.assertEqual(pa.total_allocated_bytes(), allocated)
+            del tab
+
+
+if __name__ == "__main__":
+    unittest.main()
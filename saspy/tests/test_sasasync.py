@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+import unittest
+import saspy
+
+
+class TestAsyncSASsessionObject(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.sas = saspy.SASsession()
+        cls.asas = saspy.AsyncSASsession(cls.sas)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sas._endsas()
+
+    def test_async_submit(self):
+        """
+        Test coroutine submit returns the LOG and LST like submit does
+        """
+        ll = asyncio.run(self.asas.submit("data _null_; file print; put 'async'; run;", results='text'))
+        self.assertIn('async', ll['LST'])
+
+    def test_async_submit_concurrent(self):
+        """
+        Test submits awaited together on one session run one at a time and each get their own LOG
+        """
+        async def both():
+            return await asyncio.gather(self.asas.submit("%put first;", results='text'),
+                                        self.asas.submit("%put second;", results='text'))
+
+        ll = asyncio.run(both())
+        self.assertIn('first', ll[0]['LOG'])
+        self.assertNotIn('second', ll[0]['LOG'])
+        self.assertIn('second', ll[1]['LOG'])
+
+    def test_async_sd2df(self):
+        """
+        Test coroutine sd2df returns a data frame
+        """
+        df = asyncio.run(self.asas.sd2df('class', 'sashelp'))
+        self.assertEqual(df.shape, (19, 5))
+
+
+class TestAsyncLock(unittest.TestCase):
+    def test_cancelled_call_keeps_lock(self):
+        """
+        Test a call whose wait is cancelled still runs to the end before the next call on the session starts
+        """
+        from saspy.sasasync import AsyncSASsession
+
+        asas   = AsyncSASsession(None)
+        events = []
+        lock   = threading.Lock()
+
+        def call(name, secs):
+            with lock:
+                events.append(name+' start')
+            time.sleep(secs)
+            with lock:
+                events.append(name+' end')
+            return name
+
+        async def run():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(asas._run(call, 'first', 0.3), 0.05)
+            return await asas._run(call, 'second', 0)
+
+        self.assertEqual(asyncio.run(run()), 'second')
+        self.assertEqual(events, ['first start', 'first end', 'second start', 'second end'])
+        self.assertFalse(asas._lock.locked())
+
+    def test_df2sd_forwards_kwargs(self):
+        """
+        Test df2sd passes the newer SASsession.df2sd parameters through
+        """
+        from saspy.sasasync import AsyncSASsession
+
+        class Sess():
+            def df2sd(self, df, table, libref, results, keep_outer_quotes, **kwargs):
+                return table, kwargs
+
+        asas = AsyncSASsession(Sess())
+        tbl, kw = asyncio.run(asas.df2sd(None, 'cars', method='BINARY', if_exists='append'))
+        self.assertEqual(tbl, 'cars')
+        self.assertEqual(kw, dict(method='BINARY', if_exists='append'))
@@ -2,6 +2,7 @@ from saspy.sasdata import SASdata
 from saspy.sasresults import SASresults
 from pandas.util.testing import assert_frame_equal
 from tempfile import TemporaryDirectory
+import importlib.util
 import unittest
 import saspy
 import pandas as pd
@@ -610,3 +611,39 @@ class TestSASdataObject(unittest.TestCase):
         res = tr.info()
 
         self.assertIsNone(res, msg="only works with Pandas")
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_to_arrow_parquet(self):
+        """
+        Test to_arrow() and to_parquet() give the same rows as to_df(), in row
+        groups of row_group_size.
+        """
+        import pyarrow.parquet as pq
+
+        df  = self.cars.to_df()
+        tab = self.cars.to_arrow(chunksize=100)
+        self.assertEqual(tab.num_rows, 428)
+        self.assertEqual(tab.column_names, list(df.columns))
+
+        with TemporaryDirectory() as temppath:
+            path = os.path.join(temppath, 'cars.parquet')
+            rows = self.cars.to_parquet(path, row_group_size=100)
+            self.assertEqual(rows, 428)
+            self.assertEqual(pq.ParquetFile(path).metadata.num_row_groups, 5)
+            self.assertTrue(pq.read_table(path).equals(tab))
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_sd2df_spill(self):
+        """
+        Test sd2df(spill=) writes an Arrow IPC file and returns the same rows as
+        to_arrow(), mapped from the file.
+        """
+        with TemporaryDirectory() as temppath:
+            path = os.path.join(temppath, 'cars.arrow')
+            tab  = self.sas.sd2df('cars', 'sashelp', spill=path, trows=100)
+
+            self.assertEqual(tab.num_rows, 428)
+            self.assertEqual(len(tab.to_batches()), 5)
+            self.assertEqual(tab.column_names, self.cars.to_arrow().column_names)
+            self.assertEqual(tab.slice(0, 1).to_pandas()['Make'][0], 'Acura')
+            del tab
@@ -0,0 +1,509 @@
+import struct
+import unittest
+from collections import deque
+
+from saspy.sasbase import sas_date_fmts, sas_time_fmts, sas_datetime_fmts
+from saspy.sasiocommons import SASbuffer, SASsessionLog, splitlog, splitlst, binmeta, binputcode, bin2df
+from saspy.sasiocommons import binmetacode, metacheckcode
+from saspy.sasiocommons import concatchunks, SASrowreader, readrows, leandtypes, df2sdvars, df2sdcards
+from saspy.sasiocommons import df2sdbin, df2sdhex, df2sdchunks, df2sdkinds, charlens, df2sdcheck
+from saspy.sasiocommons import bytelens, SASschema
+
+
+class TestSASbuffer(unittest.TestCase):
+    MARKER = b"\nE3969440A681A24088859985" + b"00000042"
+
+    def test_marker_split_across_reads(self):
+        data = b"NOTE: something\n" * 100 + self.MARKER + b"\ntrailing"
+        buf = SASbuffer(self.MARKER)
+        for i in range(0, len(data), 5):
+            buf += data[i:i + 5]
+        self.assertTrue(buf.found)
+        self.assertEqual(buf.partition(), data.partition(self.MARKER))
+
+    def test_no_marker(self):
+        buf = SASbuffer(self.MARKER)
+        buf += b"E3969440A681A24088859985"
+        buf += b"00000041\n"
+        self.assertFalse(buf.found)
+        self.assertEqual(len(buf), 33)
+
+    def test_decode_once(self):
+        buf = SASbuffer()
+        text = 'café ☃'.encode('utf-8')
+        for b in text:
+            buf += bytes([b])
+        self.assertEqual(buf.decode('utf-8'), 'café ☃')
+        self.assertEqual(bytes(buf), text)
+
+
+class TestSASsessionLog(unittest.TestCase):
+    STEPS = ['NOTE: step %d\n' % i for i in range(100)]
+
+    def test_unbounded(self):
+        log = SASsessionLog()
+        for step in self.STEPS:
+            log += step
+        self.assertEqual(str(log), ''.join(self.STEPS))
+        self.assertEqual(log.get(last_n_steps=3), ''.join(self.STEPS[-3:]))
+
+    def test_capped(self):
+        log = SASsessionLog(maxsize=100)
+        for step in self.STEPS:
+            log += step
+        self.assertLessEqual(len(str(log).encode()), 100)
+        self.assertTrue(''.join(self.STEPS).endswith(str(log)))
+        self.assertEqual(log.get(last_n_steps=2), ''.join(self.STEPS[-2:]))
+
+    def test_spill(self):
+        log = SASsessionLog(maxsize=100, spill=True)
+        for step in self.STEPS:
+            log += step
+        full = ''.join(self.STEPS)
+        self.assertEqual(str(log), full)
+        self.assertEqual(log.get(start=5, end=500), full[5:500])
+        self.assertEqual(log.get(last_n_steps=60), ''.join(self.STEPS[-60:]))
+
+    def test_steps_bounded(self):
+        log = SASsessionLog(maxsize=100)
+        for step in self.STEPS:
+            log += step
+        # only the steps still in memory are kept track of; asking for more returns what's there
+        self.assertEqual(log.steps(), 100)
+        self.assertLessEqual(len(log._steps), 9)
+        self.assertEqual(log.get(last_n_steps=50), str(log))
+
+        log = SASsessionLog(maxsize=100, spill=True)
+        log._steps = deque(maxlen=10)
+        for step in self.STEPS:
+            log += step
+        self.assertEqual(log.steps(), 100)
+        self.assertEqual(log.get(last_n_steps=50), ''.join(self.STEPS[-10:]))
+
+
+class TestSplitBatch(unittest.TestCase):
+    def test_splitlog(self):
+        log = ("1    ;*';*\";*/;\n2    %put one;\none\n3    ;*';*\";*/;\n4    %put E3969440A681A2408885998500000002;\n"
+               "E3969440A681A2408885998500000002\n5    ;*';*\";*/;\n6    %put two;\ntwo\n7    ;*';*\";*/;\n"
+               "8    %put E3969440A681A2408885998500000003;\nE3969440A681A2408885998500000003\n")
+        logs = splitlog(log, ['00000002', '00000003'], ";*';*\";*/;")
+        self.assertEqual(len(logs), 2)
+        self.assertIn('one', logs[0])
+        self.assertNotIn('two', logs[0])
+        self.assertIn('two', logs[1])
+        self.assertNotIn('E3969440A681A24088859985', logs[1])
+
+    def test_splitlst(self):
+        lst = ("\x0c   The SAS System\n\nfirst\n\x0c   The SAS System\n\nLSTE3969440A681A2408885998500000002\n"
+               "\x0c   The SAS System\n\nLSTE3969440A681A2408885998500000003\n")
+        lsts = splitlst(lst, ['00000002', '00000003'])
+        self.assertIn('first', lsts[0])
+        self.assertEqual(lsts[1], '')
+
+
+class TestConcatChunks(unittest.TestCase):
+    def test_concatchunks(self):
+        import pandas as pd
+
+        chunks = [pd.DataFrame({'x': [1, 2], 'f': [.5, 1.5], 's': ['a', 'b'],
+                                'd': pd.to_datetime(['2020-01-01', '2020-01-02'])}),
+                  pd.DataFrame({'x': [3.5, None], 'f': [2.5, 3.5], 's': ['c', None],
+                                'd': pd.to_datetime(['2021-01-01', None])})]
+        expect = pd.concat(chunks, ignore_index=True)
+        dfs    = list(chunks)
+        self.assertTrue(concatchunks(dfs).equals(expect))
+        self.assertEqual(dfs, [])
+
+        one = [chunks[0]]
+        self.assertIs(concatchunks(one), chunks[0])
+
+
+class TestBinary(unittest.TestCase):
+    LOG = ("SD2DFB_PROBE=3FF0000000000000\nSD2DFB_ENDIAN=LITTLE\n"
+           "SD2DFB= N|8||x\nSD2DFB= C|5|$5.|name\nSD2DFB= N|8|DATE9.|d\n")
+    # SAS . and .A are NaN bit patterns
+    MISSING = [struct.pack('<Q', 0xFFFFFE0000000000), struct.pack('<Q', 0xFFFFBE0000000000)]
+
+    class SB:
+        sas_date_fmts     = sas_date_fmts
+        sas_time_fmts     = sas_time_fmts
+        sas_datetime_fmts = sas_datetime_fmts
+
+    def test_binmeta(self):
+        meta = binmeta(self.LOG)
+        self.assertEqual(meta['names'], ['x', 'name', 'd'])
+        self.assertEqual(meta['lens'], [8, 5, 8])
+        self.assertEqual(meta['fmts'], ['', '$', 'DATE'])
+        self.assertTrue(meta['ieee'])
+        self.assertEqual(meta['order'], '<')
+        self.assertEqual(binputcode(meta), ("'x'n rb8. 'name'n $char5. 'd'n rb8. ", 21))
+        self.assertEqual(binputcode(meta, hexed=True)[1], 42)
+        self.assertEqual(meta['sig'], '')
+        self.assertEqual(binmeta(self.LOG + "SD2DFB_SIG=" + 'AB' * 16 + "\n")['sig'], 'AB' * 16)
+
+    def test_binmetacode(self):
+        # one data step, unless a format statement needs a view to be applied
+        code = binmetacode('work.t', 'LOG', 'work.t', "(where=(x = 'a') )")
+        self.assertEqual(code.count('run;'), 1)
+        self.assertIn("open('work.t(where=(x = ''a'') )')", code)
+        self.assertIn("SD2DFB_SIG=", code)
+        self.assertEqual(binmetacode('work.t', 'LOG', dsopts=";\n\tformat x date9.;").count('run;'), 2)
+
+    def test_metacheckcode(self):
+        meta = binmeta(self.LOG + "SD2DFB_SIG=" + 'AB' * 16 + "\n")
+        self.assertEqual(metacheckcode(meta, 'work.t'), '')
+        code = metacheckcode(dict(meta, cached=True), 'work.t')
+        self.assertIn("if _sd2dfs_ ne '" + 'AB' * 16 + "' then stop;", code)
+        self.assertIn("open('work.t')", code)
+
+    def test_bin2df(self):
+        import pandas as pd
+
+        meta = binmeta(self.LOG)
+        data = (struct.pack('<d', 1.5) + b'ab   ' + struct.pack('<d', 3) +
+                self.MISSING[0] + b'     ' + self.MISSING[1])
+        df   = bin2df(data, meta, self.SB, 'utf-8')
+        self.assertEqual(list(df.columns), ['x', 'name', 'd'])
+        self.assertEqual(df['x'][0], 1.5)
+        self.assertEqual(df['name'][0], 'ab')
+        self.assertEqual(df['d'][0], pd.Timestamp('1960-01-04'))
+        self.assertTrue(df.iloc[1].isna().all())
+
+        hexed = (struct.pack('>d', 1.5) + b'ab   ' + struct.pack('>d', 3)).hex().upper().encode() + b'\n'
+        self.assertTrue(bin2df(hexed, meta, self.SB, 'utf-8', hexed=True).equals(df.iloc[:1]))
+
+        with self.assertRaises(ValueError):
+            bin2df(data[:-1], meta, self.SB, 'utf-8')
+
+
+class TestLeanDtypes(unittest.TestCase):
+    LOG = ("SD2DFB= N|8|8.|n\nSD2DFB= N|3||short\nSD2DFB= N|8|COMMA12.|big\nSD2DFB= N|8|8.2|f\n"
+           "SD2DFB= N|8|DATE9.|d\nSD2DFB= C|2|$2.|code\nSD2DFB= C|8|$8.|name\nSD2DFB= N|8|8.|half\n")
+
+    class SB:
+        sas_date_fmts     = sas_date_fmts
+        sas_time_fmts     = sas_time_fmts
+        sas_datetime_fmts = sas_datetime_fmts
+
+    def frame(self):
+        import numpy  as np
+        import pandas as pd
+
+        return pd.DataFrame({'n': [1.0, np.nan, 100.0] * 10, 'short': [-5.0, 300.0, 2.0] * 10,
+                             'big': [1.0, 3e9, np.nan] * 10, 'f': [1.5, 2.0, 3.0] * 10,
+                             'd': pd.to_datetime(['2020-01-01'] * 30), 'code': ['AA', 'BB', np.nan] * 10,
+                             'name': ['n%d' % i for i in range(30)], 'half': [0.5, 1.0, 2.0] * 10})
+
+    def test_default(self):
+        df = leandtypes(self.frame(), binmeta(self.LOG), self.SB, True)
+        self.assertEqual([str(df[c].dtype) for c in ('n', 'short', 'big', 'f', 'code', 'half')],
+                         ['Int8', 'Int16', 'Int64', 'float64', 'category', 'float64'])
+        self.assertEqual(df['d'].dtype.kind, 'M')
+        self.assertNotEqual(str(df['name'].dtype), 'category')
+        self.assertTrue(df['n'].isna()[1])
+        self.assertEqual(df['big'][1], 3000000000)
+        self.assertEqual(list(df['code'].cat.categories), ['AA', 'BB'])
+
+    def test_policy(self):
+        df = leandtypes(self.frame(), binmeta(self.LOG), self.SB, {'category': 0, 'integer': False, 'float32': True})
+        self.assertEqual([str(df[c].dtype) for c in ('n', 'short', 'big', 'f', 'half')], ['float32'] * 5)
+        self.assertEqual(df['d'].dtype.kind, 'M')
+        self.assertNotEqual(str(df['code'].dtype), 'category')
+
+
+class TestReadRows(unittest.TestCase):
+    MARKER = b"\nE3969440A681A24088859985" + b"00000042"
+    ROWS   = [b"%32s\x02%s\x02%s\x02\x01\n" % (x, s, d) for x, s, d in
+              [(b'1.5', b'ab', b'1966-01-03'), (b'.', b' ', b'         .'), (b'A', b'c\xc3\xa9', b'2020-02-29')] * 3]
+
+    class SB:
+        sas_date_fmts     = sas_date_fmts
+        sas_time_fmts     = sas_time_fmts
+        sas_datetime_fmts = sas_datetime_fmts
+
+    def fill(self, data, size):
+        pieces = [data[i:i + size] for i in range(0, len(data), size)]
+        return lambda: pieces.pop(0) if pieces else b''
+
+    def test_rowreader(self):
+        data = b''.join(self.ROWS) + self.MARKER + b'\ntrailing'
+        for size in (1, 5, 64, len(data)):
+            rdr = SASrowreader(self.fill(data, size), b'\x01', self.MARKER)
+            out = b''.join(iter(lambda: rdr.read(7), b''))
+            self.assertEqual(out, b''.join(self.ROWS).replace(b'\x01\n', b'\x01'))
+
+    def test_readrows(self):
+        import pandas as pd
+
+        data = b''.join(self.ROWS)
+        rdr  = SASrowreader(self.fill(data, 50), b'\x01')
+        dfs  = list(readrows(rdr, ['x', 's', 'd'], ['N', 'C', 'N'], ['BEST', '$', 'DATE'], self.SB, 'utf-8',
+                             chunksize=4))
+        self.assertEqual([len(df) for df in dfs], [4, 4, 1])
+        self.assertEqual(list(dfs[1].index), [0, 1, 2, 3])
+
+        df = dfs[0]
+        self.assertEqual(list(df.columns), ['x', 's', 'd'])
+        self.assertEqual(df['x'].dtype, 'float64')
+        self.assertEqual(df['x'][0], 1.5)
+        self.assertEqual(df['s'][2], 'cé')
+        self.assertEqual(df['d'][0], pd.Timestamp('1966-01-03'))
+        self.assertTrue(df.iloc[1].isna().all())
+        self.assertTrue(pd.isna(df['x'][2]))
+
+        empty = list(readrows(SASrowreader(lambda: b'', b'\x01'), ['x', 's'], ['N', 'C'], ['BEST', '$'], self.SB,
+                              'utf-8'))
+        self.assertEqual(len(empty), 1)
+        self.assertEqual(list(empty[0].columns), ['x', 's'])
+        self.assertEqual(len(empty[0]), 0)
+
+
+class TestCards(unittest.TestCase):
+    @staticmethod
+    def rowcards(df, dts):
+        """
+        The cards as dataframe2sasdata() used to build them, a cell at a time.
+        """
+        cards = ''
+        for row in df.itertuples(index=False):
+            card = []
+            for col in range(len(dts)):
+                var = str(row[col])
+                if   dts[col] == 'N' and var == 'nan':
+                    var = '.'
+                elif dts[col] == 'C' and var == 'nan':
+                    var = ' '
+                elif dts[col] == 'B':
+                    var = str(int(row[col]))
+                elif dts[col] == 'D':
+                    var = '.' if var == 'NaT' else str(row[col].to_datetime64())[:26]
+                card.append(var)
+            cards += chr(3).join(card)+'\n'
+        return cards
+
+    @staticmethod
+    def frame(nrows):
+        import numpy  as np
+        import pandas as pd
+
+        return pd.DataFrame({'x': np.tile([1.5, np.nan, -2e-7, 1e17], nrows // 4),
+                             'i': np.arange(nrows),
+                             's': np.tile(['abc', np.nan, 'c\xe9', ' '], nrows // 4),
+                             'o': pd.Series(['a', None, 1, 'b'] * (nrows // 4), dtype=object),
+                             'd': np.tile(np.array(['1900-05-03T01:02:03.999999999', 'NaT', '2020-02-29',
+                                                    '1960-01-01'], dtype='datetime64[ns]'), nrows // 4),
+                             'b': np.tile([True, False], nrows // 2)})
+
+    def test_cards(self):
+        df  = self.frame(40)
+        dts = df2sdkinds(df)
+        for size in (1, 100, 1048576):
+            blocks = list(df2sdcards(df, dts, size))
+            self.assertEqual(''.join(blocks), self.rowcards(df, dts))
+            self.assertTrue(all(block.endswith('\n') for block in blocks))
+        self.assertEqual(len(list(df2sdcards(df, dts, 1))), 40)
+        self.assertEqual(list(df2sdcards(df.iloc[:0], dts)), [])
+
+    def test_cards_unquoted(self):
+        import numpy  as np
+        import pandas as pd
+
+        # values to_csv() would have to quote or escape, and float32s, are written as a cell at a time
+        df  = pd.DataFrame({'s': ['a"b', 'c\nd', 'e\x03f', 'g'], 'f': np.array([0.1, np.nan, 1.5, 3], dtype='float32')})
+        dts = df2sdkinds(df)
+        for size in (1, 1048576):
+            self.assertEqual(''.join(df2sdcards(df, dts, size)), self.rowcards(df, dts))
+
+
+class TestDf2sdBin(unittest.TestCase):
+    class SB:
+        sas_date_fmts     = sas_date_fmts
+        sas_time_fmts     = sas_time_fmts
+        sas_datetime_fmts = sas_datetime_fmts
+
+    def frame(self):
+        import numpy  as np
+        import pandas as pd
+
+        return pd.DataFrame({'x': [1 / 3, np.nan, -2e-300], 'i': [1, 2, 3], 's': ['ab', None, ' c\xe9'],
+                             'dt': pd.to_datetime(['2020-01-01 01:02:03.000004', None, '1959-12-31 00:00:00.000000']),
+                             'b': [True, False, True]})
+
+    def test_pack(self):
+        schema, recs   = df2sdbin(self.frame(), 'utf-8')
+        length, format = df2sdvars(schema)[:2]
+        meta           = schema.meta()
+
+        self.assertEqual(length, "'x'n 'i'n 8 's'n $4 'dt'n 'b'n 8")
+        self.assertEqual(format, "'dt'n E8601DT26.6")
+        self.assertEqual(binputcode(meta), ("('x'n--'i'n) (rb8.) 's'n $char4. ('dt'n--'b'n) (rb8.) ", 36))
+        self.assertEqual(recs.tobytes()[36+16:36+20], b'    ')
+
+        # read back the way sasdata2dataframe(method='BINARY') reads what SAS writes
+        log = "SD2DFB= N|8||x\nSD2DFB= N|8||i\nSD2DFB= C|4|$4.|s\nSD2DFB= N|8|DATETIME26.6|dt\nSD2DFB= N|8||b\n"
+        df  = self.frame()
+        out = bin2df(recs.tobytes(), binmeta(log), self.SB, 'utf-8')
+        self.assertTrue(out['x'].equals(df['x']))
+        self.assertEqual(out['s'].tolist()[::2], ['ab', ' c\xe9'])
+        self.assertEqual(out['dt'].dt.round('us').tolist(), df['dt'].tolist())
+        self.assertEqual(out['b'].tolist(), [1, 0, 1])
+
+    def test_pack_no_rows(self):
+        df = self.frame().iloc[:0]
+        schema, recs = df2sdbin(df, 'utf-8')
+        self.assertEqual((len(recs), schema.lengths), (0, [8, 8, 8, 8, 8]))
+        schema, recs = df2sdbin(df, 'utf-8', schema=SASschema.from_df(self.frame(), 'utf-8'))
+        self.assertEqual((len(recs), schema.lengths), (0, [8, 8, 4, 8, 8]))
+        self.assertEqual(list(df2sdhex(recs)), [])
+
+    def test_hex(self):
+        recs  = df2sdbin(self.frame(), 'utf-8', '>')[1]
+        lines = ''.join(df2sdhex(recs, 100)).split('\n')
+
+        self.assertEqual(lines[:-1], [recs[i:i+1].tobytes().hex().upper() for i in range(3)])
+        self.assertEqual(lines[0][:16], '3FD5555555555555')
+
+
+class TestDf2sdChunks(unittest.TestCase):
+    def chunk(self, s):
+        import pandas as pd
+
+        return pd.DataFrame({'x': [1.5, 2.5], 's': pd.Series([s, None], dtype=object),
+                             'd': pd.to_datetime(['2020-01-01', None])})
+
+    def test_chunks(self):
+        df = self.chunk('ab')
+        self.assertEqual([c is df for c in df2sdchunks(df)], [True])
+        self.assertEqual(len(list(df2sdchunks(self.chunk(s) for s in 'abc'))), 3)
+
+    def test_charlens(self):
+        self.assertEqual(df2sdkinds(self.chunk('ab')), ['N', 'C', 'D'])
+        self.assertEqual(charlens(self.chunk('c\xe9'), 'utf-8'), [None, 4, None])
+        self.assertEqual(charlens(self.chunk('abc\xe9'), 'utf-8'), [None, 5, None])
+        self.assertEqual(charlens(self.chunk('').iloc[:1], 'utf-8'), [None, 8, None])
+        self.assertEqual(charlens(self.chunk('ab'), 'utf-8', {'s': 20}), [None, 20, None])
+        with self.assertRaisesRegex(ValueError, "'s' has a value 5 bytes long"):
+            charlens(self.chunk('abcde'), 'utf-8', {'s': 2})
+
+    def test_check(self):
+        schema = SASschema.from_df(self.chunk('abcd'), 'utf-8')
+
+        df2sdcheck(self.chunk('ab'), schema, 'utf-8', 2)
+        with self.assertRaisesRegex(ValueError, "^Data Frame 2 doesn't fit .* 's' has a value 5 bytes"):
+            df2sdcheck(self.chunk('abcde'), schema, 'utf-8', 2)
+        df2sdcheck(self.chunk('abcde'), schema, 'utf-8', 2, lengths=False)
+        with self.assertRaisesRegex(ValueError, "^Data Frame 3 doesn't fit .* has the columns"):
+            df2sdcheck(self.chunk('ab').assign(y=1), schema, 'utf-8', 3)
+        with self.assertRaisesRegex(ValueError, "'x' is of kind C, not N"):
+            df2sdcheck(self.chunk('ab').assign(x='1'), schema, 'utf-8', 4)
+
+    def test_bin_lengths(self):
+        self.assertEqual(df2sdbin(self.chunk('ab'), 'utf-8', lengths={'s': 6})[0].lengths, [8, 6, 8])
+        with self.assertRaisesRegex(ValueError, "'s' has a value 3 bytes long, longer than its length of 2"):
+            df2sdbin(self.chunk('abc'), 'utf-8', lengths={'s': 2})
+
+
+
+class TestSchema(unittest.TestCase):
+    VALUES = ['', 'abc', 'caf\xe9', '\u20ac5', '\U0001f600 x', ' ', 'plain ascii']
+
+    def test_bytelens(self):
+        for encoding in ('utf-8', 'utf_8', 'latin1', 'cp1252', 'ascii', 'shift_jis', 'utf-16'):
+            values = [v for v in self.VALUES if self.encodes(v, encoding)]
+            self.assertEqual(bytelens(values, encoding).tolist(), [len(v.encode(encoding)) for v in values],
+                             msg=encoding)
+        self.assertEqual(bytelens([], 'utf-8').tolist(), [])
+
+        # mostly ASCII, with a few others among them
+        values = ['abc'] * 1000 + ['caf\xe9'] + ['x'] * 1000 + ['\u20ac5']
+        self.assertEqual(bytelens(values, 'utf-8').tolist(), [3] * 1000 + [5] + [1] * 1000 + [4])
+        with self.assertRaises(UnicodeEncodeError):
+            bytelens(['caf\xe9'], 'ascii')
+
+    def encodes(self, value, encoding):
+        try:
+            value.encode(encoding)
+            return True
+        except UnicodeEncodeError:
+            return False
+
+    def test_schema(self):
+        import pandas as pd
+
+        df     = pd.DataFrame({'x': [1.5, 2.5], 's': ['caf\xe9', 'ab'], 'd': pd.to_datetime(['2020-01-01'] * 2)})
+        schema = SASschema.from_df(df, 'utf-8', {'s': 10}, {'x': 'BEST12.'})
+
+        self.assertEqual(schema.names, ['x', 's', 'd'])
+        self.assertEqual(schema.kinds, ['N', 'C', 'D'])
+        self.assertEqual(schema.lengths, [8, 10, 8])
+        self.assertEqual(schema.formats, ['BEST12.', '', 'E8601DT26.6'])
+        self.assertEqual(schema.meta(), dict(names=['x', 's', 'd'], types=['N', 'C', 'N'], lens=[8, 10, 8]))
+        self.assertEqual(df2sdvars(schema)[:2], ("'x'n 8 's'n $10 'd'n 8", "'x'n BEST12. 'd'n E8601DT26.6"))
+        with self.assertRaisesRegex(ValueError, "no column 'y'"):
+            SASschema.from_df(df, 'utf-8', formats={'y': 'BEST12.'})
+
+        # a Data Frame packed to a schema is padded to its lengths, not to its own longest values
+        self.assertEqual(df2sdbin(df.assign(s=['a', 'b']), 'utf-8', schema=schema)[1].dtype['v1'].itemsize, 10)
+
+    def test_charlens_values(self):
+        """
+        Test the lengths are those of encoding each value, as they used to be got.
+        """
+        df = charlens_frame(40)
+        self.assertEqual(charlens(df, 'utf-8'),
+                         [int(df[col].astype(str).map(lambda x: len(x.encode('utf-8'))).max()) for col in df.columns])
+
+
+def charlens_frame(nrows: int) -> 'pd.DataFrame':
+    import numpy  as np
+    import pandas as pd
+
+    return pd.DataFrame({'u': np.tile(['caf\xe9 cr\xe8me', 'na\xefve \u20ac', 'x' * 30, ''], nrows // 4),
+                         'a': np.tile(['abc', 'defghij', 'k' * 40, ' '], nrows // 4)})
+
+
+def charlens_time(nrows: int) -> tuple:
+    """
+    Return the seconds it takes to get the lengths of nrows rows of UTF-8 and ASCII text with bytelens(), and by
+    encoding each value as they used to be.
+    """
+    import time
+
+    df    = charlens_frame(nrows)
+    start = time.perf_counter()
+    charlens(df, 'utf-8')
+    new   = time.perf_counter() - start
+    start = time.perf_counter()
+    [df[col].astype(str).apply(lambda x: len(x.encode('utf-8'))).max() for col in df.columns]
+    return new, time.perf_counter() - start
+
+
+def cards_time(nrows: int) -> tuple:
+    """
+    Return the seconds it takes to build the cards for nrows rows a column at a time, with DataFrame.to_csv() (writing
+    the same records), and a cell at a time as they used to be.
+    """
+    import csv
+    import time
+
+    df    = TestCards.frame(nrows)
+    dts   = df2sdkinds(df)
+    start = time.perf_counter()
+    ''.join(df2sdcards(df, dts))
+    new   = time.perf_counter() - start
+    # everything but the floats and ints made ready for to_csv() first, and not timed
+    pre   = df.assign(s=df['s'].fillna(' '), o=df['o'].astype(str), b=df['b'].astype(int),
+                      d=list(df2sdcards(df[['d']], ['D'], len(df) * 30))[0].split('\n')[:-1])
+    start = time.perf_counter()
+    pre.to_csv(None, sep='\x03', header=False, index=False, na_rep='.', quoting=csv.QUOTE_NONE, lineterminator='\n')
+    tocsv = time.perf_counter() - start
+    start = time.perf_counter()
+    TestCards.rowcards(df, dts)
+    return new, tocsv, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print('{} rows of cards: {:.2f} seconds, {:.2f} seconds with to_csv(), {:.2f} seconds a cell at a time'.format(
+          200000, *cards_time(200000)))
+    print('{} rows of lengths: {:.2f} seconds, {:.2f} seconds a value at a time'.format(200000, *charlens_time(200000)))
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import saspy
+
+
+class TestSASsessionPoolObject(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = saspy.SASsessionPool(size=2, init="%let saspool_init=yes;")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def test_pool_submit(self):
+        """
+        Test submit runs SAS code on a worker that ran the init code
+        """
+        ll = self.pool.submit("%put init=&saspool_init;", results='text').result()
+        self.assertIn('init=yes', ll['LOG'])
+
+    def test_pool_map(self):
+        """
+        Test map calls the function with a worker for each argument and returns the results in order
+        """
+        res = list(self.pool.map(lambda sas, t: sas.exist(t, 'sashelp'), ['cars', 'class', 'nosuchtable']))
+        self.assertEqual(res, [True, True, False])
+
+    def test_pool_health_check(self):
+        """
+        Test health_check replaces a worker whose SAS process went away
+        """
+        self.pool.sessions[0]._endsas()
+        self.assertEqual(self.pool.health_check(), 1)
+        ll = self.pool.submit("%put alive;", results='text').result()
+        self.assertIn('alive', ll['LOG'])
@@ -20,6 +20,16 @@ class TestSASsessionObject(unittest.TestCase):
     def test_sassession(self):
         self.assertIsInstance(self.sas, saspy.SASsession)
 
+    def test_sassession_startup_times(self):
+        """
+        Test the session recorded how long starting up took and got what it needs from the one bootstrap submit
+        """
+        self.assertIn('connect', self.sas.startup_times)
+        self.assertIn('bootstrap', self.sas.startup_times)
+        self.assertGreaterEqual(self.sas.startup_times['total'], self.sas.startup_times['bootstrap'])
+        self.assertTrue(self.sas._loaded_macros)
+        self.assertNotEqual(self.sas.workpath, '')
+
     def test_sassession_exist_true(self):
         """
         Test method exist returns True for a dataset that exists
@@ -156,3 +166,50 @@ class TestSASsessionObject(unittest.TestCase):
         util = self.sas.sasutil()
 
         self.assertIsInstance(util, saspy.sasutil.SASutil, msg="util = self.sas.sasutil() failed")
+
+    def test_sassession_submit_stream(self):
+        """
+        Test method submit_stream yields the LOG line by line, a STEP per step and ends with DONE
+        """
+        evs = list(self.sas.submit_stream("data _null_; put 'streamed'; run;", results='text'))
+
+        self.assertEqual(evs[-1].type, 'DONE')
+        self.assertIn('streamed', [ev.data for ev in evs if ev.type == 'LOG'])
+        self.assertEqual(len([ev for ev in evs if ev.type == 'STEP']), 1)
+
+    def test_sassession_submit_batch(self):
+        """
+        Test method submit_batch returns the LOG and LST of each block separately
+        """
+        ll = self.sas.submit_batch(["%put batch1;", "data _null_; file print; put 'batch2'; run;"], results='text')
+
+        self.assertEqual(len(ll), 2)
+        self.assertIn('batch1', ll[0]['LOG'])
+        self.assertNotIn('batch2', ll[0]['LST'])
+        self.assertIn('batch2', ll[1]['LST'])
+
+    def test_sassession_standby(self):
+        """
+        Test a SASsession with standby takes over a SAS process started ahead of time
+        """
+        import saspy.sasbase
+
+        first = saspy.SASsession(standby=1)
+        key   = repr(sorted(dict(standby=1).items()))
+        # started on this thread, so it's there as soon as the first session is
+        warm  = saspy.sasbase._standby[key][0]
+        io    = warm._io
+        self.assertTrue(io._spawned)
+
+        second = saspy.SASsession(standby=1)
+        self.assertIs(second._io, io)
+        self.assertIs(second._io._sb, second)
+        self.assertFalse(io._spawned)
+        self.assertIsNot(second.sascfg, warm.sascfg)
+        self.assertTrue({'standby', 'connect', 'bootstrap', 'total'} <= set(second.startup_times))
+        self.assertEqual(second._kwargs, dict(standby=1))
+        self.assertIn('standby', second.submit("%put standby;", results='text')['LOG'])
+        self.assertEqual(len(saspy.sasbase._standby[key]), 1)
+
+        first._endsas()
+        second._endsas()
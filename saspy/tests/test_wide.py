@@ -0,0 +1,108 @@
+import time
+import unittest
+
+from saspy.sasbase import sas_date_fmts, sas_time_fmts, sas_datetime_fmts
+from saspy.sasiocommons import sd2dfputcode, sd2dfformatcode, df2sdvars, numberedlist, varruns, SASschema
+
+
+class SB:
+    sas_date_fmts     = sas_date_fmts
+    sas_time_fmts     = sas_time_fmts
+    sas_datetime_fmts = sas_datetime_fmts
+
+
+def wide(ncols: int) -> tuple:
+    """
+    Return the variables of a table like the wide ones we pull: an id, then numerics, with a character variable and a
+    date every 1000 columns.
+    """
+    varlist = ['id'] + ['v%d' % i for i in range(1, ncols)]
+    vartype = ['C'] + ['C' if i % 1000 == 0 else 'N' for i in range(1, ncols)]
+    varcat  = ['$'] + ['$' if i % 1000 == 0 else 'DATE' if i % 1000 == 1 else 'BEST' for i in range(1, ncols)]
+    return varlist, vartype, varcat
+
+
+def codegen_time(ncols: int) -> tuple:
+    """
+    Return the seconds it takes to generate the sd2df put, sd2df CSV format and df2sd statements for a table of ncols
+    columns, and the length of the put statement.
+    """
+    import pandas as pd
+
+    varlist, vartype, varcat = wide(ncols)
+    df = pd.DataFrame([[0.5] * ncols], columns=varlist)
+
+    start = time.perf_counter()
+    put   = sd2dfputcode(varlist, vartype, varcat, SB, "'02'x", "'01'x")
+    sd2dfformatcode(varlist, vartype, varcat, SB)
+    df2sdvars(SASschema.from_df(df, 'utf-8'))
+    return time.perf_counter() - start, len(put)
+
+
+class TestWide(unittest.TestCase):
+    def test_varruns(self):
+        self.assertEqual(varruns(['a', 'b', 'c', 'd'], ['N', 'N', 'C', 'N']),
+                         [('N', ['a', 'b']), ('C', ['c']), ('N', ['d'])])
+
+    def test_putcode(self):
+        varlist = ['id', 'x1', 'x2', 'x3', 'd', 's1', 's2']
+        vartype = ['C', 'N', 'N', 'N', 'N', 'C', 'C']
+        varcat  = ['$', 'BEST', 'COMMA', 'BEST', 'DATE', '$', '$']
+
+        self.assertEqual(sd2dfputcode(varlist, vartype, varcat, SB, "'02'x", "'01'x"),
+                         "'id'n ('x1'n--'x3'n) (best32. '02'x) 'd'n E8601DA10. '02'x 's1'n 's2'n '01'x")
+        self.assertEqual(sd2dfformatcode(varlist, vartype, varcat, SB), "'x1'n--'x3'n best32. 'd'n E8601DA10.")
+
+        # given the lengths, a run of characters is one list too
+        self.assertEqual(sd2dfputcode(varlist, vartype, varcat, SB, "'02'x", "'01'x", [5, 8, 8, 8, 8, 3, 12]),
+                         "'id'n ('x1'n--'x3'n) (best32. '02'x) 'd'n E8601DA10. '02'x ('s1'n--'s2'n) (:$12.) '01'x")
+
+    def test_numberedlist(self):
+        self.assertEqual(numberedlist(['v1', 'v2', 'v3', 'x', 'y9', 'y10', 'y12', 'z01', 'z02']),
+                         "v1-v3 'x'n y9-y10 'y12'n 'z01'n 'z02'n")
+        self.assertEqual(numberedlist(['a b1', 'a b2']), "'a b1'n 'a b2'n")
+
+    def test_df2sdvars(self):
+        import pandas as pd
+
+        df = pd.DataFrame({'a': [1.5], 'b': [2], 's': ['abc'], 't': ['de'], 'u': ['fg'],
+                           'dt': pd.to_datetime(['2020-01-01']), 'f': [True]})
+        schema = SASschema.from_df(df, 'utf-8')
+        length, format, input = df2sdvars(schema, keep_outer_quotes=True)
+
+        self.assertEqual(length, "'a'n 'b'n 8 's'n $3 't'n 'u'n $2 'dt'n 'f'n 8")
+        self.assertEqual(format, "'dt'n E8601DT26.6")
+        self.assertEqual(input, "('a'n--'b'n) (:best32.) ('s'n--'u'n) (~$3.) 'dt'n :E8601DT26.6 'f'n")
+        self.assertEqual(schema.kinds, ['N', 'N', 'C', 'C', 'C', 'D', 'B'])
+
+    def test_codegen_size(self):
+        """
+        Test the put statement for tables of 1k, 10k and 30k columns is shorter than one item per column, as it used to
+        be built (with a format and vformatn() statement per column too, by string concatenation).
+        """
+        for ncols in (1000, 10000, 30000):
+            secs, size = codegen_time(ncols)
+            self.assertLess(size, ncols)
+
+    def test_uniform_size(self):
+        """
+        Test the code for a uniform table, of numerics or characters named v1 ... vN, is the same size for 10k columns
+        as for 10: the put statement, and the df2sd length, format and input statements.
+        """
+        import pandas as pd
+
+        def size(ncols, kind, value):
+            varlist = ['v%d' % i for i in range(1, ncols + 1)]
+            put     = sd2dfputcode(varlist, [kind] * ncols, ['$' if kind == 'C' else 'BEST'] * ncols, SB, "'02'x",
+                                   "'01'x", [8] * ncols)
+            schema  = SASschema.from_df(pd.DataFrame([[value] * ncols], columns=varlist), 'utf-8')
+            return len(put) + sum(map(len, df2sdvars(schema, keep_outer_quotes=True)))
+
+        for kind, value in (('N', 0.5), ('C', 'abc')):
+            self.assertLessEqual(size(10000, kind, value), size(10, kind, value) + 12)
+            self.assertLess(size(10000, kind, value), 120)
+
+
+if __name__ == '__main__':
+    for ncols in (1000, 10000, 30000):
+        print('{:>6} columns: {:.3f} seconds, put statement {} bytes'.format(ncols, *codegen_time(ncols)))